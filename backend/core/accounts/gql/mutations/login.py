@@ -3,13 +3,14 @@ import logging
 
 # Third Party Library Imports
 import graphene
+from asgiref.sync import sync_to_async
 
 # Django Imports
-from django.contrib.auth import login
+from django.contrib.auth import alogin
 from graphql_jwt.shortcuts import get_token
 
 # Same App Imports
-from ...workos_auth import authenticate
+from ...workos_auth import authenticate_async
 from ..schema import User
 
 # App Imports
@@ -39,32 +40,25 @@ class Login(graphene.Mutation):
     class Arguments(object):
         code = graphene.NonNull(graphene.String, description="WorkOS authorization code")
 
-    def mutate(self, info, code):
+    async def mutate(self, info, code):
         logger.info(f"Login attempt with code: {code[:10]}...")
         try:
-            workos_user = authenticate(code)
+            workos_user = await authenticate_async(code)
             logger.info(f"WorkOS authentication successful for user: {workos_user.email}")
 
             if workos_user:
-                user = UserModel.objects.filter(workos_user_id=workos_user.id).first()
-                if not user:
-                    # Create new user from WorkOS profile
-                    user = UserModel(
-                        email=workos_user.email,
-                        workos_user_id=workos_user.id,
-                        first_name=workos_user.first_name,
-                        last_name=workos_user.last_name,
-                    )
-                    user.save()
+                user, created, updated_fields = await sync_to_async(UserModel.objects.upsert_from_workos)(workos_user)
+                if created:
                     logger.info(f"Created new user {user.id} for WorkOS user: {workos_user.id}")
-                else:
-                    # Update user info from WorkOS profile
-                    user.first_name = workos_user.first_name
-                    user.last_name = workos_user.last_name
-                    user.save()
-                    logger.info(f"Updated existing user {user.id}")
-
-                login(info.context, user, backend="django.contrib.auth.backends.ModelBackend")
+                elif updated_fields:
+                    logger.info(f"Updated existing user {user.id}, fields: {updated_fields}")
+
+                # Bumping last_login on every login isn't worth a historical record.
+                user.skip_history_when_saving = True
+                try:
+                    await alogin(info.context, user, backend="django.contrib.auth.backends.ModelBackend")
+                finally:
+                    del user.skip_history_when_saving
 
                 return Login(response_code=LoginUserResponseCode.LOGIN_SUCCESS, user=user, token=get_token(user))
         except Exception as e:
@@ -4,9 +4,23 @@ import graphene
 # App Imports
 from accounts.gql.schema import User
 from accounts.models import User as UserModel
+from utils.counts import CountStrategy
+from utils.graphql.connections import OrderedDjangoFilterConnectionField
+from utils.graphql.exceptions import PermissionDenied
+from utils.graphql.pagination import Pagination
 from utils.graphql.query_optimizer import optimize_query
 
 
+class UserOrder(graphene.Enum):
+    # The orderings backed by an index, the pages are a seek past the cursor.
+    ID = "id"
+    ID_DESC = "-id"
+    CREATED_AT = "created_at"
+    CREATED_AT_DESC = "-created_at"
+    EMAIL = "email"
+    EMAIL_DESC = "-email"
+
+
 def get_user_query():
     def resolve_user(root, info, **kwargs):
         if not info.context.user.is_authenticated:
@@ -15,3 +29,21 @@ def get_user_query():
         return optimize_query(UserModel.objects.filter(id=info.context.user.id)[:1], info)[0]
 
     return graphene.Field(lambda: User, resolver=resolve_user)
+
+
+def get_users_query():
+    def resolve_users(root, info, **kwargs):
+        if not info.context.user.is_staff:
+            raise PermissionDenied()
+
+        return optimize_query(UserModel.objects.order_by("id"), info)
+
+    # The users table is the largest one: its total count is estimated rather than counted, see utils.counts, and
+    # its pages are keyset paginated, so that the deep pages cost as much as the first one.
+    return OrderedDjangoFilterConnectionField(
+        User,
+        resolver=resolve_users,
+        order=graphene.List(graphene.NonNull(UserOrder)),
+        count_strategy=CountStrategy.ESTIMATE,
+        pagination=Pagination.KEYSET,
+    )
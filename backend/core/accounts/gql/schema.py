@@ -14,15 +14,24 @@ from graphene_django_optimizer import resolver_hints
 from ..models import User as UserModel
 
 # App Imports
+from app.graphql.cost import field_costs
 from utils.auth.constants import PERMISSION_TO_VERBOSE_NAME
 from utils.auth.constants import Permission as PermissionEnum
+from utils.graphql.connections import CountableConnection
+from utils.graphql.dataloaders import load_related
+from utils.graphql.dataloaders import then
 from utils.graphql.enum import get_gql_enum
+from utils.graphql.mixins import HistoryMixin
 from utils.graphql.mixins import IntIdMixin
+from utils.graphql.response_cache import CacheScope
+from utils.graphql.response_cache import cache_control
 
 
 PermissionGQLEnum = get_gql_enum(PermissionEnum, "PermissionEnum")
 
 
+@cache_control(max_age=300)
+@field_costs(permission=1, description=1, permission_enum=1)
 class Permission(DjangoObjectType, IntIdMixin):
     permission_enum = graphene.Field(PermissionGQLEnum)
     permission = graphene.Field(graphene.NonNull(graphene.String))
@@ -37,46 +46,67 @@ class Permission(DjangoObjectType, IntIdMixin):
         select_related=("content_type",),
     )
     def resolve_permission(root, info):
-        return f"{root.content_type.app_label}.{root.codename}"
+        return then(
+            load_related(root, info, "content_type"),
+            lambda content_type: f"{content_type.app_label}.{root.codename}",
+        )
 
     @resolver_hints(
         only=("codename", "name", "content_type__app_label"),
         select_related=("content_type",),
     )
     def resolve_description(root, info):
-        permission = f"{root.content_type.app_label}.{root.codename}"
-        if permission in PERMISSION_TO_VERBOSE_NAME:
-            return PERMISSION_TO_VERBOSE_NAME[permission]
+        def get_description(content_type):
+            permission = f"{content_type.app_label}.{root.codename}"
+            if permission in PERMISSION_TO_VERBOSE_NAME:
+                return PERMISSION_TO_VERBOSE_NAME[permission]
 
-        else:
-            return root.name
+            else:
+                return root.name
+
+        return then(load_related(root, info, "content_type"), get_description)
 
     @resolver_hints(
         only=("codename", "content_type__app_label"),
         select_related=("content_type",),
     )
     def resolve_permission_enum(root, info):
-        permission = f"{root.content_type.app_label}.{root.codename}"
-        try:
-            PermissionEnum.validate_value(permission)
-            return permission
-        except Exception:
-            pass
+        def get_permission_enum(content_type):
+            permission = f"{content_type.app_label}.{root.codename}"
+            try:
+                PermissionEnum.validate_value(permission)
+                return permission
+            except Exception:
+                pass
+
+        return then(load_related(root, info, "content_type"), get_permission_enum)
 
 
+@cache_control(max_age=300)
 class Group(DjangoObjectType, IntIdMixin):
     class Meta:
         model = GroupModel
         exclude = ("user_set",)
 
 
+@cache_control(max_age=300)
 class ContentType(DjangoObjectType, IntIdMixin):
     class Meta:
         model = ContentTypeModel
         exclude = ("permission_set",)
 
 
-class User(DjangoObjectType, IntIdMixin):
+@cache_control(max_age=60, scope=CacheScope.USER, ignore_fields=("last_login",))
+class User(DjangoObjectType, IntIdMixin, HistoryMixin):
     class Meta:
         model = UserModel
         exclude = ["password"]
+        use_connection = True
+        connection_class = CountableConnection
+        filter_fields = {
+            "email": ["exact", "icontains"],
+            "first_name": ["exact"],
+            "last_name": ["exact"],
+            "is_active": ["exact"],
+            "is_staff": ["exact"],
+        }
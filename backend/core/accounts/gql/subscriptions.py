@@ -0,0 +1,35 @@
+# Third Party Library Imports
+import graphene
+
+# Django Imports
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+# App Imports
+from accounts.gql.schema import User
+from accounts.models import User as UserModel
+from accounts.models import get_user_channel
+from utils.graphql.exceptions import CustomGraphQLError
+from utils.graphql.query_optimizer import optimize_query
+from utils.pubsub import pubsub
+
+
+@receiver(post_save, sender=UserModel, dispatch_uid="accounts_publish_user_updated")
+def publish_user_updated(sender, instance, using, **kwargs):
+    pubsub.publish_on_commit(get_user_channel(instance.pk), instance.pk, using=using)
+
+
+class UserSubscription(graphene.ObjectType):
+    user_updated = graphene.Field(lambda: User)
+
+    async def subscribe_user_updated(root, info, **kwargs):
+        user = await info.context.auser()
+        if not user.is_authenticated:
+            raise CustomGraphQLError("You must be logged in to subscribe to your updates.")
+
+        # The events are the ids of the updated user, the user is loaded when the event is executed.
+        return pubsub.subscribe(get_user_channel(user.pk))
+
+    def resolve_user_updated(root, info, **kwargs):
+        # None when the user was deleted since the event was published.
+        return optimize_query(UserModel.objects.filter(id=root), info).first()
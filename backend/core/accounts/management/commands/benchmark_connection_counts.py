@@ -0,0 +1,98 @@
+# Standard Library Imports
+import time
+
+# Third Party Library Imports
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+# App Imports
+from accounts.models import User
+from deploy.management.base import AbstractBaseCommand
+from utils.counts import CountStrategy
+from utils.counts import get_count
+from utils.counts import get_count_cache_key
+
+
+BENCHMARK_PREFIX = "count-benchmark-"
+
+
+class Command(BaseCommand, AbstractBaseCommand):
+    help = "Benchmark the count strategies of the connections on a seeded users table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows",
+            dest="rows",
+            type=int,
+            default=500000,
+            help="Specify the number of users seeded before the benchmark.",
+        )
+        parser.add_argument(
+            "--repeat",
+            dest="repeat",
+            type=int,
+            default=5,
+            help="Specify the number of counts per strategy.",
+        )
+        parser.add_argument(
+            "--batch_size",
+            dest="batch_size",
+            type=int,
+            default=10000,
+            help="Specify the number of users inserted per query while seeding.",
+        )
+
+    def seed(self, rows, batch_size):
+        for start in range(0, rows, batch_size):
+            User.objects.bulk_create(
+                [
+                    User(
+                        email=f"{BENCHMARK_PREFIX}{i}@example.com",
+                        workos_user_id=f"{BENCHMARK_PREFIX}{i}",
+                        first_name=f"First {i % 100}",
+                    )
+                    for i in range(start, min(start + batch_size, rows))
+                ]
+            )
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {connection.ops.quote_name(User._meta.db_table)}")
+
+    def cleanup(self):
+        # Raw delete, collecting the related objects of millions of users takes longer than the benchmark.
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {connection.ops.quote_name(User._meta.db_table)} WHERE workos_user_id LIKE %s",
+                [f"{BENCHMARK_PREFIX}%"],
+            )
+
+    def benchmark(self, name, queryset, repeat):
+        self.print_header(name)
+        for strategy in CountStrategy:
+            # Only the count of the benchmarked queryset is dropped, the rest of the shared cache is left alone.
+            cache.delete(get_count_cache_key(queryset))
+            durations = []
+            for _ in range(repeat):
+                start_time = time.perf_counter()
+                count = get_count(queryset, strategy)
+                durations.append(time.perf_counter() - start_time)
+
+            # The first count of the cached strategy is a miss.
+            first, rest = durations[0], durations[1:] or durations
+            self.print_success(
+                f"{strategy.value}: {count.value}{'' if count.exact else ' (inexact)'}, first {first * 1000:.2f}ms, "
+                f"then {sum(rest) / len(rest) * 1000:.2f}ms per count"
+            )
+
+    def handle(self, *args, **kwargs):
+        rows, repeat = kwargs.get("rows"), kwargs.get("repeat")
+        self.print_info(f"Seeding {rows} users...")
+        self.seed(rows, kwargs.get("batch_size"))
+
+        try:
+            self.benchmark("Unfiltered", User.objects.all(), repeat)
+            self.benchmark("Filtered (1% of the rows)", User.objects.filter(first_name="First 7"), repeat)
+            self.benchmark("Filtered (substring)", User.objects.filter(email__icontains="99@"), repeat)
+        finally:
+            self.cleanup()
@@ -0,0 +1,157 @@
+# Standard Library Imports
+import statistics
+import threading
+import time
+
+# Third Party Library Imports
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished
+from django.core.signals import request_started
+from django.db import DEFAULT_DB_ALIAS
+from django.db import close_old_connections
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+# App Imports
+from accounts.models import User
+from deploy.management.base import AbstractBaseCommand
+from utils.db_pool import get_pool_stats
+
+
+class Command(BaseCommand, AbstractBaseCommand):
+    help = (
+        "Load test the database connections of concurrent requests, opening a connection per request versus taking "
+        "them from the connection pool."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--threads",
+            dest="threads",
+            type=int,
+            default=settings.DATABASE_POOL["max_size"],
+            help="Specify the number of concurrent requests, the pool size of a worker by default.",
+        )
+        parser.add_argument(
+            "--requests",
+            dest="requests",
+            type=int,
+            default=200,
+            help="Specify the number of requests per thread.",
+        )
+        parser.add_argument(
+            "--queries",
+            dest="queries",
+            type=int,
+            default=3,
+            help="Specify the number of queries per request.",
+        )
+        parser.add_argument(
+            "--streams",
+            dest="streams",
+            type=int,
+            default=settings.DATABASE_POOL["max_size"],
+            help="Specify the number of subscription streams open during the last run, the pool size by default.",
+        )
+
+    def run_requests(self, requests, queries, durations, failures):
+        for _ in range(requests):
+            start_time = time.perf_counter()
+            # Same lifecycle as a request: the connection is closed, or returned to the pool, when it finishes.
+            request_started.send(sender=self.__class__)
+            try:
+                for _ in range(queries):
+                    User.objects.filter(pk=0).exists()
+            except Exception as e:
+                failures.append(e)
+            finally:
+                request_finished.send(sender=self.__class__)
+            durations.append(time.perf_counter() - start_time)
+
+    def run_stream(self, done, failures):
+        # Same lifecycle as GraphQLSubscriptionView: the request lasts as long as the stream, the connection is given
+        # back after subscribing and after each event.
+        request_started.send(sender=self.__class__)
+        try:
+            User.objects.filter(pk=0).exists()
+            close_old_connections()
+            while not done.wait(0.05):
+                User.objects.filter(pk=0).exists()
+                close_old_connections()
+        except Exception as e:
+            failures.append(e)
+        finally:
+            request_finished.send(sender=self.__class__)
+
+    def load_test(self, name, pool_options, threads, requests, queries, streams=0):
+        options = connections.settings[DEFAULT_DB_ALIAS]["OPTIONS"]
+        previous = options.get("pool")
+        options["pool"] = pool_options
+        connections[DEFAULT_DB_ALIAS].close()
+
+        opened = []
+
+        def count_connection(sender, connection, **kwargs):
+            opened.append(connection)
+
+        connection_created.connect(count_connection)
+        durations, failures = [], []
+        done = threading.Event()
+        listeners = [threading.Thread(target=self.run_stream, args=(done, failures)) for _ in range(streams)]
+        workers = [
+            threading.Thread(target=self.run_requests, args=(requests, queries, durations, failures))
+            for _ in range(threads)
+        ]
+        try:
+            for listener in listeners:
+                listener.start()
+            start_time = time.perf_counter()
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            elapsed = time.perf_counter() - start_time
+            done.set()
+            for listener in listeners:
+                listener.join()
+            stats = get_pool_stats().get(DEFAULT_DB_ALIAS)
+        finally:
+            done.set()
+            connection_created.disconnect(count_connection)
+            connections[DEFAULT_DB_ALIAS].close_pool()
+            options["pool"] = previous
+
+        durations.sort()
+        self.print_header(name)
+        self.print_success(
+            f"{len(durations) / elapsed:.0f} requests/s, p50 {statistics.median(durations) * 1000:.2f}ms, "
+            f"p95 {durations[int(len(durations) * 0.95)] * 1000:.2f}ms, "
+            f"max {durations[-1] * 1000:.2f}ms"
+        )
+        if stats is None:
+            self.print_info(f"{len(opened)} connections opened")
+        else:
+            wait = stats["requests_wait_ms_avg"]
+            self.print_info(
+                f"{stats['connections_num']} connections opened, {stats['requests_queued']} of "
+                f"{stats['requests_num']} requests waited for a connection"
+                + (f" ({wait:.2f}ms on average)" if wait is not None else "")
+            )
+        if failures:
+            self.print_alert(f"{len(failures)} requests failed: {failures[0]!r}")
+
+    def handle(self, *args, **kwargs):
+        threads, requests, queries, streams = kwargs["threads"], kwargs["requests"], kwargs["queries"], kwargs["streams"]
+        self.print_info(f"{threads} threads x {requests} requests x {queries} queries")
+        self.load_test("Connection per request", None, threads, requests, queries)
+        self.load_test("Connection pool", settings.DATABASE_POOL, threads, requests, queries)
+        if streams:
+            self.load_test(
+                f"Connection pool, {streams} subscription streams open",
+                settings.DATABASE_POOL,
+                threads,
+                requests,
+                queries,
+                streams,
+            )
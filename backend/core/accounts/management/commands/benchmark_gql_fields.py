@@ -0,0 +1,120 @@
+# Standard Library Imports
+import timeit
+
+# Third Party Library Imports
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from graphql import execute
+from graphql import parse
+from graphql.utilities import ast_to_dict
+from inflection import underscore
+
+# App Imports
+from app.graphql.schema import schema
+from deploy.management.base import AbstractBaseCommand
+from utils.graphql.fields import _collect_fields
+from utils.graphql.fields import get_gql_fields
+
+
+QUERY = """
+query Benchmark {
+  user {
+    id
+    email
+    firstName
+    lastName
+    ...UserDates
+    groups {
+      id
+      name
+      permissions { ...PermissionFields }
+    }
+    userPermissions { ...PermissionFields }
+  }
+}
+
+fragment UserDates on User {
+  dateJoined
+  lastLogin
+  createdAt
+  modifiedAt
+}
+
+fragment PermissionFields on Permission {
+  id
+  name
+  codename
+  permission
+  permissionEnum
+  description
+  contentType { id appLabel model }
+}
+"""
+
+
+def _legacy_collect_fields(node, fragments, ignore_typename):
+    fields = {}
+
+    if node.get("selection_set"):
+        for leaf in node["selection_set"]["selections"]:
+            if leaf["kind"] == "field":
+                field = underscore(leaf["name"]["value"])
+                if ignore_typename and field == "__typename":
+                    continue
+
+                fields.update({field: _legacy_collect_fields(leaf, fragments, ignore_typename)})
+
+            elif leaf["kind"] == "fragment_spread":
+                fields.update(_legacy_collect_fields(fragments[leaf["name"]["value"]], fragments, ignore_typename))
+
+    return fields
+
+
+def legacy_get_gql_fields(info, ignore_typename=True):
+    """
+    get_gql_fields as it was before the selections were memoized, converting the AST to dicts on every call.
+    """
+    fragments = {name: ast_to_dict(value) for name, value in info.fragments.items()}
+    return _legacy_collect_fields(ast_to_dict(info.field_nodes[0]), fragments, ignore_typename)
+
+
+class Command(BaseCommand, AbstractBaseCommand):
+    help = "Benchmark get_gql_fields against its previous implementation converting the AST to dicts."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--calls",
+            dest="calls",
+            type=int,
+            default=10000,
+            help="Specify the number of calls per implementation, e.g. resolvers of the items of a list.",
+        )
+
+    def get_info(self):
+        infos = []
+
+        def capture_info(next, root, info, **args):
+            if info.field_name == "user":
+                infos.append(info)
+            return None
+
+        execute(schema.graphql_schema, parse(QUERY), middleware=[capture_info])
+        return infos[0]
+
+    def handle(self, *args, **kwargs):
+        calls = kwargs.get("calls")
+        info = self.get_info()
+
+        if get_gql_fields(info) != legacy_get_gql_fields(info):
+            self.print_failure("The implementations return different selections.", exit=False)
+            raise CommandError("get_gql_fields doesn't match the legacy implementation.")
+
+        implementations = (
+            ("legacy", legacy_get_gql_fields),
+            # First call for a field of a document, walking the AST without the dict conversion.
+            ("uncached", lambda info: _collect_fields(info.field_nodes[0], info.fragments, True)),
+            ("memoized", get_gql_fields),
+        )
+        for name, func in implementations:
+            duration = timeit.timeit(lambda: func(info), number=calls)
+            self.print_success(f"{name}: {calls} calls in {duration:.3f}s, {duration / calls * 1e6:.2f}us per call")
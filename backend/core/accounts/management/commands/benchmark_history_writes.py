@@ -0,0 +1,63 @@
+# Standard Library Imports
+import time
+
+# Third Party Library Imports
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+# App Imports
+from accounts.models import User
+from deploy.management.base import AbstractBaseCommand
+from utils.history import HistoryWriteMode
+from utils.history import buffer_history
+
+
+class Command(BaseCommand, AbstractBaseCommand):
+    help = "Benchmark the user update throughput with the sync and buffered history write modes."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--users",
+            dest="users",
+            type=int,
+            default=200,
+            help="Specify the number of users updated per request.",
+        )
+        parser.add_argument(
+            "--requests",
+            dest="requests",
+            type=int,
+            default=10,
+            help="Specify the number of simulated requests per mode.",
+        )
+
+    def benchmark(self, users, requests):
+        start_time = time.perf_counter()
+        for request in range(requests):
+            # Every request is wrapped in a history buffer by the HistoryBufferMiddleware.
+            with buffer_history():
+                for user in users:
+                    user.first_name = f"Benchmark {request}"
+                    user.save(update_fields=["first_name"])
+
+        return time.perf_counter() - start_time
+
+    def handle(self, *args, **kwargs):
+        count, requests = kwargs.get("users"), kwargs.get("requests")
+        users = User.objects.bulk_create(
+            [User(email=f"benchmark-{i}@example.com", workos_user_id=f"benchmark-{i}") for i in range(count)]
+        )
+
+        try:
+            for mode in HistoryWriteMode:
+                with override_settings(HISTORY_WRITE_MODE=mode):
+                    duration = self.benchmark(users, requests)
+
+                updates = count * requests
+                self.print_success(
+                    f"{mode}: {updates} updates in {duration:.3f}s, {updates / duration:.0f} updates/s"
+                )
+        finally:
+            # The users first, their deletion writes historical records as well.
+            User.objects.filter(workos_user_id__startswith="benchmark-").delete()
+            User.history.filter(workos_user_id__startswith="benchmark-").delete()
@@ -0,0 +1,129 @@
+# Standard Library Imports
+import json
+
+# Third Party Library Imports
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import Group
+from django.contrib.auth.models import Permission
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from django.db import transaction
+from django.test import RequestFactory
+from django.test import override_settings
+
+# App Imports
+from accounts.models import User
+from app.graphql.views import AsyncGraphQLView
+from deploy.management.base import AbstractBaseCommand
+from utils.graphql.query_budget import dump_budgets
+from utils.graphql.query_budget import format_report
+from utils.graphql.query_budget import load_budgets
+from utils.graphql.query_budget import run_operations
+
+
+BUDGETS_PATH = settings.BASE_DIR / f"{settings.APP_NAME}/graphql/query_budgets.json"
+SEED_PREFIX = "query-budget-"
+
+
+class Command(BaseCommand, AbstractBaseCommand):
+    help = (
+        "Run the recorded GraphQL operations against seeded data and compare their number of queries, and of "
+        "duplicate queries (N+1), with the checked-in budgets."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--budgets",
+            dest="budgets",
+            default=str(BUDGETS_PATH),
+            help="Specify the file of the recorded operations and their budgets.",
+        )
+        parser.add_argument(
+            "--items",
+            dest="items",
+            type=int,
+            default=5,
+            help="Specify the number of items seeded per list, e.g. groups of the user and permissions per group.",
+        )
+        parser.add_argument(
+            "--update",
+            action="store_true",
+            dest="update",
+            default=False,
+            help="Specify if you want to write the current counts as the new budgets.",
+        )
+        parser.add_argument(
+            "--json",
+            dest="json",
+            default=None,
+            help="Specify a file to write the report to as JSON.",
+        )
+
+    def seed(self, items):
+        user = User.objects.create(
+            email=f"{SEED_PREFIX}user@example.com", workos_user_id=f"{SEED_PREFIX}user", is_staff=True
+        )
+        permissions = list(Permission.objects.order_by("id")[: items * (items + 1)])
+        for i in range(items):
+            group = Group.objects.create(name=f"{SEED_PREFIX}{i}")
+            group.permissions.set(permissions[i * items : (i + 1) * items])
+            user.groups.add(group)
+        user.user_permissions.set(permissions[items * items :])
+        return user
+
+    def get_executor(self, user):
+        # The view serving the API. Its sync resolvers come back to this thread through async_to_sync, so they run
+        # on the connection holding the seeded data and logging the queries.
+        view = async_to_sync(AsyncGraphQLView.as_view())
+        factory = RequestFactory()
+
+        def execute(query, variables):
+            # The cached content types would hide the queries of the first operation from the following ones.
+            ContentType.objects.clear_cache()
+            request = factory.post(
+                "/graphql/", json.dumps({"query": query, "variables": variables}), content_type="application/json"
+            )
+            request.user = user
+            response = json.loads(view(request).content)
+            return [error.get("message") for error in response.get("errors") or []]
+
+        return execute
+
+    @override_settings(GRAPHQL_RESPONSE_CACHE_ENABLED=False, GRAPHQL_TRACE_SAMPLE_RATE=0)
+    def handle(self, *args, **kwargs):
+        budgets = load_budgets(kwargs["budgets"])
+
+        with transaction.atomic():
+            user = self.seed(kwargs["items"])
+            results = run_operations(budgets, self.get_executor(user))
+            transaction.set_rollback(True)
+
+        self.print_header("Query budgets")
+        self.print(format_report(results))
+
+        if kwargs["json"]:
+            report = [
+                {
+                    "name": result.budget.name,
+                    "queries": result.queries,
+                    "duplicate_queries": result.duplicate_queries,
+                    "duplicates": result.duplicates,
+                    "violations": result.violations,
+                }
+                for result in results
+            ]
+            with open(kwargs["json"], "w") as report_file:
+                json.dump(report, report_file, indent=2)
+
+        if kwargs["update"]:
+            dump_budgets(kwargs["budgets"], [result.to_budget() for result in results])
+            self.print_success(f"Updated the budgets of {len(results)} operations.")
+            return
+
+        failed = [result.budget.name for result in results if result.violations]
+        if failed:
+            raise CommandError(f"Over budget: {', '.join(failed)}")
+
+        self.print_success(f"All {len(results)} operations are within their budgets.")
@@ -0,0 +1,147 @@
+# Standard Library Imports
+import json
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from urllib.parse import parse_qs
+from urllib.parse import urlparse
+
+# Third Party Library Imports
+from django.core.management.base import BaseCommand
+
+# App Imports
+from deploy.management.base import AbstractBaseCommand
+
+
+USERS_PATH = "/user_management/users"
+
+
+def get_fake_users(count, organizations):
+    """
+    The users served by the fake server, oldest first. The user i belongs to the organization org_fake_<i %
+    organizations>.
+    """
+    created_at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    users = []
+    for i in range(count):
+        timestamp = (created_at + timedelta(minutes=i)).isoformat().replace("+00:00", "Z")
+        users.append(
+            {
+                "object": "user",
+                "id": f"user_fake_{i:06d}",
+                "email": f"fake-{i}@example.com",
+                "first_name": "Fake",
+                "last_name": f"User {i}",
+                "email_verified": True,
+                "profile_picture_url": None,
+                "last_sign_in_at": None,
+                "created_at": timestamp,
+                "updated_at": timestamp,
+                "organization_id": f"org_fake_{i % organizations}",
+            }
+        )
+    return users
+
+
+def list_users(users, params):
+    """
+    Page of the users in the format of the WorkOS list endpoints: the items after the cursor, with the cursor of the
+    next page in list_metadata.after (None on the last page).
+    """
+    organization_id = params.get("organization_id")
+    items = [user for user in users if organization_id is None or user["organization_id"] == organization_id]
+    if params.get("order", "desc") == "desc":
+        items.reverse()
+
+    after = params.get("after")
+    if after:
+        ids = [user["id"] for user in items]
+        items = items[ids.index(after) + 1 :] if after in ids else []
+
+    limit = min(int(params.get("limit", 10)), 100)
+    page = items[:limit]
+    return {
+        "object": "list",
+        "data": [{key: value for key, value in user.items() if key != "organization_id"} for user in page],
+        "list_metadata": {"before": None, "after": page[-1]["id"] if len(items) > limit else None},
+    }
+
+
+class Command(BaseCommand, AbstractBaseCommand):
+    help = (
+        "Serve the WorkOS user listing with fixture users on localhost, to run sync_workos_users against it: "
+        "WORKOS_BASE_URL=http://localhost:<port>/ python manage.py sync_workos_users"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--port",
+            dest="port",
+            type=int,
+            default=8001,
+            help="Specify the port to listen on.",
+        )
+        parser.add_argument(
+            "--users",
+            dest="users",
+            type=int,
+            default=1000,
+            help="Specify the number of fixture users.",
+        )
+        parser.add_argument(
+            "--organizations",
+            dest="organizations",
+            type=int,
+            default=2,
+            help="Specify the number of organizations the users are spread across.",
+        )
+        parser.add_argument(
+            "--fail_after",
+            dest="fail_after",
+            type=int,
+            default=None,
+            help="Specify to answer with server errors after this many pages, to interrupt a sync and resume it.",
+        )
+
+    def handle(self, *args, **kwargs):
+        users = get_fake_users(kwargs["users"], kwargs["organizations"])
+        fail_after = kwargs["fail_after"]
+        command = self
+        served = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def send_json(self, status, body):
+                content = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path.rstrip("/") != USERS_PATH:
+                    return self.send_json(404, {"message": "Not found"})
+
+                if fail_after is not None and len(served) >= fail_after:
+                    return self.send_json(500, {"message": "Fake server error"})
+
+                served.append(url.query)
+                params = {key: values[0] for key, values in parse_qs(url.query).items()}
+                self.send_json(200, list_users(users, params))
+
+            def log_message(self, format, *args):
+                command.print_info(f"{self.address_string()} {format % args}")
+
+        server = ThreadingHTTPServer(("localhost", kwargs["port"]), Handler)
+        self.print_success(
+            f"Serving {len(users)} fake WorkOS users on http://localhost:{kwargs['port']}/, press Ctrl+C to stop."
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,84 @@
+# Third Party Library Imports
+from django.core.management.base import BaseCommand
+
+# App Imports
+from accounts.models import User
+from accounts.workos_auth import iter_user_pages
+from deploy.management.base import AbstractBaseCommand
+
+
+class Command(BaseCommand, AbstractBaseCommand):
+    help = (
+        "Sync the WorkOS users into accounts.User in batches. "
+        "Point WORKOS_BASE_URL to the fake_workos_server command to run it locally."
+    )
+
+    def add_arguments(self, parser):
+        AbstractBaseCommand.add_base_arguments(parser)
+        parser.add_argument(
+            "--organization_id",
+            dest="organization_id",
+            default=None,
+            help="Specify to sync only the users of this WorkOS organization.",
+        )
+        parser.add_argument(
+            "--after",
+            dest="after",
+            default=None,
+            help="Specify the cursor printed by an interrupted run to resume the sync from it.",
+        )
+        parser.add_argument(
+            "--batch_size",
+            dest="batch_size",
+            type=int,
+            default=500,
+            help="Specify the number of users upserted per database round trip.",
+        )
+        parser.add_argument(
+            "--page_size",
+            dest="page_size",
+            type=int,
+            default=100,
+            help="Specify the number of users fetched per WorkOS request (max 100).",
+        )
+
+    def sync_batch(self, batch, cursor, dry_run=False):
+        if dry_run:
+            created, updated, skipped = 0, 0, 0
+        else:
+            created, updated, skipped = User.objects.bulk_upsert_from_workos(batch)
+
+        message = f"Synced {len(batch)} users, created: {created}, updated: {updated}"
+        # No cursor after the last page, there is nothing left to resume.
+        self.print_info(f"{message}, resume with --after={cursor}" if cursor else message)
+        if skipped:
+            self.print_alert(f"Skipped {skipped} new users whose email belongs to another user")
+        return created, updated
+
+    def handle(self, *args, **kwargs):
+        dry_run = kwargs.get("dry_run")
+        batch_size = kwargs.get("batch_size")
+        self.print_alert("Syncing WorkOS users!")
+
+        total, total_created, total_updated = 0, 0, 0
+        batch, cursor = [], kwargs.get("after")
+        pages = iter_user_pages(
+            organization_id=kwargs.get("organization_id"),
+            after=cursor,
+            limit=kwargs.get("page_size"),
+        )
+        for users, next_cursor in pages:
+            batch.extend(users)
+            # A page is synced as a whole, so the cursor of a synced batch is always a valid resume point.
+            cursor = next_cursor
+            if len(batch) >= batch_size:
+                created, updated = self.sync_batch(batch, cursor, dry_run)
+                total, total_created, total_updated = total + len(batch), total_created + created, total_updated + updated
+                batch = []
+
+        if batch:
+            created, updated = self.sync_batch(batch, cursor, dry_run)
+            total, total_created, total_updated = total + len(batch), total_created + created, total_updated + updated
+
+        self.print_success(f"Synced {total} WorkOS users, created: {total_created}, updated: {total_updated}")
+        self.print_alert("WorkOS user sync completed.\n\n")
@@ -14,6 +14,9 @@ from graphql_jwt.utils import get_http_authorization
 from graphql_jwt.utils import get_payload
 from graphql_jwt.utils import get_user_by_payload
 
+# App Imports
+from utils.prepared import hot_queries
+
 
 User = get_user_model()
 
@@ -26,7 +29,9 @@ class JWTMiddleware(MiddlewareMixin):
             if not token:
                 return
             try:
-                user = get_user_by_payload(get_payload(token))
+                payload = get_payload(token)
+                with hot_queries("jwt_user"):
+                    user = get_user_by_payload(payload)
                 if user and user.is_active:
                     setattr(request, "_cached_user", user)
                     setattr(request, "_acached_user", user)
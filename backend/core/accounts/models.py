@@ -1,10 +1,29 @@
 from django.contrib.auth.models import AbstractBaseUser
 from django.contrib.auth.models import BaseUserManager
 from django.contrib.auth.models import PermissionsMixin
+from django.db import IntegrityError
+from django.db import connections
 from django.db import models
+from django.db import transaction
+from django.db.models.signals import post_save
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
-from simple_history.models import HistoricalRecords
+from utils.commons import dict_diff
+from utils.graphql.response_cache import bump_model_version
+from utils.history import BufferedHistoricalRecords
+from utils.prepared import hot_queries
+from utils.pubsub import pubsub
+
+
+# Profile fields kept in sync with WorkOS on every login.
+WORKOS_PROFILE_FIELDS = ("first_name", "last_name")
+
+
+def get_user_channel(user_id):
+    """
+    Pubsub channel of the updates of the user, see accounts.gql.subscriptions.
+    """
+    return f"accounts.user.{user_id}"
 
 
 class UserManager(BaseUserManager):
@@ -35,6 +54,171 @@ class UserManager(BaseUserManager):
         user.save(using=self._db)
         return user
 
+    def _get_or_insert(self, user):
+        """
+        Insert the user or fetch the existing user with the same workos_user_id in a single round trip.
+        """
+        connection = connections[self.db]
+        qn = connection.ops.quote_name
+        meta = self.model._meta
+        fields = [field for field in meta.concrete_fields if not field.primary_key]
+        workos_user_id_column = qn(meta.get_field("workos_user_id").column)
+
+        # Both the selects see the snapshot from before the insert, so the existing row is returned only on conflict.
+        sql = f"""
+            WITH inserted AS (
+                INSERT INTO {qn(meta.db_table)} ({", ".join(qn(field.column) for field in fields)})
+                VALUES ({", ".join(["%s"] * len(fields))})
+                ON CONFLICT ({workos_user_id_column}) DO NOTHING
+                RETURNING *
+            )
+            SELECT *, TRUE AS created FROM inserted
+            UNION ALL
+            SELECT *, FALSE AS created FROM {qn(meta.db_table)} WHERE {workos_user_id_column} = %s
+        """
+        params = [field.get_db_prep_save(field.pre_save(user, add=True), connection) for field in fields]
+        params.append(user.workos_user_id)
+
+        # Runs on every login.
+        with hot_queries("workos_user"):
+            rows = list(self.raw(sql, params))
+        if not rows:
+            # The user was inserted by a concurrent transaction after our snapshot was taken.
+            return self.get(workos_user_id=user.workos_user_id), False
+
+        return rows[0], rows[0].created
+
+    def upsert_from_workos(self, workos_user):
+        """
+        Create the user for the WorkOS profile or sync the profile fields of the existing user.
+
+        Only the changed profile fields are written back, so an unchanged profile costs neither an UPDATE nor a
+        historical record.
+
+        :return: Tuple of (user, created, updated_fields).
+        """
+        user, created = self._get_or_insert(
+            self.model(
+                email=workos_user.email,
+                workos_user_id=workos_user.id,
+                first_name=workos_user.first_name,
+                last_name=workos_user.last_name,
+            )
+        )
+        if created:
+            # The insert bypassed `save`, send the signal so the receivers (e.g. simple_history) still see it.
+            post_save.send(sender=self.model, instance=user, created=True, update_fields=None, raw=False, using=self.db)
+            return user, True, []
+
+        profile = {field: getattr(workos_user, field) for field in WORKOS_PROFILE_FIELDS}
+        changes = dict_diff(profile, {field: getattr(user, field) for field in WORKOS_PROFILE_FIELDS})
+        if not changes:
+            return user, False, []
+
+        updated_fields = [field for field, _, _ in changes]
+        for field, value, _old in changes:
+            setattr(user, field, value)
+        user.modified_at = timezone.now()
+        user.save(using=self.db, update_fields=[*updated_fields, "modified_at"])
+        return user, False, updated_fields
+
+    def _bulk_upsert(self, users):
+        """
+        Insert the users, or update the profile fields of the existing users with the same workos_user_id, in a single
+        INSERT ... ON CONFLICT. Returns the written rows, flagged with whether they were inserted: xmax is only set on
+        the rows updated by the statement.
+        """
+        connection = connections[self.db]
+        qn = connection.ops.quote_name
+        meta = self.model._meta
+        fields = [field for field in meta.concrete_fields if not field.primary_key]
+        updated_columns = [qn(meta.get_field(name).column) for name in (*WORKOS_PROFILE_FIELDS, "modified_at")]
+
+        values = ", ".join(f"({', '.join(['%s'] * len(fields))})" for _ in users)
+        sql = f"""
+            INSERT INTO {qn(meta.db_table)} ({", ".join(qn(field.column) for field in fields)})
+            VALUES {values}
+            ON CONFLICT ({qn(meta.get_field("workos_user_id").column)}) DO UPDATE
+            SET {", ".join(f"{column} = EXCLUDED.{column}" for column in updated_columns)}
+            RETURNING *, (xmax = 0) AS inserted
+        """
+        params = [
+            field.get_db_prep_save(field.pre_save(user, add=True), connection) for user in users for field in fields
+        ]
+        return list(self.raw(sql, params))
+
+    def bulk_upsert_from_workos(self, workos_users):
+        """
+        Batch variant of `upsert_from_workos` for syncing directory users.
+
+        Unchanged users are skipped, the rest are upserted on workos_user_id in a single INSERT ... ON CONFLICT and
+        their historical records are bulk inserted. A new user whose email belongs to another user, e.g. an email moved
+        to another WorkOS user, is skipped rather than failing the batch.
+
+        The bulk writes bypass `save`, so the cached GraphQL responses of the users are invalidated and their
+        subscribers notified here once the transaction commits.
+
+        :return: Tuple of (created count, updated count, skipped count).
+        """
+        existing_users = self.in_bulk([workos_user.id for workos_user in workos_users], field_name="workos_user_id")
+        now = timezone.now()
+
+        new_users, updated_users = [], []
+        for workos_user in workos_users:
+            profile = {field: getattr(workos_user, field) for field in WORKOS_PROFILE_FIELDS}
+            user = existing_users.get(workos_user.id)
+            if not user:
+                new_users.append(self.model(email=workos_user.email, workos_user_id=workos_user.id, **profile))
+                continue
+
+            changes = dict_diff(profile, {field: getattr(user, field) for field in WORKOS_PROFILE_FIELDS})
+            if changes:
+                for field, value, _old in changes:
+                    setattr(user, field, value)
+                user.modified_at = now
+                updated_users.append(user)
+
+        # Only the inserts can conflict on the email, the updates don't write it.
+        taken_emails = set(self.filter(email__in=[user.email for user in new_users]).values_list("email", flat=True))
+        users, skipped_users = [], []
+        for user in new_users:
+            if user.email in taken_emails:
+                skipped_users.append(user)
+            else:
+                users.append(user)
+                taken_emails.add(user.email)
+
+        users.extend(updated_users)
+        if not users:
+            return 0, 0, len(skipped_users)
+
+        with transaction.atomic(using=self.db):
+            try:
+                # Users created by a concurrent login since the lookup above conflict on workos_user_id and get
+                # updated.
+                with transaction.atomic(using=self.db):
+                    rows = self._bulk_upsert(users)
+            except IntegrityError:
+                # An email taken by a concurrent login since the lookup above, upsert the users one by one to skip it.
+                rows = []
+                for user in users:
+                    try:
+                        with transaction.atomic(using=self.db):
+                            rows.extend(self._bulk_upsert([user]))
+                    except IntegrityError:
+                        skipped_users.append(user)
+
+            created_users = [user for user in rows if user.inserted]
+            updated_users = [user for user in rows if not user.inserted]
+            self.model.history.bulk_history_create(created_users, default_date=now)
+            self.model.history.bulk_history_create(updated_users, update=True, default_date=now)
+
+            transaction.on_commit(lambda: bump_model_version(self.model._meta.label_lower), using=self.db)
+            for user in rows:
+                pubsub.publish_on_commit(get_user_channel(user.pk), user.pk, using=self.db)
+
+        return len(created_users), len(updated_users), len(skipped_users)
+
 
 class User(AbstractBaseUser, PermissionsMixin):
     # is_superuser field provided by PermissionsMixin
@@ -60,12 +244,18 @@ class User(AbstractBaseUser, PermissionsMixin):
     created_at = models.DateTimeField(_("created at"), default=timezone.now)
     modified_at = models.DateTimeField(_("modified at"), default=timezone.now)
 
-    history = HistoricalRecords()
+    history = BufferedHistoricalRecords()
 
     objects = UserManager()
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = ["first_name", "last_name"]
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of the users connection ordered by created_at, see accounts.gql.resolver.
+            models.Index(fields=["created_at", "id"], name="accounts_user_created_id_idx"),
+        ]
+
     def __str__(self):
         return f"{self.id} {self.email}"
@@ -1 +1,222 @@
-# Create your tests here.
+# Standard Library Imports
+from unittest import mock
+
+# Django Imports
+from django.core.cache import cache
+from django.test import TestCase
+from django.test import override_settings
+
+# Same App Imports
+from .models import User
+from .models import get_user_channel
+from .workos_auth import WorkOSUser
+
+# App Imports
+from utils.graphql.response_cache import MODEL_VERSION_CACHE_KEY
+from utils.graphql.response_cache import bump_model_version
+from utils.pubsub import pubsub
+
+
+ME_QUERY = "query Me { user { id firstName lastName } }"
+
+
+class BulkUpsertFromWorkOSTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(
+            email="ada@example.com", workos_user_id="user_ada", first_name="Ada", last_name="Byron"
+        )
+        # The process tier of the cache outlives the rolled back test transactions.
+        cache.clear()
+
+    def query_me(self):
+        response = self.client.post("/graphql/", {"query": ME_QUERY}, content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        return response.json()["data"]["user"]
+
+    def test_synced_user_is_not_served_from_a_stale_cached_response(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.query_me()["lastName"], "Byron")
+
+        with mock.patch.object(pubsub, "publish") as publish, self.captureOnCommitCallbacks(execute=True):
+            User.objects.bulk_upsert_from_workos(
+                [WorkOSUser(id="user_ada", email="ada@example.com", first_name="Ada", last_name="Lovelace")]
+            )
+
+        self.assertEqual(self.query_me()["lastName"], "Lovelace")
+        publish.assert_called_once_with(get_user_channel(self.user.pk), self.user.pk)
+
+    def test_counts_and_history(self):
+        created, updated, skipped = User.objects.bulk_upsert_from_workos(
+            [
+                WorkOSUser(id="user_ada", email="ada@example.com", first_name="Ada", last_name="Lovelace"),
+                WorkOSUser(id="user_alan", email="alan@example.com", first_name="Alan", last_name="Turing"),
+                # The email moved to another WorkOS user.
+                WorkOSUser(id="user_ada_2", email="ada@example.com", first_name="Ada", last_name="King"),
+            ]
+        )
+
+        self.assertEqual((created, updated, skipped), (1, 1, 1))
+        self.assertFalse(User.objects.filter(workos_user_id="user_ada_2").exists())
+        self.assertEqual(User.objects.get(workos_user_id="user_ada").last_name, "Lovelace")
+        history = set(User.history.values_list("workos_user_id", "history_type"))
+        self.assertEqual(history, {("user_ada", "+"), ("user_ada", "~"), ("user_alan", "+")})
+
+    def test_concurrently_created_user_is_counted_as_updated(self):
+        # Inserted by a concurrent login after the sync looked the users up.
+        rows = User.objects._bulk_upsert(
+            [User(email="ada@example.com", workos_user_id="user_ada", first_name="Ada", last_name="Lovelace")]
+        )
+
+        self.assertEqual([(row.pk, row.inserted) for row in rows], [(self.user.pk, False)])
+        self.assertEqual(User.objects.get(pk=self.user.pk).last_name, "Lovelace")
+
+
+class UserResponseCacheInvalidationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(
+            email="ada@example.com", workos_user_id="user_ada", first_name="Ada", last_name="Byron"
+        )
+        # The process tier of the cache outlives the rolled back test transactions.
+        cache.clear()
+        bump_model_version("accounts.user")
+        self.version = cache.get(MODEL_VERSION_CACHE_KEY.format("accounts.user"))
+
+    def get_version(self):
+        return cache.get(MODEL_VERSION_CACHE_KEY.format("accounts.user"))
+
+    def test_login_does_not_bump_the_version(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.force_login(self.user)
+
+        self.user.refresh_from_db()
+        self.assertIsNotNone(self.user.last_login)
+        self.assertEqual(self.get_version(), self.version)
+
+    def test_profile_update_bumps_the_version(self):
+        self.user.last_name = "Lovelace"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save(update_fields=["last_name", "last_login"])
+
+        self.assertNotEqual(self.get_version(), self.version)
+
+
+HISTORY_QUERY = """
+query History($after: String) {
+  user {
+    history(first: 2, after: $after) {
+      edges { cursor node { historyId historyType } }
+      pageInfo { hasPreviousPage hasNextPage endCursor }
+    }
+  }
+}
+"""
+
+
+class UserHistoryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(
+            email="ada@example.com", workos_user_id="user_ada", first_name="Ada", last_name="Byron"
+        )
+        for last_name in ("King", "Lovelace"):
+            self.user.last_name = last_name
+            self.user.save()
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def query_history(self, after=None):
+        response = self.client.post(
+            "/graphql/", {"query": HISTORY_QUERY, "variables": {"after": after}}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("errors", response.json())
+        return response.json()["data"]["user"]["history"]
+
+    def test_pages_through_the_history_latest_first(self):
+        history_ids = list(self.user.history.order_by("-history_date", "-history_id").values_list("pk", flat=True))
+        self.assertEqual(len(history_ids), 4)
+
+        first_page = self.query_history()
+        self.assertEqual([edge["node"]["historyId"] for edge in first_page["edges"]], history_ids[:2])
+        self.assertFalse(first_page["pageInfo"]["hasPreviousPage"])
+        self.assertTrue(first_page["pageInfo"]["hasNextPage"])
+
+        second_page = self.query_history(first_page["pageInfo"]["endCursor"])
+        self.assertEqual([edge["node"]["historyId"] for edge in second_page["edges"]], history_ids[2:])
+        self.assertTrue(second_page["pageInfo"]["hasPreviousPage"])
+        self.assertFalse(second_page["pageInfo"]["hasNextPage"])
+
+
+USERS_QUERY = """
+query Users($first: Int, $after: String, $last: Int, $before: String, $order: [UserOrder!], $email_Icontains: String) {
+  users(first: $first, after: $after, last: $last, before: $before, order: $order, email_Icontains: $email_Icontains) {
+    totalCount
+    isTotalCountExact
+    edges { node { email } }
+    pageInfo { hasPreviousPage hasNextPage startCursor endCursor }
+  }
+}
+"""
+
+
+class UsersConnectionTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create(
+            email="staff@example.com", workos_user_id="user_staff", first_name="Staff", last_name="User", is_staff=True
+        )
+        for name in ("ada", "alan", "grace"):
+            User.objects.create(email=f"{name}@example.com", workos_user_id=f"user_{name}", first_name=name.title())
+        cache.clear()
+
+    def query_users(self, **variables):
+        response = self.client.post(
+            "/graphql/", {"query": USERS_QUERY, "variables": variables}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_counts_the_users(self):
+        self.client.force_login(self.staff)
+        users = self.query_users(first=2)["data"]["users"]
+
+        self.assertEqual((users["totalCount"], users["isTotalCountExact"]), (4, True))
+        self.assertEqual(len(users["edges"]), 2)
+        self.assertTrue(users["pageInfo"]["hasNextPage"])
+
+    @override_settings(CONNECTION_COUNT_CAP=2)
+    def test_caps_the_count(self):
+        self.client.force_login(self.staff)
+        users = self.query_users(first=1, email_Icontains="a")["data"]["users"]
+
+        self.assertEqual((users["totalCount"], users["isTotalCountExact"]), (2, False))
+
+    def test_is_only_for_the_staff(self):
+        self.client.force_login(User.objects.get(workos_user_id="user_ada"))
+        response = self.query_users(first=2)
+
+        self.assertIsNone(response["data"]["users"])
+        self.assertEqual(len(response["errors"]), 1)
+
+    def test_pages_through_the_users_by_keyset(self):
+        self.client.force_login(self.staff)
+        emails = ["staff@example.com", "grace@example.com", "alan@example.com", "ada@example.com"]
+
+        first_page = self.query_users(first=3, order=["EMAIL_DESC"])["data"]["users"]
+        self.assertEqual([edge["node"]["email"] for edge in first_page["edges"]], emails[:3])
+        self.assertFalse(first_page["pageInfo"]["hasPreviousPage"])
+        self.assertTrue(first_page["pageInfo"]["hasNextPage"])
+
+        # The cursor is the position of the last user, it still holds when the users before it are deleted.
+        User.objects.filter(email="grace@example.com").delete()
+        cache.clear()
+        second_page = self.query_users(first=3, after=first_page["pageInfo"]["endCursor"], order=["EMAIL_DESC"])
+        second_page = second_page["data"]["users"]
+        self.assertEqual([edge["node"]["email"] for edge in second_page["edges"]], emails[3:])
+        self.assertTrue(second_page["pageInfo"]["hasPreviousPage"])
+        self.assertFalse(second_page["pageInfo"]["hasNextPage"])
+
+        previous_page = self.query_users(last=3, before=second_page["pageInfo"]["startCursor"], order=["EMAIL_DESC"])
+        previous_page = previous_page["data"]["users"]
+        self.assertEqual(
+            [edge["node"]["email"] for edge in previous_page["edges"]], ["staff@example.com", "alan@example.com"]
+        )
+        self.assertFalse(previous_page["pageInfo"]["hasPreviousPage"])
@@ -1,32 +1,177 @@
 # Standard Library Imports
+import asyncio
+import hashlib
+import logging
+import random
+import time
 from functools import wraps
 
 # Third Party Library Imports
+import httpx
+import jwt
+from asgiref.sync import sync_to_async
 from pydantic import BaseModel
+from workos import AsyncWorkOSClient
 from workos import WorkOSClient
+from workos.exceptions import AuthenticationException
+from workos.exceptions import AuthorizationException
+from workos.exceptions import BadRequestException
+from workos.exceptions import NotFoundException
+from workos.exceptions import ServerException
+from workos.session import Session
+from workos.types.user_management.session import AuthenticateWithSessionCookieFailureReason
 
 # Django Imports
 from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
 
+# App Imports
+from utils import metrics
+from utils.exceptions import AppException
+from utils.singleflight import Group
+
+
+logger = logging.getLogger(__name__)
 
 _client = None
+_async_client = None
+_async_client_loop = None
+_jwks_client = None
+
+# Failures where the request never reached WorkOS, safe to retry even for the one-time authorization codes.
+CONNECT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+# Failures which are safe to retry only for the idempotent calls.
+TRANSIENT_ERRORS = CONNECT_ERRORS + (httpx.ReadTimeout, httpx.RemoteProtocolError, ServerException)
+
+# Failures fetching the signing keys of WorkOS, safe to retry.
+JWKS_ERRORS = (jwt.PyJWKClientConnectionError,)
+
+# WorkOS rejected the session, these are cached for a short while to avoid hammering WorkOS with a bad session.
+INVALID_SESSION_ERRORS = (AuthenticationException, AuthorizationException, BadRequestException, NotFoundException)
+
+SESSION_CACHE_KEY = "workos:session:{}"
+INVALID_SESSION = "invalid"
+
+
+def _validate_settings():
+    if not settings.WORKOS_API_KEY:
+        raise ValueError("WORKOS_API_KEY setting is required")
+    if not settings.WORKOS_CLIENT_ID:
+        raise ValueError("WORKOS_CLIENT_ID setting is required")
+
+
+def _set_http_client(client, http_client):
+    """
+    Swap the default httpx client of the SDK with a pooled keep-alive one. The SDK doesn't expose the httpx options,
+    so this relies on its internals as of workos 5.32.0, which requirements.txt pins: check it when upgrading.
+    """
+    sdk_http_client = getattr(client, "_http_client", None)
+    if not isinstance(getattr(sdk_http_client, "_client", None), (httpx.Client, httpx.AsyncClient)):
+        raise ImproperlyConfigured(
+            "The WorkOS SDK doesn't hold an httpx client at _http_client._client anymore, update _set_http_client"
+        )
+    if isinstance(http_client, httpx.Client):
+        # The default async client can only be closed from a coroutine, neither holds a connection yet anyway.
+        sdk_http_client.close()
+    sdk_http_client._client = http_client
+
+
+def _get_http_client_options(client):
+    return {
+        "base_url": client.base_url,
+        "http2": settings.WORKOS_HTTP2,
+        "follow_redirects": True,
+        "timeout": _get_http_timeout(),
+        "limits": httpx.Limits(
+            max_connections=settings.WORKOS_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.WORKOS_MAX_CONNECTIONS,
+            keepalive_expiry=settings.WORKOS_KEEPALIVE_EXPIRY,
+        ),
+    }
+
+
+def _get_http_timeout():
+    return httpx.Timeout(settings.WORKOS_REQUEST_TIMEOUT, connect=settings.WORKOS_CONNECT_TIMEOUT)
 
 
 def get_workos_client():
     """Get or create WorkOS client instance."""
     global _client
     if not _client:
-        if not settings.WORKOS_API_KEY:
-            raise ValueError("WORKOS_API_KEY setting is required")
-        if not settings.WORKOS_CLIENT_ID:
-            raise ValueError("WORKOS_CLIENT_ID setting is required")
-        _client = WorkOSClient(
+        _validate_settings()
+        # The SDK passes the request timeout to httpx on every request.
+        client = WorkOSClient(
             api_key=settings.WORKOS_API_KEY,
             client_id=settings.WORKOS_CLIENT_ID,
+            request_timeout=_get_http_timeout(),
         )
+        _set_http_client(client, httpx.Client(**_get_http_client_options(client)))
+        _client = client
     return _client
 
 
+def get_async_workos_client():
+    """Get or create the async WorkOS client instance bound to the running event loop."""
+    global _async_client, _async_client_loop
+    loop = asyncio.get_running_loop()
+    if not _async_client or _async_client_loop is not loop:
+        _validate_settings()
+        client = AsyncWorkOSClient(
+            api_key=settings.WORKOS_API_KEY,
+            client_id=settings.WORKOS_CLIENT_ID,
+            request_timeout=_get_http_timeout(),
+        )
+        # httpx connection pools are bound to the event loop they were created in.
+        _set_http_client(client, httpx.AsyncClient(**_get_http_client_options(client)))
+        _async_client, _async_client_loop = client, loop
+    return _async_client
+
+
+def _get_retry_delay(attempt):
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(settings.WORKOS_RETRY_MAX_DELAY, settings.WORKOS_RETRY_BASE_DELAY * 2**attempt))
+
+
+def _call_with_retries(name, func, retry_on, **kwargs):
+    attempt = 0
+    while True:
+        start_time = time.perf_counter()
+        try:
+            result = func(**kwargs)
+            metrics.observe(f"workos.{name}.latency", time.perf_counter() - start_time)
+            return result
+        except retry_on as e:
+            metrics.incr(f"workos.{name}.errors")
+            if attempt >= settings.WORKOS_MAX_RETRIES:
+                raise
+            delay = _get_retry_delay(attempt)
+            logger.warning(f"WorkOS {name} failed with {type(e).__name__}, retrying in {delay:.3f}s")
+            metrics.incr(f"workos.{name}.retries")
+            time.sleep(delay)
+            attempt += 1
+
+
+async def _acall_with_retries(name, func, retry_on, **kwargs):
+    attempt = 0
+    while True:
+        start_time = time.perf_counter()
+        try:
+            result = await func(**kwargs)
+            metrics.observe(f"workos.{name}.latency", time.perf_counter() - start_time)
+            return result
+        except retry_on as e:
+            metrics.incr(f"workos.{name}.errors")
+            if attempt >= settings.WORKOS_MAX_RETRIES:
+                raise
+            delay = _get_retry_delay(attempt)
+            logger.warning(f"WorkOS {name} failed with {type(e).__name__}, retrying in {delay:.3f}s")
+            metrics.incr(f"workos.{name}.retries")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+
 class WorkOSUser(BaseModel):
     """WorkOS user representation."""
     id: str
@@ -44,11 +189,32 @@ def workos_call(func):
     return wrapper
 
 
+def async_workos_call(func):
+    """Decorator to ensure async WorkOS client is initialized."""
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        get_async_workos_client()
+        return await func(*args, **kwargs)
+    return wrapper
+
+
+def _to_workos_user(user_data) -> WorkOSUser:
+    return WorkOSUser(
+        id=user_data.id,
+        email=user_data.email,
+        first_name=user_data.first_name or "",
+        last_name=user_data.last_name or "",
+    )
+
+
 @workos_call
 def authenticate(code: str) -> WorkOSUser:
     """
     Authenticate user with WorkOS authorization code.
 
+    The code can be exchanged only once: concurrent exchanges of the same code, e.g. a login callback submitted twice,
+    share a single WorkOS call.
+
     Args:
         code: Authorization code from WorkOS OAuth flow
 
@@ -58,51 +224,349 @@ def authenticate(code: str) -> WorkOSUser:
     Raises:
         Exception: If authentication fails
     """
+    return _code_exchanges.do(_hash_credential(code), _exchange_code, code)
+
+
+@async_workos_call
+async def authenticate_async(code: str) -> WorkOSUser:
+    """
+    Async variant of `authenticate`, doesn't block the worker thread while waiting on WorkOS.
+
+    Args:
+        code: Authorization code from WorkOS OAuth flow
+
+    Returns:
+        WorkOSUser object with user information
+
+    Raises:
+        Exception: If authentication fails
+    """
+    return await _code_exchanges.ado(_hash_credential(code), _aexchange_code, code)
+
+
+class InvalidWorkOSSession(AppException):
+    pass
+
+
+class ExpiredWorkOSSession(InvalidWorkOSSession):
+    """
+    The access token of the session expired, `refresh_session` exchanges its refresh token for a new session.
+    """
+
+
+# Concurrent exchanges of a code (e.g. a login callback submitted twice), verifications and refreshes of a session
+# share a single WorkOS call.
+_code_exchanges = Group("workos.authenticate")
+_session_verifications = Group("workos.verify_session")
+_session_refreshes = Group("workos.refresh_session")
+
+
+def _hash_credential(credential):
+    # The raw credential never ends up as a key.
+    return hashlib.sha256(credential.encode("utf-8")).hexdigest()
+
+
+def _exchange_code(code) -> WorkOSUser:
     client = get_workos_client()
 
     # Exchange authorization code for access token and user profile
     # Note: client_id is configured on the WorkOSClient instance, not passed here
-    auth_response = client.user_management.authenticate_with_code(code=code)
+    # The code can be exchanged only once, so retry only when the request didn't reach WorkOS.
+    auth_response = _call_with_retries(
+        "authenticate", client.user_management.authenticate_with_code, CONNECT_ERRORS, code=code
+    )
 
-    user_data = auth_response.user
+    return _to_workos_user(auth_response.user)
 
-    return WorkOSUser(
-        id=user_data.id,
-        email=user_data.email,
-        first_name=user_data.first_name or "",
-        last_name=user_data.last_name or "",
+
+async def _aexchange_code(code) -> WorkOSUser:
+    client = get_async_workos_client()
+
+    auth_response = await _acall_with_retries(
+        "authenticate", client.user_management.authenticate_with_code, CONNECT_ERRORS, code=code
+    )
+
+    return _to_workos_user(auth_response.user)
+
+
+def _get_session_cache_key(sealed_session):
+    return SESSION_CACHE_KEY.format(_hash_credential(sealed_session))
+
+
+def _get_jwks_client(client):
+    """
+    Client of the WorkOS signing keys, shared by the sessions: the SDK creates one per session, which would fetch the
+    keys again for every verification.
+    """
+    global _jwks_client
+    if not _jwks_client:
+        _jwks_client = jwt.PyJWKClient(client.user_management.get_jwks_url())
+    return _jwks_client
+
+
+def _unseal_session(sealed_session):
+    try:
+        return Session.unseal_data(sealed_session, settings.WORKOS_COOKIE_PASSWORD)
+    except Exception as e:
+        raise InvalidWorkOSSession("Session cookie is invalid") from e
+
+
+def _get_session_cache_ttl(access_token):
+    """
+    Cache the session for the configured TTL, but never beyond the expiry of the session's access token.
+    """
+    ttl = settings.WORKOS_SESSION_CACHE_TTL
+    if access_token:
+        try:
+            expires_at = jwt.decode(access_token, options={"verify_signature": False})["exp"]
+            ttl = min(ttl, int(expires_at - time.time()))
+        except Exception:
+            pass
+    return ttl
+
+
+def _get_cached_session(cached):
+    metrics.incr("workos.verify_session.cache_hits")
+    if cached == INVALID_SESSION:
+        raise InvalidWorkOSSession("Session is invalid or expired")
+    return cached
+
+
+def _cache_session(cache_key, user_data, access_token) -> WorkOSUser:
+    workos_user = _to_workos_user(user_data)
+    ttl = _get_session_cache_ttl(access_token)
+    if ttl > 0:
+        cache.set(cache_key, workos_user, ttl)
+    return workos_user
+
+
+def _cache_invalid_session(cache_key):
+    cache.set(cache_key, INVALID_SESSION, settings.WORKOS_SESSION_NEGATIVE_CACHE_TTL)
+
+
+def _check_session(response, cache_key):
+    if response.authenticated:
+        return
+    if response.reason == AuthenticateWithSessionCookieFailureReason.INVALID_JWT:
+        # Not cached: the access token is verified locally, and the session is usable again once refreshed.
+        raise ExpiredWorkOSSession("Session is expired")
+    _cache_invalid_session(cache_key)
+    raise InvalidWorkOSSession(f"Session is invalid: {response.reason.value}")
+
+
+def _fetch_session(sealed_session, cache_key) -> WorkOSUser:
+    client = get_workos_client()
+
+    # The access token of the session is verified against the signing keys of WorkOS, which are fetched only once in a
+    # while.
+    session = client.user_management.load_sealed_session(
+        sealed_session=sealed_session, cookie_password=settings.WORKOS_COOKIE_PASSWORD
+    )
+    session.jwks = _get_jwks_client(client)
+    response = _call_with_retries("verify_session", session.authenticate, JWKS_ERRORS)
+    _check_session(response, cache_key)
+
+    return _cache_session(cache_key, response.user, _unseal_session(sealed_session)["access_token"])
+
+
+async def _afetch_session(sealed_session, cache_key) -> WorkOSUser:
+    client = get_async_workos_client()
+
+    session = await client.user_management.load_sealed_session(
+        sealed_session=sealed_session, cookie_password=settings.WORKOS_COOKIE_PASSWORD
+    )
+    session.jwks = _get_jwks_client(client)
+    # The verification is sync, and blocks while fetching the signing keys.
+    response = await _acall_with_retries(
+        "verify_session", sync_to_async(session.authenticate, thread_sensitive=False), JWKS_ERRORS
+    )
+    await sync_to_async(_check_session)(response, cache_key)
+
+    return await sync_to_async(_cache_session)(
+        cache_key, response.user, _unseal_session(sealed_session)["access_token"]
     )
 
 
 @workos_call
-def verify_session(session_id: str) -> WorkOSUser:
+def verify_session(sealed_session: str, use_cache: bool = True) -> WorkOSUser:
     """
-    Verify a WorkOS session and return user information.
+    Verify a WorkOS sealed session, i.e. the session cookie, and return user information.
+
+    Verified sessions are cached until the earlier of WORKOS_SESSION_CACHE_TTL and the session's own expiry,
+    invalid sessions for WORKOS_SESSION_NEGATIVE_CACHE_TTL. Concurrent verifications of the same session
+    share a single verification.
 
     Args:
-        session_id: WorkOS session ID to verify
+        sealed_session: WorkOS sealed session to verify
+        use_cache: Skip the cache lookup and always verify the session when False
 
     Returns:
         WorkOSUser object with user information
 
     Raises:
-        Exception: If session is invalid or expired
+        ExpiredWorkOSSession: If the access token of the session expired, see `refresh_session`
+        InvalidWorkOSSession: If session is invalid
+    """
+    cache_key = _get_session_cache_key(sealed_session)
+    if use_cache:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return _get_cached_session(cached)
+        metrics.incr("workos.verify_session.cache_misses")
+
+    return _session_verifications.do(cache_key, _fetch_session, sealed_session, cache_key)
+
+
+@async_workos_call
+async def verify_session_async(sealed_session: str, use_cache: bool = True) -> WorkOSUser:
     """
+    Async variant of `verify_session`.
+
+    Args:
+        sealed_session: WorkOS sealed session to verify
+        use_cache: Skip the cache lookup and always verify the session when False
+
+    Returns:
+        WorkOSUser object with user information
+
+    Raises:
+        ExpiredWorkOSSession: If the access token of the session expired, see `refresh_session_async`
+        InvalidWorkOSSession: If session is invalid
+    """
+    cache_key = _get_session_cache_key(sealed_session)
+    if use_cache:
+        cached = await cache.aget(cache_key)
+        if cached is not None:
+            return _get_cached_session(cached)
+        metrics.incr("workos.verify_session.cache_misses")
+
+    return await _session_verifications.ado(cache_key, _afetch_session, sealed_session, cache_key)
+
+
+def _get_refresh_options():
+    return {"session": {"seal_session": True, "cookie_password": settings.WORKOS_COOKIE_PASSWORD}}
+
+
+def _refresh_session(sealed_session):
     client = get_workos_client()
+    refresh_token = _unseal_session(sealed_session).get("refresh_token")
+    if not refresh_token:
+        raise InvalidWorkOSSession("Session has no refresh token")
+
+    # The refresh token can be used only once, so retry only when the request didn't reach WorkOS.
+    try:
+        auth_response = _call_with_retries(
+            "refresh_session",
+            client.user_management.authenticate_with_refresh_token,
+            CONNECT_ERRORS,
+            refresh_token=refresh_token,
+            **_get_refresh_options(),
+        )
+    except INVALID_SESSION_ERRORS as e:
+        # The expired session keeps failing to refresh, e.g. its refresh token was already used.
+        _cache_invalid_session(_get_session_cache_key(sealed_session))
+        raise InvalidWorkOSSession(str(e)) from e
+
+    cache_key = _get_session_cache_key(auth_response.sealed_session)
+    return _cache_session(cache_key, auth_response.user, auth_response.access_token), auth_response.sealed_session
+
+
+async def _arefresh_session(sealed_session):
+    client = get_async_workos_client()
+    refresh_token = _unseal_session(sealed_session).get("refresh_token")
+    if not refresh_token:
+        raise InvalidWorkOSSession("Session has no refresh token")
+
+    try:
+        auth_response = await _acall_with_retries(
+            "refresh_session",
+            client.user_management.authenticate_with_refresh_token,
+            CONNECT_ERRORS,
+            refresh_token=refresh_token,
+            **_get_refresh_options(),
+        )
+    except INVALID_SESSION_ERRORS as e:
+        await sync_to_async(_cache_invalid_session)(_get_session_cache_key(sealed_session))
+        raise InvalidWorkOSSession(str(e)) from e
 
-    # Authenticate the session
-    session = client.user_management.authenticate_with_session(
-        session_id=session_id,
-    )
+    cache_key = _get_session_cache_key(auth_response.sealed_session)
+    workos_user = await sync_to_async(_cache_session)(cache_key, auth_response.user, auth_response.access_token)
+    return workos_user, auth_response.sealed_session
 
-    user_data = session.user
 
-    return WorkOSUser(
-        id=user_data.id,
-        email=user_data.email,
-        first_name=user_data.first_name or "",
-        last_name=user_data.last_name or "",
-    )
+@workos_call
+def refresh_session(sealed_session: str):
+    """
+    Exchange the refresh token of a WorkOS sealed session for a new session, e.g. once `verify_session` raised
+    ExpiredWorkOSSession. The new sealed session replaces the session cookie: the refresh token of the previous one
+    can't be used again. Concurrent refreshes of the same session share a single WorkOS call.
+
+    Args:
+        sealed_session: WorkOS sealed session to refresh
+
+    Returns:
+        Tuple of (WorkOSUser, new sealed session)
+
+    Raises:
+        InvalidWorkOSSession: If the session can't be refreshed
+    """
+    return _session_refreshes.do(_get_session_cache_key(sealed_session), _refresh_session, sealed_session)
+
+
+@async_workos_call
+async def refresh_session_async(sealed_session: str):
+    """
+    Async variant of `refresh_session`.
+
+    Args:
+        sealed_session: WorkOS sealed session to refresh
+
+    Returns:
+        Tuple of (WorkOSUser, new sealed session)
+
+    Raises:
+        InvalidWorkOSSession: If the session can't be refreshed
+    """
+    return await _session_refreshes.ado(_get_session_cache_key(sealed_session), _arefresh_session, sealed_session)
+
+
+def invalidate_session_cache(sealed_session: str):
+    """
+    Drop the cached verification of the session, e.g. when the user logs out.
+    """
+    cache.delete(_get_session_cache_key(sealed_session))
+
+
+@workos_call
+def iter_user_pages(organization_id: str = None, after: str = None, limit: int = 100):
+    """
+    Stream the WorkOS users page by page, oldest first, without holding more than one page in memory.
+
+    Args:
+        organization_id: Optional organization to list the users of
+        after: Optional cursor to resume the listing from
+        limit: Page size, WorkOS allows at most 100
+
+    Yields:
+        Tuple of (list of WorkOSUser, cursor of the next page or None on the last page)
+    """
+    client = get_workos_client()
+
+    while True:
+        page = _call_with_retries(
+            "list_users",
+            client.user_management.list_users,
+            TRANSIENT_ERRORS,
+            organization_id=organization_id,
+            limit=limit,
+            after=after,
+            order="asc",
+        )
+        after = page.list_metadata.after
+        yield [_to_workos_user(user_data) for user_data in page.data], after
+
+        if not after:
+            return
 
 
 @workos_call
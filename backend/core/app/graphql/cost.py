@@ -0,0 +1,251 @@
+# Standard Library Imports
+from typing import NamedTuple
+
+# Third Party Library Imports
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from graphene.utils.str_converters import to_camel_case
+from graphene.utils.str_converters import to_snake_case
+from graphene_django_optimizer.utils import noop
+from graphql import FieldNode
+from graphql import FragmentDefinitionNode
+from graphql import FragmentSpreadNode
+from graphql import GraphQLError
+from graphql import InlineFragmentNode
+from graphql import SchemaMetaFieldDef
+from graphql import TypeMetaFieldDef
+from graphql import TypeNameMetaFieldDef
+from graphql import ValidationRule
+from graphql import get_named_type
+from graphql import get_nullable_type
+from graphql import get_operation_ast
+from graphql import is_introspection_type
+from graphql import is_leaf_type
+from graphql import is_list_type
+from graphql import value_from_ast_untyped
+
+
+PAGINATION_ARGUMENTS = ("first", "last")
+
+
+class QueryCost(NamedTuple):
+    cost: int
+    depth: int
+
+    def to_dict(self):
+        return {
+            "requestedQueryCost": self.cost,
+            "maximumAvailable": settings.GRAPHQL_MAX_QUERY_COST,
+            "depth": self.depth,
+            "maximumDepth": settings.GRAPHQL_MAX_QUERY_DEPTH,
+        }
+
+
+def field_costs(**weights):
+    """
+    Class decorator declaring the weight of the expensive fields of a graphene type, by their python name.
+
+    By default a field returning an object costs 1 and a scalar field is free.
+    """
+
+    def decorator(cls):
+        cls._field_costs = {to_camel_case(name): weight for name, weight in weights.items()}
+        return cls
+
+    return decorator
+
+
+def _get_field_weight(parent_type, field_name, field_type):
+    weights = getattr(getattr(parent_type, "graphene_type", None), "__dict__", {}).get("_field_costs", {})
+    if field_name in weights:
+        return weights[field_name]
+    return 0 if is_leaf_type(get_named_type(field_type)) else 1
+
+
+def _is_optimized(parent_type, field_name, field):
+    """
+    Whether the query optimizer loads the field along with the queryset of its parent, i.e. with a single query or
+    join for all the parents: a model relation resolved as is, or a resolver with select_related or prefetch_related
+    hints. See utils.graphql.query_optimizer.
+    """
+    hints = getattr(field.resolve, "optimization_hints", None)
+    if hints is not None:
+        return hints.select_related is not noop or hints.prefetch_related is not noop
+
+    graphene_type = getattr(parent_type, "graphene_type", None)
+    model = getattr(getattr(graphene_type, "_meta", None), "model", None)
+    name = to_snake_case(field_name)
+    if model is None or hasattr(graphene_type, f"resolve_{name}"):
+        return False
+
+    try:
+        return model._meta.get_field(name).is_relation
+    except FieldDoesNotExist:
+        return False
+
+
+def _get_field(schema, parent_type, name):
+    if name == "__typename":
+        return TypeNameMetaFieldDef
+    if parent_type is schema.query_type and name in ("__schema", "__type"):
+        return SchemaMetaFieldDef if name == "__schema" else TypeMetaFieldDef
+    return parent_type.fields.get(name)
+
+
+def _get_list_size(node, variables):
+    for argument in node.arguments:
+        if argument.name.value in PAGINATION_ARGUMENTS:
+            value = value_from_ast_untyped(argument.value, variables)
+            if isinstance(value, int):
+                return max(value, 0)
+    return None
+
+
+class _CostAnalysis(object):
+    def __init__(self, schema, fragments, variables):
+        self.schema = schema
+        self.fragments = fragments
+        self.variables = variables or {}
+        self.depth = 0
+
+    def selection_cost(self, parent_type, selection_set, depth, paginated=False, visited=(), introspection=False):
+        """
+        Cost of the selections as (cost per item of the parent, cost once per operation). Every field costs its weight
+        plus the cost of its selections multiplied by the number of items it may return.
+
+        The number of items is the first/last argument of the field, or GRAPHQL_DEFAULT_LIST_SIZE for the lists
+        without one. The edges of a paginated connection aren't multiplied again. The fields loaded by the query
+        optimizer along with their parent cost their weight once, whatever the number of parents.
+
+        Introspection is answered from the schema without touching the database, its object fields cost a nominal 1
+        once but count toward the depth like any other.
+        """
+        cost, cost_once = 0, 0
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                name = selection.name.value
+                field = _get_field(self.schema, parent_type, name)
+                if field is None:
+                    continue
+
+                self.depth = max(self.depth, depth)
+                field_type = get_named_type(field.type)
+                if introspection or is_introspection_type(field_type):
+                    if selection.selection_set:
+                        children = self.selection_cost(
+                            field_type, selection.selection_set, depth + 1, visited=visited, introspection=True
+                        )
+                        cost_once += 1 + sum(children)
+                    continue
+
+                weight = _get_field_weight(parent_type, name, field.type)
+                if _is_optimized(parent_type, name, field):
+                    cost_once += weight
+                else:
+                    cost += weight
+                if not selection.selection_set:
+                    continue
+
+                list_size = _get_list_size(selection, self.variables)
+                is_list = is_list_type(get_nullable_type(field.type))
+                if list_size is None and is_list and not paginated:
+                    list_size = settings.GRAPHQL_DEFAULT_LIST_SIZE
+
+                children, children_once = self.selection_cost(
+                    field_type,
+                    selection.selection_set,
+                    depth + 1,
+                    paginated=list_size is not None and not is_list,
+                    visited=visited,
+                )
+                cost += children * (list_size if list_size is not None else 1)
+                cost_once += children_once
+
+            elif isinstance(selection, InlineFragmentNode):
+                fragment_type = (
+                    self.schema.get_type(selection.type_condition.name.value) if selection.type_condition else None
+                )
+                children, children_once = self.selection_cost(
+                    fragment_type or parent_type, selection.selection_set, depth, paginated, visited, introspection
+                )
+                cost += children
+                cost_once += children_once
+
+            elif isinstance(selection, FragmentSpreadNode):
+                name = selection.name.value
+                fragment = self.fragments.get(name)
+                # Fragment cycles are reported by the NoFragmentCycles rule.
+                if fragment is None or name in visited:
+                    continue
+
+                fragment_type = self.schema.get_type(fragment.type_condition.name.value)
+                children, children_once = self.selection_cost(
+                    fragment_type, fragment.selection_set, depth, paginated, (*visited, name), introspection
+                )
+                cost += children
+                cost_once += children_once
+
+        return cost, cost_once
+
+
+def analyze_query_cost(schema, document, operation_name=None, variables=None):
+    """
+    Static cost and depth of the operation, without executing it. None if the operation isn't in the document.
+    """
+    operation_ast = get_operation_ast(document, operation_name)
+    if operation_ast is None:
+        return None
+
+    fragments = {
+        definition.name.value: definition
+        for definition in document.definitions
+        if isinstance(definition, FragmentDefinitionNode)
+    }
+    root_type = schema.get_root_type(operation_ast.operation)
+    analysis = _CostAnalysis(schema, fragments, variables)
+    cost, cost_once = analysis.selection_cost(root_type, operation_ast.selection_set, depth=1)
+    return QueryCost(cost=cost + cost_once, depth=analysis.depth)
+
+
+class QueryCostRule(ValidationRule):
+    """
+    Rejects the operations costing more than GRAPHQL_MAX_QUERY_COST or nested deeper than GRAPHQL_MAX_QUERY_DEPTH.
+
+    The cost depends on the variables, so the rule isn't part of the cached validation. Use get_query_cost_rule to
+    bind the variables of the request.
+    """
+
+    variables = None
+    operation_name = None
+    # Receives the QueryCost of the operation.
+    result = None
+
+    def enter_document(self, node, *args):
+        query_cost = analyze_query_cost(self.context.schema, node, self.operation_name, self.variables)
+        if query_cost is None:
+            return self.BREAK
+
+        self.result.append(query_cost)
+        if query_cost.depth > settings.GRAPHQL_MAX_QUERY_DEPTH:
+            self.report_error(
+                GraphQLError(
+                    f"Query depth {query_cost.depth} exceeds the maximum depth of {settings.GRAPHQL_MAX_QUERY_DEPTH}."
+                )
+            )
+
+        if query_cost.cost > settings.GRAPHQL_MAX_QUERY_COST:
+            self.report_error(
+                GraphQLError(
+                    f"Query cost {query_cost.cost} exceeds the maximum cost of {settings.GRAPHQL_MAX_QUERY_COST}."
+                )
+            )
+
+        return self.BREAK
+
+
+def get_query_cost_rule(variables, operation_name, result):
+    return type(
+        "BoundQueryCostRule",
+        (QueryCostRule,),
+        {"variables": variables, "operation_name": operation_name, "result": result},
+    )
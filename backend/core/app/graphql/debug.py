@@ -0,0 +1,126 @@
+# Standard Library Imports
+import json
+import time
+from contextvars import ContextVar
+
+# Third Party Library Imports
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from graphene_django.debug.middleware import DjangoDebugContext
+from graphene_django.debug.sql.types import DjangoDebugSQL
+
+# App Imports
+from utils.graphql.dataloaders import DataLoaderExecutionContext
+
+
+# Debug context of the operation being executed, the SQL queries executed meanwhile are recorded in it.
+_debug_context = ContextVar("graphql_debug_context", default=None)
+
+
+class DebugContext(DjangoDebugContext):
+    """
+    Same as DjangoDebugContext, except that the SQL queries are recorded by record_debug_sql instead of by wrapping
+    the cursors of the current thread: under async execution the resolvers query from the threads of sync_to_async.
+    """
+
+    def enable_instrumentation(self):
+        pass
+
+    def disable_instrumentation(self):
+        pass
+
+    def add_query(self, connection, cursor, sql, params, many, start_time, stop_time):
+        duration = stop_time - start_time
+        self.object.sql.append(
+            DjangoDebugSQL(
+                vendor=connection.vendor,
+                alias=connection.alias,
+                sql=sql if many else connection.ops.last_executed_query(cursor, sql, params),
+                duration=duration,
+                raw_sql=sql,
+                params=json.dumps(params, default=str),
+                start_time=start_time,
+                stop_time=stop_time,
+                is_slow=duration > 10,
+                is_select=sql.lower().strip().startswith("select"),
+            )
+        )
+
+
+def record_debug_sql(execute, sql, params, many, context):
+    debug = _debug_context.get()
+    if debug is None:
+        return execute(sql, params, many, context)
+
+    start_time = time.time()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        debug.add_query(context["connection"], context["cursor"].cursor, sql, params, many, start_time, time.time())
+
+
+@receiver(connection_created)
+def install_debug_recorder(sender, connection, **kwargs):
+    if record_debug_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_debug_sql)
+
+
+class DebugExecutionContext(DataLoaderExecutionContext):
+    """
+    Execution of the operations selecting _debug, answered by DjangoDebugMiddleware: the SQL queries of the operation
+    are recorded whichever thread executes them, and the _debug field is only resolved once the other root fields
+    completed, so that it lists all of their queries.
+    """
+
+    def execute_operation(self, operation, root_value):
+        debug = self.context_value.django_debug = DebugContext()
+        token = _debug_context.set(debug)
+        try:
+            result = super().execute_operation(operation, root_value)
+        finally:
+            _debug_context.reset(token)
+        return self.record(debug, result) if self.is_awaitable(result) else result
+
+    @staticmethod
+    async def record(debug, result):
+        # The coroutine runs in the context of its caller, where the debug context isn't set.
+        token = _debug_context.set(debug)
+        try:
+            return await result
+        finally:
+            _debug_context.reset(token)
+
+    def execute_fields(self, parent_type, source_value, path, fields):
+        return self.execute_debug_last(super().execute_fields, parent_type, source_value, path, fields)
+
+    def execute_fields_serially(self, parent_type, source_value, path, fields):
+        return self.execute_debug_last(super().execute_fields_serially, parent_type, source_value, path, fields)
+
+    def execute_debug_last(self, execute_fields, parent_type, source_value, path, fields):
+        debug_fields = {key: nodes for key, nodes in fields.items() if nodes[0].name.value == "_debug"}
+        if path is not None or not debug_fields or len(debug_fields) == len(fields):
+            return execute_fields(parent_type, source_value, path, fields)
+
+        results = execute_fields(
+            parent_type, source_value, path, {key: nodes for key, nodes in fields.items() if key not in debug_fields}
+        )
+
+        def add_debug(results):
+            debug_results = execute_fields(parent_type, source_value, path, debug_fields)
+            if self.is_awaitable(debug_results):
+                return merge_debug(results, debug_results)
+            results.update(debug_results)
+            return {key: results[key] for key in fields if key in results}
+
+        async def merge_debug(results, debug_results):
+            results.update(await debug_results)
+            return {key: results[key] for key in fields if key in results}
+
+        if not self.is_awaitable(results):
+            return add_debug(results)
+
+        async def await_results():
+            results_with_debug = add_debug(await results)
+            return await results_with_debug if self.is_awaitable(results_with_debug) else results_with_debug
+
+        return await_results()
@@ -1,22 +1,262 @@
 # Standard Library Imports
+import inspect
 import logging
+import random
+import time
+from collections import Counter
+from contextvars import ContextVar
+from functools import lru_cache
+from functools import partial
+
+# Third Party Library Imports
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models import QuerySet
+from django.dispatch import receiver
+from graphene.types.resolver import attr_resolver
+from graphene.types.resolver import dict_or_attr_resolver
+from graphene.types.resolver import dict_resolver
+from graphql import FieldNode
+from graphql import MiddlewareManager
+from graphql import get_named_type
+from graphql import is_leaf_type
+from graphql import is_object_type
 
 # App Imports
+from utils import metrics
 from utils.graphql.exceptions import PermissionDenied
+from utils.graphql.query_budget import get_query_shape
 
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_RESOLVERS = (attr_resolver, dict_resolver, dict_or_attr_resolver)
+
+# Span of the resolver being traced, the SQL queries executed meanwhile are counted against it.
+_current_span = ContextVar("graphql_resolver_span", default=None)
+
 
 class ErrorLoggingMiddleware(object):
     def resolve(self, next, root, info, **args):
         try:
-            return next(root, info, **args)
+            result = next(root, info, **args)
         except PermissionDenied as e:
             # raise permission denied errors to UI.
             raise e
         except Exception as e:
-            logger.exception(
-                "[Graphql Error] Graphql execution failed with errors: {}".format(str(e)),
-            )
+            self.log_error(e)
             raise e
+
+        if inspect.isawaitable(result):
+            return self.await_result(result)
+
+        return result
+
+    async def await_result(self, result):
+        try:
+            return await result
+        except PermissionDenied as e:
+            raise e
+        except Exception as e:
+            self.log_error(e)
+            raise e
+
+    @staticmethod
+    def log_error(e):
+        logger.exception(
+            "[Graphql Error] Graphql execution failed with errors: {}".format(str(e)),
+        )
+
+
+def _resolve_in_thread(next, root, info, **args):
+    result = next(root, info, **args)
+    # Querysets are lazy, evaluate them here rather than on the event loop.
+    return list(result) if isinstance(result, QuerySet) else result
+
+
+class SyncResolverMiddleware(object):
+    """
+    Runs the synchronous resolvers in the thread of the request when the query is executed asynchronously, so that
+    they can use the ORM. The default resolvers of scalar fields only read attributes and stay on the event loop.
+
+    This only keeps the event loop free while they run, it doesn't parallelize them: sync_to_async is thread
+    sensitive, so the sync resolvers of a request run one at a time on its single thread. That's deliberate, they
+    share the connection, and the transaction, of the request, which Django connections don't allow across threads.
+    The sibling fields overlap only when their resolvers are async, e.g. awaiting WorkOS or a DataLoader batch.
+
+    It has to be the first middleware, graphql-core wraps the resolvers with the first middleware innermost.
+    """
+
+    def resolve(self, next, root, info, **args):
+        if inspect.iscoroutinefunction(next) or self.is_trivial(next, info):
+            return next(root, info, **args)
+
+        # Thread sensitive, see the docstring.
+        return sync_to_async(_resolve_in_thread, thread_sensitive=True)(next, root, info, **args)
+
+    @staticmethod
+    def is_trivial(resolver, info):
+        return (
+            isinstance(resolver, partial)
+            and resolver.func in DEFAULT_RESOLVERS
+            and is_leaf_type(get_named_type(info.return_type))
+        )
+
+
+@lru_cache(maxsize=8)
+def get_trivial_resolvers(schema):
+    """
+    Default resolvers of the scalar fields of the schema, which only read an attribute of their parent. graphene
+    creates one resolver per field, so they identify the fields.
+    """
+    resolvers = set()
+    for graphql_type in schema.type_map.values():
+        if not is_object_type(graphql_type) or graphql_type.name.startswith("__"):
+            continue
+
+        for field in graphql_type.fields.values():
+            if (
+                isinstance(field.resolve, partial)
+                and field.resolve.func in DEFAULT_RESOLVERS
+                and is_leaf_type(get_named_type(field.type))
+            ):
+                resolvers.add(field.resolve)
+
+    return frozenset(resolvers)
+
+
+class SelectiveMiddlewareManager(MiddlewareManager):
+    """
+    Leaves the trivial fields unwrapped, see get_trivial_resolvers. They are the bulk of the fields of a response, and
+    calling every middleware for each of them costs more than resolving them.
+    """
+
+    def __init__(self, *middlewares, trivial_resolvers=frozenset()):
+        super().__init__(*middlewares)
+        self.trivial_resolvers = trivial_resolvers
+
+    def get_field_resolver(self, field_resolver):
+        if field_resolver in self.trivial_resolvers:
+            return field_resolver
+        return super().get_field_resolver(field_resolver)
+
+
+class _Span(object):
+    __slots__ = ("field", "start_time", "queries")
+
+    def __init__(self, field):
+        self.field = field
+        self.start_time = time.perf_counter()
+        self.queries = 0
+
+    def add_query(self, sql):
+        self.queries += 1
+
+    def finish(self):
+        metrics.observe(f"graphql.resolvers.{self.field}.latency", time.perf_counter() - self.start_time)
+        if self.queries:
+            metrics.incr(f"graphql.resolvers.{self.field}.queries", self.queries)
+
+
+def count_queries(execute, sql, params, many, context):
+    span = _current_span.get()
+    if span is not None:
+        span.add_query(sql)
+    return execute(sql, params, many, context)
+
+
+@receiver(connection_created)
+def install_query_counter(sender, connection, **kwargs):
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_queries)
+
+
+def should_trace():
+    return random.random() < settings.GRAPHQL_TRACE_SAMPLE_RATE
+
+
+class ResolverTracer(object):
+    """
+    Times the resolvers and counts their SQL queries, aggregated per field (e.g. User.groups) in the
+    graphql.resolvers.* metrics.
+
+    It is only added to a sample of the operations, see should_trace, and never wraps the trivial fields. It has to
+    come right after SyncResolverMiddleware, so that the time spent in the thread of the request is included and the
+    queries executed there are counted.
+    """
+
+    def get_span(self, info):
+        return _Span(f"{info.parent_type.name}.{info.field_name}")
+
+    def resolve(self, next, root, info, **args):
+        span = self.get_span(info)
+        token = _current_span.set(span)
+        is_async = False
+        try:
+            result = next(root, info, **args)
+            if inspect.isawaitable(result):
+                is_async = True
+                return self.trace_async(span, result)
+
+            # Evaluate the querysets within the span, their queries would run when the list is completed otherwise.
+            return list(result) if isinstance(result, QuerySet) else result
+        finally:
+            _current_span.reset(token)
+            if not is_async:
+                span.finish()
+
+    @staticmethod
+    async def trace_async(span, result):
+        # The resolvers run by sync_to_async get a copy of the context, including the span, when awaited.
+        token = _current_span.set(span)
+        try:
+            return await result
+        finally:
+            _current_span.reset(token)
+            span.finish()
+
+
+class _FieldQueries(object):
+    __slots__ = ("detector", "path")
+
+    def __init__(self, detector, path):
+        self.detector = detector
+        self.path = path
+
+    def add_query(self, sql):
+        self.detector.add_query(self.path, sql)
+
+    def finish(self):
+        pass
+
+
+class NPlusOneDetector(ResolverTracer):
+    """
+    Dev variant of the tracer logging the N+1 patterns as they happen: the resolvers of a field executing a query of
+    the same shape GRAPHQL_N_PLUS_ONE_THRESHOLD times in an operation, e.g. a relation loaded item by item.
+
+    It keeps the counts of an operation, use a new instance per operation. See also the check_query_budgets command.
+    """
+
+    def __init__(self, threshold=None):
+        self.threshold = settings.GRAPHQL_N_PLUS_ONE_THRESHOLD if threshold is None else threshold
+        self.counts = Counter()
+
+    def get_span(self, info):
+        # The path without the list indices, e.g. user.groups.permissions.contentType.
+        path = ".".join(key for key in info.path.as_list() if isinstance(key, str))
+        return _FieldQueries(self, path)
+
+    def add_query(self, path, sql):
+        key = (path, get_query_shape(sql))
+        self.counts[key] += 1
+        if self.counts[key] == self.threshold:
+            logger.warning("[N+1] %s executed the same query %s times: %s", path, self.threshold, key[1])
+
+
+def selects_debug(operation_ast):
+    return operation_ast is not None and any(
+        isinstance(selection, FieldNode) and selection.name.value == "_debug"
+        for selection in operation_ast.selection_set.selections
+    )
@@ -7,6 +7,8 @@ from graphql_jwt import Verify
 # App Imports
 from accounts.gql.mutations.login import Login
 from accounts.gql.resolver import get_user_query
+from accounts.gql.resolver import get_users_query
+from accounts.gql.subscriptions import UserSubscription
 
 
 class Query(graphene.ObjectType):
@@ -14,6 +16,8 @@ class Query(graphene.ObjectType):
     # This is used for viewing the SQL queries while running queries in graphiql.
     debug = graphene.Field(DjangoDebug, name="_debug")
     user = get_user_query()
+    # Directory of the users, for the staff.
+    users = get_users_query()
 
 
 class Mutations(graphene.ObjectType):
@@ -24,4 +28,8 @@ class Mutations(graphene.ObjectType):
     refresh_auth_token = Refresh.Field()
 
 
-schema = graphene.Schema(query=Query, mutation=Mutations)
+class Subscription(UserSubscription, graphene.ObjectType):
+    pass
+
+
+schema = graphene.Schema(query=Query, mutation=Mutations, subscription=Subscription)
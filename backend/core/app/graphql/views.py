@@ -1,22 +1,94 @@
 # Standard Library Imports
+import asyncio
+import inspect
+import json
 import logging
 
 # Third Party Library Imports
+from asgiref.sync import async_to_sync
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.contrib.auth.mixins import AccessMixin
+from django.db import close_old_connections
+from django.db import connection
+from django.db import transaction
+from django.http import HttpResponse
+from django.http import HttpResponseNotAllowed
+from django.http import StreamingHttpResponse
+from django.http.response import HttpResponseBadRequest
+from django.utils.decorators import method_decorator
+from django.utils.functional import classproperty
+from django.views.decorators.csrf import ensure_csrf_cookie
+from graphene_django.constants import MUTATION_ERRORS_FLAG
+from graphene_django.debug import DjangoDebugMiddleware
+from graphene_django.settings import graphene_settings
 from graphene_django.views import GraphQLView
+from graphene_django.views import HttpError
+from graphene_django.views import set_rollback
+from graphql import ExecutionResult
+from graphql import MiddlewareManager
+from graphql import OperationType
+from graphql import create_source_event_stream
+from graphql import execute
+from graphql import get_operation_ast
+from graphql import validate
+from graphql import validate_schema
 from graphql.error.graphql_error import GraphQLError
 from graphql.error.syntax_error import GraphQLSyntaxError
 
+# Same App Imports
+from .cost import get_query_cost_rule
+from .debug import DebugExecutionContext
+from .middlewares import NPlusOneDetector
+from .middlewares import ResolverTracer
+from .middlewares import SelectiveMiddlewareManager
+from .middlewares import SyncResolverMiddleware
+from .middlewares import get_trivial_resolvers
+from .middlewares import selects_debug
+from .middlewares import should_trace
+
 # App Imports
+from persisted_queries.store import get_persisted_query
+from persisted_queries.store import persist_query
+from utils import metrics
+from utils.graphql.dataloaders import DataLoaderExecutionContext
+from utils.graphql.dataloaders import clear_loaders
+from utils.graphql.documents import get_validated_document
+from utils.graphql.exceptions import ResponseError
 from utils.graphql.exceptions import format_graphql_error
 from utils.graphql.exceptions import format_internal_error
+from utils.graphql.exceptions import format_response_error
+from utils.graphql.response_cache import aexecute_once
+from utils.graphql.response_cache import execute_once
+from utils.graphql.response_cache import lookup_response
+from utils.graphql.subscriptions import get_subscription_key
+from utils.graphql.subscriptions import hub
+from utils.replicas import read_from_replica
+from utils.sse import format_message
 
 
 logger = logging.getLogger(__name__)
 
 
 class CustomGraphQLView(GraphQLView):
+    """
+    With batch=True, the view takes a list of operations and responds with the list of their results.
+
+    The operations of a batch share the request as their context, so the per-request caches and the DataLoaders are
+    reused across them. The loaders are dropped after a mutation, the following operations see its writes.
+
+    The queries read from the replica when there is one, see utils.replicas. Subscriptions are only served by
+    GraphQLSubscriptionView.
+
+    This is the sync base of AsyncGraphQLView, which serves the API. It can't run the async resolvers (e.g. the login
+    mutation) on its own, so don't route requests to it.
+    """
+
+    execution_context_class = DataLoaderExecutionContext
+    subscriptions = False
+    resolver_tracer = ResolverTracer()
+    debug_middleware = DjangoDebugMiddleware()
+
     @staticmethod
     def format_error(error):
         try:
@@ -26,16 +98,548 @@ class CustomGraphQLView(GraphQLView):
             if isinstance(error, GraphQLError):
                 return format_graphql_error(error)
 
+            # Errors of the request itself, e.g. an invalid body or a batch over the size limit.
+            return GraphQLView.format_error(error)
+
         except Exception as e:
             return format_internal_error(e)
 
+    def parse_body(self, request):
+        data = super().parse_body(request)
+        if self.batch and isinstance(data, list):
+            if len(data) > settings.GRAPHQL_MAX_BATCH_SIZE:
+                raise HttpError(
+                    HttpResponseBadRequest(
+                        f"Batch requests are limited to {settings.GRAPHQL_MAX_BATCH_SIZE} operations."
+                    )
+                )
+
+            metrics.incr("graphql.batch.requests")
+            metrics.incr("graphql.batch.operations", len(data))
+        return data
+
+    @staticmethod
+    def get_persisted_query_hash(request, data):
+        extensions = request.GET.get("extensions") or data.get("extensions")
+        if not extensions:
+            return None
+
+        if isinstance(extensions, str):
+            try:
+                extensions = json.loads(extensions)
+            except Exception:
+                raise HttpError(HttpResponseBadRequest("Extensions are invalid JSON."))
+
+        persisted_query = extensions.get("persistedQuery") if isinstance(extensions, dict) else None
+        return persisted_query.get("sha256Hash") if isinstance(persisted_query, dict) else None
+
+    def resolve_persisted_query(self, request, data):
+        """
+        Automatic persisted queries: clients send the sha256 hash of the query instead of the query.
+
+        An unknown hash is answered with PersistedQueryNotFound, upon which the client sends the hash along with the
+        query to register it. Hash-only GET requests are allowed for queries, so their responses can be cached by
+        the CDN.
+        """
+        sha256_hash = self.get_persisted_query_hash(request, data)
+        if not sha256_hash:
+            return data
+
+        query = request.GET.get("query") or data.get("query")
+        if query:
+            persist_query(sha256_hash, query, self.is_valid_query)
+            return data
+
+        data = data.copy()
+        data["query"] = get_persisted_query(sha256_hash)
+        return data
+
+    def is_valid_query(self, query):
+        # The document is cached, the execution of the request doesn't parse and validate it again.
+        try:
+            _, validation_errors = get_validated_document(self.schema.graphql_schema, query, self.validation_rules)
+        except Exception:
+            return False
+        return not validation_errors
+
+    def get_persisted_query_error_response(self, request, error):
+        response = format_response_error(error)
+        # Clients implementing APQ look for the error code in the extensions.
+        response["extensions"] = {"code": error.code}
+        return self.json_encode(request, {"errors": [response]}), 200
+
+    def get_execution_response(self, request, execution_result, id=None, show_graphiql=False):
+        """
+        Same as the second half of GraphQLView.get_response, formats the execution result into the json response and
+        its status code.
+        """
+        if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+            set_rollback()
+
+        status_code = 200
+        if not execution_result:
+            return None, status_code
+
+        response = {}
+        if execution_result.errors:
+            set_rollback()
+            response["errors"] = [self.format_error(e) for e in execution_result.errors]
+
+        if execution_result.errors and any(not getattr(e, "path", None) for e in execution_result.errors):
+            status_code = 400
+        else:
+            response["data"] = execution_result.data
+
+        if execution_result.extensions:
+            response["extensions"] = execution_result.extensions
+
+        if self.batch:
+            response["id"] = id
+            response["status"] = status_code
+
+        return self.json_encode(request, response, pretty=show_graphiql), status_code
+
+    def get_response(self, request, data, show_graphiql=False):
+        if self.batch:
+            # Set by the mutations with errors, each operation of the batch is rolled back on its own.
+            setattr(request, MUTATION_ERRORS_FLAG, False)
+
+        try:
+            data = self.resolve_persisted_query(request, data)
+        except ResponseError as e:
+            return self.get_persisted_query_error_response(request, e)
+
+        query, variables, operation_name, id = self.get_graphql_params(request, data)
+        execution_result = self.execute_graphql_request(
+            request, data, query, variables, operation_name, show_graphiql
+        )
+        return self.get_execution_response(request, execution_result, id, show_graphiql)
+
+    def prepare_graphql_request(self, request, query, variables, operation_name, show_graphiql=False):
+        """
+        First half of GraphQLView.execute_graphql_request, except that the parsed and validated documents are cached
+        across requests, see utils.graphql.documents. The responses of the queries can be cached as well, see
+        utils.graphql.response_cache.
+
+        The cost of the query is checked against the budget before execution, and reported in the extensions of the
+        response, see app.graphql.cost.
+
+        Returns the document, the execute options and the extensions, or the result to return right away (an
+        ExecutionResult with the errors, or None to show graphiql).
+        """
+        if not query:
+            if show_graphiql:
+                return None
+            raise HttpError(HttpResponseBadRequest("Must provide query string."))
+
+        schema = self.schema.graphql_schema
+
+        schema_validation_errors = validate_schema(schema)
+        if schema_validation_errors:
+            return ExecutionResult(data=None, errors=schema_validation_errors)
+
+        try:
+            document, validation_errors = get_validated_document(schema, query, self.validation_rules)
+        except Exception as e:
+            return ExecutionResult(errors=[e])
+
+        operation_ast = get_operation_ast(document, operation_name)
+
+        if (
+            request.method.lower() == "get"
+            and operation_ast is not None
+            and operation_ast.operation not in (OperationType.QUERY, OperationType.SUBSCRIPTION)
+        ):
+            if show_graphiql:
+                return None
+
+            raise HttpError(
+                HttpResponseNotAllowed(
+                    ["POST"],
+                    "Can only perform a {} operation from a POST request.".format(operation_ast.operation.value),
+                )
+            )
+
+        if validation_errors:
+            return ExecutionResult(data=None, errors=validation_errors)
+
+        if self.is_subscription(operation_ast) != self.subscriptions:
+            if self.subscriptions:
+                message = "Only subscriptions are served as server-sent events."
+            else:
+                message = "Subscriptions are served as server-sent events at /graphql/stream/."
+            return ExecutionResult(data=None, errors=[GraphQLError(message)])
+
+        query_cost = []
+        cost_errors = validate(schema, document, [get_query_cost_rule(variables, operation_name, query_cost)])
+        extensions = {"cost": query_cost[0].to_dict()} if query_cost else None
+        if cost_errors:
+            return ExecutionResult(data=None, errors=cost_errors, extensions=extensions)
+
+        execute_options = {
+            "root_value": self.get_root_value(request),
+            "context_value": self.get_context(request),
+            "variable_values": variables,
+            "operation_name": operation_name,
+            "middleware": self.get_operation_middleware(request, operation_ast),
+        }
+        if settings.GRAPHQL_DEBUG_ENABLED and selects_debug(operation_ast):
+            execute_options["execution_context_class"] = DebugExecutionContext
+        elif self.execution_context_class:
+            execute_options["execution_context_class"] = self.execution_context_class
+
+        return document, operation_ast, execute_options, extensions
+
+    def get_operation_middleware(self, request, operation_ast):
+        """
+        The middleware of the view, plus the resolver tracer for a sample of the operations, the N+1 detector in dev
+        and the debug middleware for the operations selecting the _debug field. None of them wraps the trivial
+        fields, see SelectiveMiddlewareManager.
+        """
+        middleware = self.get_middleware(request) or []
+        if isinstance(middleware, MiddlewareManager):
+            middleware = middleware.middlewares
+        middleware = list(middleware)
+
+        position = 1 if middleware and isinstance(middleware[0], SyncResolverMiddleware) else 0
+        if should_trace():
+            metrics.incr("graphql.traced_operations")
+            middleware.insert(position, self.resolver_tracer)
+
+        if settings.GRAPHQL_DETECT_N_PLUS_ONE:
+            middleware.insert(position, NPlusOneDetector())
+
+        if settings.GRAPHQL_DEBUG_ENABLED and selects_debug(operation_ast):
+            middleware.append(self.debug_middleware)
+
+        return SelectiveMiddlewareManager(
+            *middleware, trivial_resolvers=get_trivial_resolvers(self.schema.graphql_schema)
+        )
+
+    @staticmethod
+    def add_extensions(execution_result, extensions):
+        if extensions:
+            execution_result.extensions = {**(execution_result.extensions or {}), **extensions}
+        return execution_result
+
+    @staticmethod
+    def is_mutation(operation_ast):
+        return operation_ast is not None and operation_ast.operation == OperationType.MUTATION
+
+    @staticmethod
+    def is_subscription(operation_ast):
+        return operation_ast is not None and operation_ast.operation == OperationType.SUBSCRIPTION
+
+    def has_mutation(self, request, data):
+        """
+        Whether an operation of the batch is a mutation. The operations which can't be parsed are reported when they
+        are executed.
+        """
+        schema = self.schema.graphql_schema
+        for entry in data:
+            try:
+                entry = self.resolve_persisted_query(request, entry)
+                query, variables, operation_name, id = self.get_graphql_params(request, entry)
+                document, validation_errors = get_validated_document(schema, query, self.validation_rules)
+            except Exception:
+                continue
+
+            if self.is_mutation(get_operation_ast(document, operation_name)):
+                return True
+
+        return False
+
+    @classmethod
+    def is_atomic_mutation(cls, operation_ast):
+        return (
+            cls.is_mutation(operation_ast)
+            and (
+                graphene_settings.ATOMIC_MUTATIONS is True
+                or connection.settings_dict.get("ATOMIC_MUTATIONS", False) is True
+            )
+        )
+
+    def execute_graphql_request(self, request, data, query, variables, operation_name, show_graphiql=False):
+        prepared = self.prepare_graphql_request(request, query, variables, operation_name, show_graphiql)
+        if not isinstance(prepared, tuple):
+            return prepared
+
+        document, operation_ast, execute_options, extensions = prepared
+        schema = self.schema.graphql_schema
+        try:
+            if self.is_atomic_mutation(operation_ast):
+                with transaction.atomic():
+                    result = execute(schema, document, **execute_options)
+                    if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+                        transaction.set_rollback(True)
+                clear_loaders(execute_options["context_value"])
+                return self.add_extensions(result, extensions)
+
+            cache_key, cache_policy, data = lookup_response(request, schema, query, document, operation_ast, variables)
+            if data is not None:
+                return ExecutionResult(data=data, extensions=extensions)
+
+            if cache_key:
+                # The response cache is filled from the primary only: a lagging replica would store the data from
+                # before a write under the model versions bumped by that write. The identical operations running
+                # concurrently share a single execution.
+                with read_from_replica(False):
+                    result = execute_once(
+                        cache_key, cache_policy, lambda: execute(schema, document, **execute_options)
+                    )
+            else:
+                with read_from_replica(not self.is_mutation(operation_ast)):
+                    result = execute(schema, document, **execute_options)
+            if self.is_mutation(operation_ast):
+                clear_loaders(execute_options["context_value"])
+            return self.add_extensions(result, extensions)
+        except Exception as e:
+            return ExecutionResult(errors=[e], extensions=extensions)
+
+
+class AsyncGraphQLView(CustomGraphQLView):
+    """
+    Executes the queries asynchronously under ASGI: async resolvers are awaited without holding a thread for the
+    whole request, and the sibling fields with async resolvers overlap.
+
+    Sync resolvers run one at a time in the thread of the request through SyncResolverMiddleware, so they keep using
+    the ORM as is but don't run in parallel. GraphiQL and batching work as in CustomGraphQLView, the operations of a
+    batch are interleaved on the event loop unless one of them is a mutation, their ORM work still runs one resolver
+    at a time.
+    """
+
+    @classproperty
+    def view_is_async(cls):
+        return True
+
+    def get_middleware(self, request):
+        return [SyncResolverMiddleware(), *(self.middleware or [])]
+
+    @method_decorator(ensure_csrf_cookie)
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            if request.method.lower() not in ("get", "post"):
+                raise HttpError(
+                    HttpResponseNotAllowed(["GET", "POST"], "GraphQL only supports GET and POST requests.")
+                )
+
+            data = self.parse_body(request)
+            show_graphiql = self.graphiql and self.can_display_graphiql(request, data)
+
+            if show_graphiql:
+                # The sync dispatch renders graphiql before getting to the execution, the template can touch the
+                # session and the user.
+                return await sync_to_async(super().dispatch)(request, *args, **kwargs)
+
+            if self.batch:
+                if await sync_to_async(self.has_mutation)(request, data):
+                    # The operations run in order, so that the ones following a mutation see its writes.
+                    responses = [await self.get_response(request, entry) for entry in data]
+                else:
+                    # The loads of the concurrent operations are batched together by the shared DataLoaders.
+                    responses = await asyncio.gather(*(self.get_response(request, entry) for entry in data))
+                result = "[{}]".format(",".join([response[0] for response in responses]))
+                status_code = responses and max(responses, key=lambda response: response[1])[1] or 200
+            else:
+                result, status_code = await self.get_response(request, data, show_graphiql)
+
+            return HttpResponse(status=status_code, content=result, content_type="application/json")
+
+        except HttpError as e:
+            response = e.response
+            response["Content-Type"] = "application/json"
+            response.content = self.json_encode(request, {"errors": [self.format_error(e)]})
+            return response
+
+    async def get_response(self, request, data, show_graphiql=False):
+        if self.batch:
+            setattr(request, MUTATION_ERRORS_FLAG, False)
+
+        try:
+            data = await sync_to_async(self.resolve_persisted_query)(request, data)
+        except ResponseError as e:
+            return self.get_persisted_query_error_response(request, e)
+
+        query, variables, operation_name, id = self.get_graphql_params(request, data)
+        execution_result = await self.execute_graphql_request(
+            request, data, query, variables, operation_name, show_graphiql
+        )
+        return self.get_execution_response(request, execution_result, id, show_graphiql)
+
+    async def execute_graphql_request(self, request, data, query, variables, operation_name, show_graphiql=False):
+        prepared = self.prepare_graphql_request(request, query, variables, operation_name, show_graphiql)
+        if not isinstance(prepared, tuple):
+            return prepared
+
+        document, operation_ast, execute_options, extensions = prepared
+        schema = self.schema.graphql_schema
+        try:
+            if self.is_atomic_mutation(operation_ast):
+                result = await sync_to_async(self.execute_atomic)(request, document, execute_options)
+                clear_loaders(execute_options["context_value"])
+                return self.add_extensions(result, extensions)
+
+            cache_key, cache_policy, data = await sync_to_async(lookup_response)(
+                request, schema, query, document, operation_ast, variables
+            )
+            if data is not None:
+                return ExecutionResult(data=data, extensions=extensions)
+
+            if cache_key:
+                # The response cache is filled from the primary only: a lagging replica would store the data from
+                # before a write under the model versions bumped by that write. The identical operations running
+                # concurrently share a single execution.
+                with read_from_replica(False):
+                    result = await aexecute_once(
+                        cache_key, cache_policy, lambda: self.execute(document, execute_options)
+                    )
+            else:
+                with read_from_replica(not self.is_mutation(operation_ast)):
+                    result = await self.execute(document, execute_options)
+            if self.is_mutation(operation_ast):
+                clear_loaders(execute_options["context_value"])
+            return self.add_extensions(result, extensions)
+        except Exception as e:
+            return ExecutionResult(errors=[e], extensions=extensions)
+
+    async def execute(self, document, execute_options):
+        result = execute(self.schema.graphql_schema, document, **execute_options)
+        return await result if inspect.isawaitable(result) else result
+
+    def execute_atomic(self, request, document, execute_options):
+        # Runs in the thread of the request, the sync resolvers scheduled by the execution come back to this thread
+        # and therefore to the connection holding the transaction.
+        with transaction.atomic():
+            result = async_to_sync(self.execute)(document, execute_options)
+            if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+                transaction.set_rollback(True)
+        return result
+
+
+class GraphQLSubscriptionView(AsyncGraphQLView):
+    """
+    Serves the subscriptions as server-sent events (text/event-stream): every event of the subscription is executed
+    against its selection set, and its result is sent as a data message. With GET requests the query, variables and
+    operationName are read from the query string, so that browsers can use EventSource.
+
+    The identical subscriptions share one execution, see utils.graphql.subscriptions. The events come from the
+    in-process pub/sub (utils.pubsub), so a stream only gets the events published by its own instance.
+    """
+
+    subscriptions = True
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            if request.method.lower() not in ("get", "post"):
+                raise HttpError(
+                    HttpResponseNotAllowed(["GET", "POST"], "GraphQL only supports GET and POST requests.")
+                )
+
+            data = self.parse_body(request)
+            try:
+                data = await sync_to_async(self.resolve_persisted_query)(request, data)
+            except ResponseError as e:
+                content, status_code = self.get_persisted_query_error_response(request, e)
+                return HttpResponse(status=status_code, content=content, content_type="application/json")
+
+            query, variables, operation_name, id = self.get_graphql_params(request, data)
+            user = await request.auser()
+            key = get_subscription_key(query, operation_name, variables, user.pk)
+            subscription = hub.get(key)
+            if subscription is None:
+                messages = await self.subscribe(request, query, variables, operation_name)
+                if isinstance(messages, ExecutionResult):
+                    # EventSource doesn't reconnect after an error status.
+                    content, status_code = self.get_execution_response(request, messages)
+                    return HttpResponse(status=max(status_code, 400), content=content, content_type="application/json")
+
+                subscription = await hub.start(key, messages)
+
+            await self.release_connections()
+        except HttpError as e:
+            response = e.response
+            response["Content-Type"] = "application/json"
+            response.content = self.json_encode(request, {"errors": [self.format_error(e)]})
+            return response
+
+        response = StreamingHttpResponse(
+            subscription.listen(keepalive=settings.GRAPHQL_SUBSCRIPTION_KEEPALIVE), content_type="text/event-stream"
+        )
+        response["Cache-Control"] = "no-cache"
+        # Stops the proxies from buffering the stream.
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    async def release_connections(self):
+        """
+        Give the database connections of the request back to the pool. Django only does it once the response is
+        finished, which for a stream is when the client goes away: the idle streams would hold all of the pool.
+        """
+        await sync_to_async(close_old_connections)()
+
+    async def subscribe(self, request, query, variables, operation_name):
+        """
+        Start the event stream of the subscription. Returns the async iterator of its messages, or an ExecutionResult
+        with the errors of the request.
+        """
+        prepared = self.prepare_graphql_request(request, query, variables, operation_name)
+        if not isinstance(prepared, tuple):
+            return prepared
+
+        document, operation_ast, execute_options, extensions = prepared
+        try:
+            events = await create_source_event_stream(
+                self.schema.graphql_schema,
+                document,
+                execute_options["root_value"],
+                execute_options["context_value"],
+                variables,
+                operation_name,
+            )
+        except Exception as e:
+            return ExecutionResult(errors=[e])
+
+        if isinstance(events, ExecutionResult):
+            return events
+        return self.get_messages(request, document, operation_ast, execute_options, events)
+
+    async def get_messages(self, request, document, operation_ast, execute_options, events):
+        """
+        Execute every event of the stream with the request and the context of the subscribing request, which the
+        identical subscriptions of the same user share, see SharedSubscription.
+        """
+        try:
+            async for event in events:
+                # Every event is a new execution: the loaded values are stale and the middleware starts over.
+                clear_loaders(execute_options["context_value"])
+                options = {
+                    **execute_options,
+                    "root_value": event,
+                    "middleware": self.get_operation_middleware(request, operation_ast),
+                }
+                try:
+                    # The events follow writes, which the replica may not have replayed yet.
+                    with read_from_replica(False):
+                        result = await self.execute(document, options)
+                except Exception as e:
+                    result = ExecutionResult(errors=[e])
+                finally:
+                    await self.release_connections()
+
+                content, status_code = self.get_execution_response(request, result)
+                yield format_message(content)
+        finally:
+            if hasattr(events, "aclose"):
+                await events.aclose()
+
 
-class GraphiQLView(AccessMixin, CustomGraphQLView):
+class GraphiQLView(AccessMixin, AsyncGraphQLView):
     def __init__(self, **kwargs):
         super().__init__(graphiql=True, **kwargs)
 
-    def dispatch(self, request, *args, **kwargs):
-        if not settings.DEBUG and not request.user.is_superuser:
-            return self.handle_no_permission()
+    async def dispatch(self, request, *args, **kwargs):
+        user = await request.auser()
+        if not settings.DEBUG and not user.is_superuser:
+            return await sync_to_async(self.handle_no_permission)()
 
-        return super().dispatch(request, *args, **kwargs)
+        return await super().dispatch(request, *args, **kwargs)
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 # Standard Library Imports
 import logging
+import math
 import os
 from datetime import timedelta
 from pathlib import Path
@@ -101,6 +102,8 @@ INSTALLED_APPS = [
     "accounts",
     "deploy",
     "tasks",
+    "persisted_queries",
+    "shared_cache",
     "corsheaders",
     "django_filters",
 ]
@@ -114,11 +117,13 @@ MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "corsheaders.middleware.CorsMiddleware",
+    "utils.middleware.history.HistoryBufferMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "accounts.middlewares.jwt.JWTMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "utils.middleware.replicas.ReplicaRoutingMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -172,6 +177,29 @@ ASGI_APPLICATION = f"{APP_NAME}.asgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# Cloud Run sends at most CLOUD_RUN_CONCURRENCY requests at once to an instance (keep it in sync with the concurrency
+# of deploy/core.yaml), split between the WEB_CONCURRENCY uvicorn workers. A request holds at most one connection per
+# database, so that many connections per worker are enough for every request to get one without waiting. The
+# subscription streams (/graphql/stream/) give theirs back after subscribing and after each event, so the idle
+# streams don't count.
+CLOUD_RUN_CONCURRENCY = int(os.environ.get("CLOUD_RUN_CONCURRENCY", 50))
+WEB_CONCURRENCY = int(os.environ.get("WEB_CONCURRENCY", 2))
+
+# psycopg 3 connection pool of each worker and database, the connections are reused across requests instead of
+# paying the TLS and auth handshakes of Cloud SQL on every request. See utils.db_pool for the pool stats.
+DATABASE_POOL_ENABLED = is_true_fn(os.environ.get("DATABASE_POOL_ENABLED", "True"))
+DATABASE_POOL = {
+    "min_size": int(os.environ.get("DATABASE_POOL_MIN_SIZE", 2)),
+    "max_size": int(
+        os.environ.get("DATABASE_POOL_MAX_SIZE", math.ceil(CLOUD_RUN_CONCURRENCY / max(WEB_CONCURRENCY, 1)))
+    ),
+    # Seconds a request waits for a connection before failing.
+    "timeout": float(os.environ.get("DATABASE_POOL_TIMEOUT", 10)),
+    # The idle connections above min_size are closed after max_idle, all of them are renewed after max_lifetime.
+    "max_idle": float(os.environ.get("DATABASE_POOL_MAX_IDLE", 300)),
+    "max_lifetime": float(os.environ.get("DATABASE_POOL_MAX_LIFETIME", 1800)),
+}
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.postgresql",
@@ -180,6 +208,52 @@ DATABASES = {
         "USER": os.environ.get("POSTGRES_USER", "postgres"),
         "PASSWORD": os.environ.get("POSTGRES_PASSWORD", "postgres"),
         "PORT": os.environ.get("POSTGRES_PORT", 5432),
+        # With the pool, the connections are checked when they are taken from it, a connection closed by the server
+        # meanwhile is replaced instead of failing the request.
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {"pool": DATABASE_POOL} if DATABASE_POOL_ENABLED else {},
+    }
+}
+
+# Read replica of the primary (e.g. a Cloud SQL read replica), used for the GraphQL queries and the GET requests,
+# see utils.replicas. The cacheable queries read from the primary, so that the response cache never stores stale data.
+if os.environ.get("POSTGRES_REPLICA_HOST"):
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "HOST": os.environ["POSTGRES_REPLICA_HOST"],
+        "PORT": os.environ.get("POSTGRES_REPLICA_PORT", DATABASES["default"]["PORT"]),
+        "TEST": {"MIRROR": "default"},
+    }
+
+DATABASE_ROUTERS = ["utils.replicas.ReplicaRouter"]
+# The replica is skipped while it lags more than this, its health is checked at most every interval per process.
+REPLICA_MAX_LAG_SECONDS = float(os.environ.get("REPLICA_MAX_LAG_SECONDS", 5))
+REPLICA_HEALTH_CHECK_INTERVAL = float(os.environ.get("REPLICA_HEALTH_CHECK_INTERVAL", 10))
+# After a write, the client and the user read from the primary for this long (read-your-writes).
+REPLICA_PIN_SECONDS = int(os.environ.get("REPLICA_PIN_SECONDS", 10))
+
+
+# The lookups of every request (the session, the user of the JWT, the WorkOS user at login) are prepared once per
+# pooled connection and reuse their plan, see utils.prepared. At most PREPARED_STATEMENTS_MAX query shapes.
+PREPARED_STATEMENTS_ENABLED = is_true_fn(os.environ.get("PREPARED_STATEMENTS_ENABLED", "True"))
+PREPARED_STATEMENTS_MAX = int(os.environ.get("PREPARED_STATEMENTS_MAX", 100))
+SESSION_ENGINE = "utils.sessions"
+
+# Cache shared by the instances: an LRU of each process in front of the UNLOGGED shared_cache table of the primary, see
+# utils.cache. The entries are served from the process for CACHE_LOCAL_TIMEOUT seconds, how long the writes of the
+# other instances take to be seen. get_or_set serves the expired entries for CACHE_STALE_TIMEOUT seconds while they're
+# refreshed, and waits at most CACHE_LOCK_TIMEOUT seconds for another instance computing a missing entry.
+CACHES = {
+    "default": {
+        "BACKEND": "utils.cache.TieredCache",
+        "LOCATION": "shared_cache",
+        "TIMEOUT": int(os.environ.get("CACHE_TIMEOUT", 300)),
+        "OPTIONS": {
+            "LOCAL_MAX_ENTRIES": int(os.environ.get("CACHE_LOCAL_MAX_ENTRIES", 1000)),
+            "LOCAL_TIMEOUT": float(os.environ.get("CACHE_LOCAL_TIMEOUT", 5)),
+            "STALE_TIMEOUT": int(os.environ.get("CACHE_STALE_TIMEOUT", 60)),
+            "LOCK_TIMEOUT": float(os.environ.get("CACHE_LOCK_TIMEOUT", 10)),
+        },
     }
 }
 
@@ -202,14 +276,56 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Either "sync" or "buffered", see utils.history.HistoryWriteMode.
+HISTORY_WRITE_MODE = os.environ.get("HISTORY_WRITE_MODE", "sync")
+
 GRAPHENE = {
     "SCHEMA": f"{APP_NAME}.graphql.schema.schema",
     "MIDDLEWARE": [
         f"{APP_NAME}.graphql.middlewares.ErrorLoggingMiddleware",
-        "graphene_django.debug.DjangoDebugMiddleware",
     ],
 }
 
+# Fraction of the GraphQL operations whose resolvers are timed, see app.graphql.middlewares.ResolverTracer.
+GRAPHQL_TRACE_SAMPLE_RATE = float(os.environ.get("GRAPHQL_TRACE_SAMPLE_RATE", 0.01))
+# Answer the _debug field with the SQL queries of the operation, DjangoDebugMiddleware is only added to the
+# operations selecting it.
+GRAPHQL_DEBUG_ENABLED = is_true_fn(os.environ.get("GRAPHQL_DEBUG_ENABLED", str(DEBUG)))
+# Log the queries repeated this many times by the resolvers of a field in an operation, see
+# app.graphql.middlewares.NPlusOneDetector. The budgets of the recorded operations are checked by the
+# check_query_budgets command.
+GRAPHQL_DETECT_N_PLUS_ONE = is_true_fn(os.environ.get("GRAPHQL_DETECT_N_PLUS_ONE", str(DEBUG)))
+GRAPHQL_N_PLUS_ONE_THRESHOLD = int(os.environ.get("GRAPHQL_N_PLUS_ONE_THRESHOLD", 5))
+
+# Number of parsed and validated GraphQL documents kept in memory, see utils.graphql.documents.
+GRAPHQL_DOCUMENT_CACHE_SIZE = int(os.environ.get("GRAPHQL_DOCUMENT_CACHE_SIZE", 256))
+# Number of query optimizer plans kept in memory, one per field of the cached documents, see
+# utils.graphql.query_optimizer.
+GRAPHQL_QUERY_PLAN_CACHE_SIZE = int(os.environ.get("GRAPHQL_QUERY_PLAN_CACHE_SIZE", 1024))
+# Number of automatic persisted queries kept in memory in front of the persisted_queries table.
+GRAPHQL_PERSISTED_QUERY_CACHE_SIZE = int(os.environ.get("GRAPHQL_PERSISTED_QUERY_CACHE_SIZE", 1024))
+# The longer queries aren't registered as persisted queries, neither are the ones failing validation.
+GRAPHQL_PERSISTED_QUERY_MAX_LENGTH = int(os.environ.get("GRAPHQL_PERSISTED_QUERY_MAX_LENGTH", 10000))
+# Queries costing more or nested deeper than this are rejected before execution, see app.graphql.cost. The deepest
+# query to allow is the introspection query of GraphiQL and the codegen tools, which nests 15 levels.
+GRAPHQL_MAX_QUERY_COST = int(os.environ.get("GRAPHQL_MAX_QUERY_COST", 1000))
+GRAPHQL_MAX_QUERY_DEPTH = int(os.environ.get("GRAPHQL_MAX_QUERY_DEPTH", 15))
+# Number of items assumed for the lists queried without a first/last argument.
+GRAPHQL_DEFAULT_LIST_SIZE = int(os.environ.get("GRAPHQL_DEFAULT_LIST_SIZE", 20))
+# Maximum number of operations of a batched request, each operation is checked against the cost budget.
+GRAPHQL_MAX_BATCH_SIZE = int(os.environ.get("GRAPHQL_MAX_BATCH_SIZE", 20))
+# Seconds between the keepalive comments of the idle GraphQL subscription streams.
+GRAPHQL_SUBSCRIPTION_KEEPALIVE = int(os.environ.get("GRAPHQL_SUBSCRIPTION_KEEPALIVE", 15))
+# Number of events queued per subscriber of the in-process pub/sub, the oldest ones are dropped past it.
+PUBSUB_QUEUE_SIZE = int(os.environ.get("PUBSUB_QUEUE_SIZE", 100))
+# Cap of the capped and estimated counts of the connections, and lifetime of the cached counts, see utils.counts.
+CONNECTION_COUNT_CAP = int(os.environ.get("CONNECTION_COUNT_CAP", 10000))
+CONNECTION_COUNT_CACHE_TIMEOUT = int(os.environ.get("CONNECTION_COUNT_CACHE_TIMEOUT", 60))
+# Cache the responses of the queries whose types all have cache_control hints, see utils.graphql.response_cache.
+GRAPHQL_RESPONSE_CACHE_ENABLED = is_true_fn(os.environ.get("GRAPHQL_RESPONSE_CACHE_ENABLED", "True"))
+# Number of GraphQL responses kept in memory in front of the shared cache.
+GRAPHQL_RESPONSE_CACHE_SIZE = int(os.environ.get("GRAPHQL_RESPONSE_CACHE_SIZE", 512))
+
 GRAPHQL_JWT = {
     "JWT_VERIFY_EXPIRATION": False,
     "JWT_EXPIRATION_DELTA": timedelta(days=30),
@@ -278,3 +394,18 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 WORKOS_API_KEY = os.environ.get("WORKOS_API_KEY", "")
 WORKOS_CLIENT_ID = os.environ.get("WORKOS_CLIENT_ID", "")
 WORKOS_REDIRECT_URI = os.environ.get("WORKOS_REDIRECT_URI", "http://localhost:8000/auth/callback")
+# Key of the sealed sessions, i.e. the session cookies, shared with the app sealing them.
+WORKOS_COOKIE_PASSWORD = os.environ.get("WORKOS_COOKIE_PASSWORD", "")
+
+# WorkOS HTTP client tuning, the client keeps a pool of keep-alive connections across requests.
+WORKOS_HTTP2 = is_true_fn(os.environ.get("WORKOS_HTTP2", "True"))
+WORKOS_REQUEST_TIMEOUT = float(os.environ.get("WORKOS_REQUEST_TIMEOUT", 5))
+WORKOS_CONNECT_TIMEOUT = float(os.environ.get("WORKOS_CONNECT_TIMEOUT", 2))
+WORKOS_MAX_CONNECTIONS = int(os.environ.get("WORKOS_MAX_CONNECTIONS", 20))
+WORKOS_KEEPALIVE_EXPIRY = float(os.environ.get("WORKOS_KEEPALIVE_EXPIRY", 60))
+WORKOS_MAX_RETRIES = int(os.environ.get("WORKOS_MAX_RETRIES", 2))
+WORKOS_RETRY_BASE_DELAY = float(os.environ.get("WORKOS_RETRY_BASE_DELAY", 0.1))
+WORKOS_RETRY_MAX_DELAY = float(os.environ.get("WORKOS_RETRY_MAX_DELAY", 1))
+# Verified WorkOS sessions are cached for at most this long, bounded by the session's own expiry.
+WORKOS_SESSION_CACHE_TTL = int(os.environ.get("WORKOS_SESSION_CACHE_TTL", 60))
+WORKOS_SESSION_NEGATIVE_CACHE_TTL = int(os.environ.get("WORKOS_SESSION_NEGATIVE_CACHE_TTL", 10))
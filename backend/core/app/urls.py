@@ -23,12 +23,16 @@ from django.urls import path
 from django.views.decorators.csrf import csrf_exempt
 
 # Same App Imports
-from .graphql.views import CustomGraphQLView
+from .graphql.views import AsyncGraphQLView
 from .graphql.views import GraphiQLView
+from .graphql.views import GraphQLSubscriptionView
 
 # Project Imports
 from accounts.views import login
 from accounts.views import logout
+from app.views import CacheStatsView
+from app.views import DatabasePoolStatsView
+from app.views import PreparedStatementStatsView
 from app.views import streamer_test
 from app.views import streamer_test_page
 
@@ -38,11 +42,16 @@ urlpatterns = [
     # API
     path("api/logout/", logout, name="logout"),
     path("api/stream/test/", streamer_test, name="stream-api-test"),
+    path("api/db/pool/", DatabasePoolStatsView.as_view(), name="db-pool-stats"),
+    path("api/db/prepared/", PreparedStatementStatsView.as_view(), name="db-prepared-stats"),
+    path("api/cache/", CacheStatsView.as_view(), name="cache-stats"),
     # Dev
     path("dev/login", login, name="dev-login"),
     path("dev/streamer/", streamer_test_page, name="streamer"),
     # GQL
-    path("graphql/", csrf_exempt(CustomGraphQLView.as_view(graphiql=False))),
+    path("graphql/", csrf_exempt(AsyncGraphQLView.as_view(graphiql=False))),
+    path("graphql/batch/", csrf_exempt(AsyncGraphQLView.as_view(batch=True))),
+    path("graphql/stream/", csrf_exempt(GraphQLSubscriptionView.as_view())),
     path("graphiql/", GraphiQLView.as_view()),
     path("__debug__/", include(debug_toolbar.urls)),
     path("", include("tasks.urls")),
@@ -5,11 +5,17 @@ import logging
 import time
 
 # Third Party Library Imports
+from django.http import JsonResponse
 from django.http import StreamingHttpResponse
 from django.shortcuts import render
+from django.views import View
 
 # App Imports
+from utils.cache import get_cache_stats
+from utils.db_pool import get_pool_stats
+from utils.prepared import get_prepared_statement_stats
 from utils.sse import format_message  # Assuming this is your utility for formatting messages
+from utils.views.auth import StaffMixin
 
 
 logger = logging.getLogger(__name__)
@@ -29,3 +35,30 @@ async def streamer_test(request):
 
 def streamer_test_page(request):
     return render(request, "streamer_test.html")
+
+
+class DatabasePoolStatsView(StaffMixin, View):
+    """
+    Stats of the database connection pools of the worker serving the request, see utils.db_pool.
+    """
+
+    def get(self, request):
+        return JsonResponse(get_pool_stats())
+
+
+class PreparedStatementStatsView(StaffMixin, View):
+    """
+    The hot queries prepared by the worker serving the request and their plans, see utils.prepared.
+    """
+
+    def get(self, request):
+        return JsonResponse(get_prepared_statement_stats())
+
+
+class CacheStatsView(StaffMixin, View):
+    """
+    Hits and misses of every namespace of the cache in the worker serving the request, see utils.cache.
+    """
+
+    def get(self, request):
+        return JsonResponse(get_cache_stats())
@@ -0,0 +1,8 @@
+# Third Party Library Imports
+from django.contrib import admin
+
+# Same App Imports
+from .models import PersistedQuery
+
+
+admin.site.register(PersistedQuery)
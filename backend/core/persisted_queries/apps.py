@@ -0,0 +1,7 @@
+# Third Party Library Imports
+from django.apps import AppConfig
+
+
+class PersistedQueriesConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "persisted_queries"
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.1 on 2026-10-18 22:24
+
+# Third Party Library Imports
+import django.utils.timezone
+from django.db import migrations
+from django.db import models
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="PersistedQuery",
+            fields=[
+                (
+                    "sha256_hash",
+                    models.CharField(max_length=64, primary_key=True, serialize=False, verbose_name="sha256 hash"),
+                ),
+                ("query", models.TextField(verbose_name="query")),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now, verbose_name="created at")),
+            ],
+        ),
+    ]
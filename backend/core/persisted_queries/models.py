@@ -0,0 +1,16 @@
+from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+
+class PersistedQuery(models.Model):
+    """
+    GraphQL query registered by a client through automatic persisted queries, addressed by its sha256 hash.
+    """
+
+    sha256_hash = models.CharField(_("sha256 hash"), max_length=64, primary_key=True)
+    query = models.TextField(_("query"), null=False)
+    created_at = models.DateTimeField(_("created at"), default=timezone.now)
+
+    def __str__(self):
+        return self.sha256_hash
@@ -0,0 +1,72 @@
+# Third Party Library Imports
+from django.conf import settings
+
+# Same App Imports
+from .models import PersistedQuery
+
+# App Imports
+from utils import metrics
+from utils.graphql.documents import get_query_hash
+from utils.graphql.exceptions import ResponseError
+from utils.lru import LRUCache
+
+
+_queries = LRUCache(maxsize=settings.GRAPHQL_PERSISTED_QUERY_CACHE_SIZE)
+
+
+class PersistedQueryNotFound(ResponseError):
+    def __init__(self):
+        # Clients implementing APQ match on this exact message to retry with the full query.
+        super().__init__("PersistedQueryNotFound", code="PERSISTED_QUERY_NOT_FOUND")
+
+
+class PersistedQueryHashMismatch(ResponseError):
+    def __init__(self):
+        super().__init__("provided sha does not match query", code="PERSISTED_QUERY_HASH_MISMATCH")
+
+
+def get_persisted_query(sha256_hash):
+    """
+    Look up the query registered with the hash, in memory first and then in Postgres.
+
+    :raise PersistedQueryNotFound: If no client registered the query yet.
+    """
+    query = _queries.get(sha256_hash)
+    if query is not None:
+        metrics.incr("graphql.persisted_queries.memory_hits")
+        return query
+
+    query = PersistedQuery.objects.filter(sha256_hash=sha256_hash).values_list("query", flat=True).first()
+    if query is None:
+        metrics.incr("graphql.persisted_queries.misses")
+        raise PersistedQueryNotFound()
+
+    metrics.incr("graphql.persisted_queries.db_hits")
+    _queries.set(sha256_hash, query)
+    return query
+
+
+def persist_query(sha256_hash, query, validate=None):
+    """
+    Register the query under its hash, a no-op for the already registered queries. The queries longer than
+    GRAPHQL_PERSISTED_QUERY_MAX_LENGTH, or for which validate(query) is False, aren't registered: they're still
+    executed and answered with their errors, but never fill the table.
+
+    :raise PersistedQueryHashMismatch: If the hash isn't the sha256 of the query.
+    """
+    if get_query_hash(query) != sha256_hash:
+        raise PersistedQueryHashMismatch()
+
+    if _queries.get(sha256_hash) is not None:
+        return
+
+    if len(query) > settings.GRAPHQL_PERSISTED_QUERY_MAX_LENGTH or (validate is not None and not validate(query)):
+        metrics.incr("graphql.persisted_queries.rejected")
+        return
+
+    PersistedQuery.objects.bulk_create(
+        [PersistedQuery(sha256_hash=sha256_hash, query=query)],
+        ignore_conflicts=True,
+    )
+    metrics.incr("graphql.persisted_queries.registered")
+    _queries.set(sha256_hash, query)
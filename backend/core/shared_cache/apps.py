@@ -0,0 +1,7 @@
+# Third Party Library Imports
+from django.apps import AppConfig
+
+
+class SharedCacheConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "shared_cache"
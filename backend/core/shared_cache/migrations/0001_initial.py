@@ -0,0 +1,27 @@
+# Generated by Django 5.1.1 on 2026-10-18 23:10
+
+# Third Party Library Imports
+from django.db import migrations
+from django.db import models
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="CacheEntry",
+            fields=[
+                ("key", models.TextField(primary_key=True, serialize=False, verbose_name="key")),
+                ("value", models.BinaryField(verbose_name="value")),
+                ("fresh_until", models.DateTimeField(null=True, verbose_name="fresh until")),
+                ("expires_at", models.DateTimeField(db_index=True, null=True, verbose_name="expires at")),
+            ],
+            options={
+                "db_table": "shared_cache",
+            },
+        ),
+        migrations.RunSQL("ALTER TABLE shared_cache SET UNLOGGED", reverse_sql="ALTER TABLE shared_cache SET LOGGED"),
+    ]
@@ -0,0 +1,22 @@
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class CacheEntry(models.Model):
+    """
+    Entry of the shared tier of utils.cache.TieredCache. The table is UNLOGGED: its writes skip the WAL, so it isn't
+    replicated and Postgres empties it after a crash, which is fine for a cache.
+
+    The entry is served until fresh_until, and as a stale value while it's refreshed until expires_at.
+    """
+
+    key = models.TextField(_("key"), primary_key=True)
+    value = models.BinaryField(_("value"))
+    fresh_until = models.DateTimeField(_("fresh until"), null=True)
+    expires_at = models.DateTimeField(_("expires at"), null=True, db_index=True)
+
+    class Meta:
+        db_table = "shared_cache"
+
+    def __str__(self):
+        return self.key
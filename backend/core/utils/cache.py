@@ -0,0 +1,463 @@
+# Standard Library Imports
+import itertools
+import logging
+import pickle
+import threading
+import time
+from collections import defaultdict
+from collections import namedtuple
+from contextlib import nullcontext
+from datetime import datetime
+from datetime import timezone
+
+# Third Party Library Imports
+from asgiref.sync import sync_to_async
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.base import BaseCache
+from django.db import DEFAULT_DB_ALIAS
+from django.db import DatabaseError
+from django.db import connections
+from django.db import transaction
+
+# App Imports
+from utils import metrics
+from utils.lru import LRUCache
+from utils.prepared import hot_queries
+from utils.singleflight import Group
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_NAMESPACE = "default"
+NAMESPACE_VERSION_KEY = "namespace:{}"
+FILL_LOCK_KEY = "lock:{}"
+# Seconds between the lookups of the callers waiting for another instance to fill an entry.
+FILL_POLL_INTERVAL = 0.05
+
+_MISSING = object()
+
+
+class Entry(namedtuple("Entry", ["value", "fresh_until", "expires_at"])):
+    """
+    Cached value with the epoch seconds until which it's fresh, and until which it may be served stale (None for
+    never).
+    """
+
+    def is_fresh(self, now):
+        return self.fresh_until is None or self.fresh_until > now
+
+
+def get_namespace(key):
+    """
+    Namespace of the key, its part before the first colon, e.g. "workos" for "workos:session:<id>".
+    """
+    namespace, sep, _ = key.partition(":")
+    return namespace if sep else DEFAULT_NAMESPACE
+
+
+def _to_datetime(timestamp):
+    return None if timestamp is None else datetime.fromtimestamp(timestamp, tz=timezone.utc)
+
+
+def _to_timestamp(value):
+    return None if value is None else value.timestamp()
+
+
+class _ProcessTier(object):
+    def __init__(self, maxsize):
+        self.entries = LRUCache(maxsize)
+        self.writes = itertools.count(1)
+        # Namespace -> (monotonic time until which it's served from the process, version).
+        self.versions = {}
+        self.fills = Group("cache.fills")
+
+
+# Django creates a backend per thread, the process tier is shared by the backends of the same location.
+_process_tiers = {}
+_process_tiers_lock = threading.Lock()
+
+
+class TieredCache(BaseCache):
+    """
+    Cache backend with two tiers: a bounded LRU of the process in front of an UNLOGGED Postgres table shared by the
+    instances (LOCATION, see shared_cache.models.CacheEntry). The table is always read on the primary, the unlogged
+    tables can't be read on a replica.
+
+    Options:
+        LOCAL_MAX_ENTRIES: Number of entries kept in the process.
+        LOCAL_TIMEOUT: Seconds an entry is served from the process without reading the table, which is how long the
+            writes and invalidations of the other instances take to be seen.
+        STALE_TIMEOUT: Seconds get_or_set serves an entry past its timeout while a single caller refreshes it.
+        LOCK_TIMEOUT: Seconds the callers of get_or_set wait for another instance computing a missing entry before
+            computing it themselves.
+        CULL_EVERY: Number of writes of the process between the deletions of the expired rows.
+
+    The keys are namespaced by their part before the first colon: invalidate() drops every entry of a namespace, and
+    the hits and misses are counted per namespace (see get_cache_stats).
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self._table = location
+        self.database = options.get("DATABASE", DEFAULT_DB_ALIAS)
+        self.local_timeout = options.get("LOCAL_TIMEOUT", 5)
+        self.stale_timeout = options.get("STALE_TIMEOUT", 0)
+        self.lock_timeout = options.get("LOCK_TIMEOUT", 10)
+        self.cull_every = options.get("CULL_EVERY", 100)
+        with _process_tiers_lock:
+            tier = _process_tiers.get(location)
+            if tier is None:
+                tier = _process_tiers[location] = _ProcessTier(options.get("LOCAL_MAX_ENTRIES", 1000))
+        self._tier = tier
+        self._local = tier.entries
+        self._versions = tier.versions
+        self._fills = tier.fills
+
+    # Keys
+
+    def get_namespace_version(self, namespace):
+        cached = self._versions.get(namespace)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+
+        key = NAMESPACE_VERSION_KEY.format(namespace)
+        entry = self._read([key]).get(key)
+        version = entry.value if entry is not None else 0
+        self._versions[namespace] = (time.monotonic() + self.local_timeout, version)
+        return version
+
+    def _make_key(self, key, version=None):
+        namespace = get_namespace(key)
+        key = self.make_and_validate_key(key, version=version)
+        return namespace, f"{namespace}.{self.get_namespace_version(namespace)}:{key}"
+
+    def invalidate(self, namespace):
+        """
+        Drop every entry of the namespace on every instance. The keys embed the version of their namespace, the new
+        version makes the previous entries unreachable until they're culled.
+        """
+        version = time.time_ns()
+        self._write(NAMESPACE_VERSION_KEY.format(namespace), Entry(version, None, None))
+        self._versions[namespace] = (time.monotonic() + self.local_timeout, version)
+        metrics.incr(f"cache.{namespace}.invalidations")
+
+    async def ainvalidate(self, namespace):
+        return await sync_to_async(self.invalidate)(namespace)
+
+    # Tiers
+
+    def _execute(self, sql, params, fetch=False, hot=False):
+        """
+        Run the query on the shared table, None when it fails: the cache keeps serving from the process while the
+        database is unavailable. The hot queries are prepared, see utils.prepared.
+        """
+        connection = connections[self.database]
+        try:
+            # A savepoint keeps the transaction of the caller usable when the query fails.
+            with transaction.atomic(using=self.database) if connection.in_atomic_block else nullcontext():
+                with connection.cursor() as cursor, hot_queries("cache") if hot else nullcontext():
+                    cursor.execute(sql, params)
+                    return cursor.fetchall() if fetch else cursor.rowcount
+        except DatabaseError:
+            logger.warning("The shared cache is unavailable.", exc_info=True)
+            metrics.incr("shared_cache.errors")
+            return None
+
+    def _set_local(self, key, entry):
+        ttl = self.local_timeout
+        if entry.expires_at is not None:
+            ttl = min(ttl, entry.expires_at - time.time())
+        if ttl > 0:
+            self._local.set(key, (time.monotonic() + ttl, entry))
+        else:
+            self._local.delete(key)
+
+    def _read(self, keys):
+        rows = self._execute(
+            f"SELECT key, value, fresh_until, expires_at FROM {self._table} "
+            "WHERE key = ANY(%s) AND (expires_at IS NULL OR expires_at > %s)",
+            [list(keys), _to_datetime(time.time())],
+            fetch=True,
+            hot=True,
+        )
+        return {
+            key: Entry(pickle.loads(value), _to_timestamp(fresh_until), _to_timestamp(expires_at))
+            for key, value, fresh_until, expires_at in rows or ()
+        }
+
+    def _lookup(self, keys):
+        """
+        Return {key: (entry, tier)} for the keys found in the process, then in the shared table.
+        """
+        found, missing = {}, []
+        now = time.monotonic()
+        for key in keys:
+            local = self._local.get(key)
+            if local is not None and local[0] > now:
+                found[key] = (local[1], "local")
+            else:
+                missing.append(key)
+
+        if missing:
+            for key, entry in self._read(missing).items():
+                self._set_local(key, entry)
+                found[key] = (entry, "shared")
+        return found
+
+    def _write(self, key, entry, only_if_missing=False):
+        """
+        Upsert the entry, or only insert it when the key has no fresh entry. Return whether it was written.
+        """
+        sql = (
+            f"INSERT INTO {self._table} (key, value, fresh_until, expires_at) VALUES (%s, %s, %s, %s) "
+            "ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value, fresh_until = EXCLUDED.fresh_until, "
+            "expires_at = EXCLUDED.expires_at"
+        )
+        params = [
+            key,
+            pickle.dumps(entry.value, pickle.HIGHEST_PROTOCOL),
+            _to_datetime(entry.fresh_until),
+            _to_datetime(entry.expires_at),
+        ]
+        if only_if_missing:
+            sql += f" WHERE {self._table}.fresh_until IS NOT NULL AND {self._table}.fresh_until <= %s RETURNING key"
+            params.append(_to_datetime(time.time()))
+
+        written = self._execute(sql, params, fetch=only_if_missing)
+        if written is None:
+            # The shared table is unavailable, the entry is only cached in the process.
+            written = not only_if_missing or self._local.get(key) is None
+        elif only_if_missing:
+            written = bool(written)
+
+        if written:
+            self._set_local(key, entry)
+            if next(self._tier.writes) % self.cull_every == 0:
+                self._cull()
+        return written
+
+    def _cull(self):
+        self._execute(f"DELETE FROM {self._table} WHERE expires_at <= %s", [_to_datetime(time.time())])
+
+    def _make_entry(self, value, timeout, stale_timeout=0):
+        timeout = self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+        if timeout is None:
+            return Entry(value, None, None)
+        fresh_until = time.time() + timeout
+        return Entry(value, fresh_until, fresh_until + stale_timeout)
+
+    def _record(self, namespace, tier):
+        metrics.incr(f"cache.{namespace}.{tier}_hits" if tier else f"cache.{namespace}.misses")
+
+    # Django cache API
+
+    def get(self, key, default=None, version=None):
+        namespace, key = self._make_key(key, version)
+        entry, tier = self._lookup([key]).get(key, (None, None))
+        if entry is None or not entry.is_fresh(time.time()):
+            self._record(namespace, None)
+            return default
+
+        self._record(namespace, tier)
+        return entry.value
+
+    def get_many(self, keys, version=None):
+        keys = {self._make_key(key, version): key for key in keys}
+        found = self._lookup([key for _, key in keys])
+        now = time.time()
+        values = {}
+        for (namespace, key), original_key in keys.items():
+            entry, tier = found.get(key, (None, None))
+            if entry is None or not entry.is_fresh(now):
+                self._record(namespace, None)
+            else:
+                self._record(namespace, tier)
+                values[original_key] = entry.value
+        return values
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        if timeout is not DEFAULT_TIMEOUT and timeout is not None and timeout <= 0:
+            self.delete(key, version=version)
+            return
+        _, key = self._make_key(key, version)
+        self._write(key, self._make_entry(value, timeout))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        if timeout is not DEFAULT_TIMEOUT and timeout is not None and timeout <= 0:
+            return False
+        _, key = self._make_key(key, version)
+        return self._write(key, self._make_entry(value, timeout), only_if_missing=True)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        _, key = self._make_key(key, version)
+        entry = self._make_entry(None, timeout)
+        self._local.delete(key)
+        updated = self._execute(
+            f"UPDATE {self._table} SET fresh_until = %s, expires_at = %s "
+            "WHERE key = %s AND (fresh_until IS NULL OR fresh_until > %s)",
+            [_to_datetime(entry.fresh_until), _to_datetime(entry.expires_at), key, _to_datetime(time.time())],
+        )
+        return bool(updated)
+
+    def delete(self, key, version=None):
+        _, key = self._make_key(key, version)
+        self._local.delete(key)
+        return bool(self._execute(f"DELETE FROM {self._table} WHERE key = %s", [key]))
+
+    def incr(self, key, delta=1, version=None):
+        namespace, key = self._make_key(key, version)
+        connection = connections[self.database]
+        try:
+            # The row lock serializes the increments of the instances.
+            with transaction.atomic(using=self.database), connection.cursor() as cursor:
+                cursor.execute(
+                    f"SELECT value, fresh_until, expires_at FROM {self._table} "
+                    "WHERE key = %s AND (fresh_until IS NULL OR fresh_until > %s) FOR UPDATE",
+                    [key, _to_datetime(time.time())],
+                )
+                row = cursor.fetchone()
+                if row is None:
+                    raise ValueError(f"Key '{key}' not found")
+
+                entry = Entry(pickle.loads(row[0]) + delta, _to_timestamp(row[1]), _to_timestamp(row[2]))
+                cursor.execute(
+                    f"UPDATE {self._table} SET value = %s WHERE key = %s",
+                    [pickle.dumps(entry.value, pickle.HIGHEST_PROTOCOL), key],
+                )
+        except DatabaseError:
+            logger.warning("The shared cache is unavailable.", exc_info=True)
+            metrics.incr("shared_cache.errors")
+            local = self._local.get(key)
+            if local is None:
+                raise ValueError(f"Key '{key}' not found")
+            entry = local[1]._replace(value=local[1].value + delta)
+
+        self._set_local(key, entry)
+        return entry.value
+
+    def clear(self):
+        self._local.clear()
+        self._versions.clear()
+        self._execute(f"DELETE FROM {self._table}", [])
+
+    # Stampede protection
+
+    def _lock(self, key):
+        lock_key = FILL_LOCK_KEY.format(key)
+        entry = Entry(True, time.time() + self.lock_timeout, time.time() + self.lock_timeout)
+        # The lock is a row of the shared table, so that a single instance fills the entry.
+        locked = self._execute(
+            f"INSERT INTO {self._table} (key, value, fresh_until, expires_at) VALUES (%s, %s, %s, %s) "
+            "ON CONFLICT (key) DO UPDATE SET fresh_until = EXCLUDED.fresh_until, expires_at = EXCLUDED.expires_at "
+            f"WHERE {self._table}.expires_at <= %s RETURNING key",
+            [
+                lock_key,
+                pickle.dumps(True),
+                _to_datetime(entry.fresh_until),
+                _to_datetime(entry.expires_at),
+                _to_datetime(time.time()),
+            ],
+            fetch=True,
+        )
+        # Without the shared table, the process lock is the only one.
+        return locked is None or bool(locked)
+
+    def _unlock(self, key):
+        self._execute(f"DELETE FROM {self._table} WHERE key = %s", [FILL_LOCK_KEY.format(key)])
+
+    def _wait_for_fill(self, key, deadline):
+        while time.monotonic() < deadline:
+            time.sleep(FILL_POLL_INTERVAL)
+            entry = self._read([key]).get(key)
+            if entry is not None and entry.is_fresh(time.time()):
+                self._set_local(key, entry)
+                return entry.value
+        return _MISSING
+
+    def _compute(self, namespace, key, default, timeout, stale_timeout):
+        value = default() if callable(default) else default
+        self._write(key, self._make_entry(value, timeout, stale_timeout))
+        metrics.incr(f"cache.{namespace}.fills")
+        return value
+
+    def _fill(self, namespace, key, default, timeout, stale_timeout, wait):
+        """
+        Compute and store the entry, once per key across the threads of the process (see utils.singleflight) and
+        across the instances (a lock row of the shared table). Return _MISSING when wait is False and another caller
+        is filling it.
+        """
+        if not wait and self._fills.is_running(key):
+            return _MISSING
+        return self._fills.do(key, self._fill_once, namespace, key, default, timeout, stale_timeout, wait)
+
+    def _fill_once(self, namespace, key, default, timeout, stale_timeout, wait):
+        # Filled by another thread of the process meanwhile.
+        entry, _ = self._lookup([key]).get(key, (None, None))
+        if entry is not None and entry.is_fresh(time.time()):
+            return entry.value
+
+        if self._lock(key):
+            try:
+                return self._compute(namespace, key, default, timeout, stale_timeout)
+            finally:
+                self._unlock(key)
+
+        if not wait:
+            return _MISSING
+        value = self._wait_for_fill(key, time.monotonic() + self.lock_timeout)
+        if value is _MISSING:
+            # The instance filling the entry is too slow, compute the value anyway.
+            value = self._compute(namespace, key, default, timeout, stale_timeout)
+        return value
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None, stale_timeout=None):
+        """
+        Return the value of the key, or set it to default (called when it's callable).
+
+        A missing value is computed by a single caller, across the threads and the instances: the others wait for it,
+        for up to LOCK_TIMEOUT when it's computed by another instance. An entry past its timeout is still served for
+        stale_timeout seconds (STALE_TIMEOUT by default) while a single caller refreshes it.
+        """
+        namespace, key = self._make_key(key, version)
+        stale_timeout = self.stale_timeout if stale_timeout is None else stale_timeout
+        entry, tier = self._lookup([key]).get(key, (None, None))
+        if entry is not None and entry.is_fresh(time.time()):
+            self._record(namespace, tier)
+            return entry.value
+
+        if entry is not None:
+            metrics.incr(f"cache.{namespace}.stale")
+            value = self._fill(namespace, key, default, timeout, stale_timeout, wait=False)
+            return entry.value if value is _MISSING else value
+
+        self._record(namespace, None)
+        value = self._fill(namespace, key, default, timeout, stale_timeout, wait=True)
+        if value is _MISSING:
+            # Joined the refresh of a stale entry, which another instance is refreshing.
+            value = self._compute(namespace, key, default, timeout, stale_timeout)
+        return value
+
+    async def aget_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None, stale_timeout=None):
+        return await sync_to_async(self.get_or_set)(key, default, timeout, version, stale_timeout)
+
+
+def get_cache_stats():
+    """
+    Hits (served from the process or from the shared table), misses, stale hits, fills and invalidations of every
+    namespace of the cache in this process.
+    """
+    counters = metrics.snapshot("cache.")["counters"]
+    stats = defaultdict(lambda: dict.fromkeys(["local_hits", "shared_hits", "misses", "stale", "fills"], 0))
+    for name, value in counters.items():
+        namespace, _, counter = name[len("cache.") :].rpartition(".")
+        stats[namespace][counter] = value
+
+    for namespace_stats in stats.values():
+        # The stale entries are served too.
+        hits = namespace_stats["local_hits"] + namespace_stats["shared_hits"] + namespace_stats["stale"]
+        lookups = hits + namespace_stats["misses"]
+        namespace_stats["hit_ratio"] = hits / lookups if lookups else None
+
+    errors = metrics.snapshot("shared_cache.")["counters"].get("shared_cache.errors", 0)
+    return {"namespaces": dict(stats), "shared_errors": errors}
@@ -0,0 +1,126 @@
+# Standard Library Imports
+import hashlib
+from enum import Enum
+from typing import NamedTuple
+
+# Third Party Library Imports
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+
+# App Imports
+from utils import metrics
+
+
+COUNT_CACHE_KEY = "count:{}"
+
+
+class CountStrategy(Enum):
+    """
+    How the number of rows of a queryset is obtained, from the most to the least accurate.
+    """
+
+    # COUNT(*) on every call.
+    EXACT = "exact"
+    # COUNT(*) cached for CONNECTION_COUNT_CACHE_TIMEOUT seconds, keyed by the SQL of the queryset, i.e. its filters.
+    CACHED = "cached"
+    # Row estimate of the planner statistics (pg_class.reltuples) for unfiltered querysets, capped count otherwise.
+    ESTIMATE = "estimate"
+    # COUNT(*) which stops after CONNECTION_COUNT_CAP rows, displayed as "10,000+".
+    CAPPED = "capped"
+
+
+class Count(NamedTuple):
+    value: int
+    # False for the estimates and the counts reaching the cap.
+    exact: bool
+
+
+def count_exact(queryset):
+    return Count(queryset.count(), True)
+
+
+def get_count_cache_key(queryset):
+    try:
+        sql, params = queryset.order_by().query.sql_with_params()
+    except EmptyResultSet:
+        return None
+
+    key = f"{queryset.db}:{sql}:{params!r}"
+    return COUNT_CACHE_KEY.format(hashlib.sha256(key.encode("utf-8")).hexdigest())
+
+
+def count_cached(queryset, timeout=None):
+    key = get_count_cache_key(queryset)
+    if key is None:
+        return Count(0, True)
+
+    counted = False
+
+    def count():
+        nonlocal counted
+        counted = True
+        return queryset.count()
+
+    # The concurrent misses of the key share a single count, see utils.cache.TieredCache.get_or_set.
+    value = cache.get_or_set(key, count, settings.CONNECTION_COUNT_CACHE_TIMEOUT if timeout is None else timeout)
+    metrics.incr("counts.cache.misses" if counted else "counts.cache.hits")
+    return Count(value, True)
+
+
+def count_capped(queryset, cap=None):
+    """
+    Count at most cap + 1 rows: COUNT(*) over a LIMIT subquery, which stops scanning early on large tables.
+    """
+    cap = settings.CONNECTION_COUNT_CAP if cap is None else cap
+    value = queryset[: cap + 1].count()
+    return Count(min(value, cap), value <= cap)
+
+
+def is_unfiltered(queryset):
+    query = queryset.query
+    return not query.where and not query.distinct and not query.low_mark and query.high_mark is None
+
+
+def get_table_estimate(model, using):
+    """
+    Number of rows of the table according to the planner statistics, None if the table was never analyzed.
+    """
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)",
+            [connection.ops.quote_name(model._meta.db_table)],
+        )
+        row = cursor.fetchone()
+
+    return row[0] if row and row[0] >= 0 else None
+
+
+def estimate_count(queryset, cap=None):
+    """
+    Use the planner statistics for the unfiltered querysets, they are refreshed by autovacuum and are usually within a
+    few percent of the real count. Small tables and filtered querysets are counted with count_capped.
+    """
+    cap = settings.CONNECTION_COUNT_CAP if cap is None else cap
+    if is_unfiltered(queryset) and connections[queryset.db].vendor == "postgresql":
+        estimate = get_table_estimate(queryset.model, queryset.db)
+        if estimate is not None and estimate > cap:
+            return Count(estimate, False)
+
+    return count_capped(queryset, cap)
+
+
+def get_count(queryset, strategy=CountStrategy.EXACT, cap=None, timeout=None):
+    with metrics.timer(f"counts.{strategy.value}.latency"):
+        if strategy == CountStrategy.CACHED:
+            return count_cached(queryset, timeout)
+
+        if strategy == CountStrategy.ESTIMATE:
+            return estimate_count(queryset, cap)
+
+        if strategy == CountStrategy.CAPPED:
+            return count_capped(queryset, cap)
+
+        return count_exact(queryset)
@@ -0,0 +1,38 @@
+# Third Party Library Imports
+from django.db import connections
+
+
+def get_pool(alias):
+    connection = connections[alias]
+    return getattr(connection, "pool", None) if connection.settings_dict["OPTIONS"].get("pool") else None
+
+
+def get_pool_stats():
+    """
+    Stats of the connection pool of every database of this process, see psycopg_pool's get_stats: the size of the
+    pool, the requests which waited for a connection and for how long, how long the connections were used, and the
+    connections opened, lost or failing the health check.
+
+    The counters are cumulative since the pool was opened, the averages are derived from them.
+    """
+    stats = {}
+    for alias in connections:
+        pool = get_pool(alias)
+        if pool is None:
+            continue
+
+        pool_stats = pool.get_stats()
+        requests = pool_stats.get("requests_num", 0)
+        queued = pool_stats.get("requests_queued", 0)
+        connections_num = pool_stats.get("connections_num", 0)
+        pool_stats.update(
+            {
+                # Share of the requests which found no idle connection and waited for one.
+                "requests_queued_ratio": queued / requests if requests else None,
+                "requests_wait_ms_avg": pool_stats.get("requests_wait_ms", 0) / queued if queued else None,
+                "usage_ms_avg": pool_stats.get("usage_ms", 0) / requests if requests else None,
+                "connections_ms_avg": pool_stats.get("connections_ms", 0) / connections_num if connections_num else None,
+            }
+        )
+        stats[alias] = pool_stats
+    return stats
@@ -1,25 +1,107 @@
+# Standard Library Imports
+from typing import NamedTuple
+
 # Third Party Library Imports
 import graphene
+from django.db.models import QuerySet
 from graphene.relay import Connection
+from graphene.relay.connection import connection_adapter
+from graphene.relay.connection import page_info_adapter
 from graphene.utils.str_converters import to_snake_case
 from graphene_django.filter import DjangoFilterConnectionField
+from graphene_django.settings import graphene_settings
+from graphene_django.utils import maybe_queryset
+from graphql_relay import cursor_to_offset
+from graphql_relay import get_offset_with_default
+from graphql_relay import offset_to_cursor
 
 # App Imports
 from utils.commons import sequencify
+from utils.counts import Count
+from utils.counts import CountStrategy
+from utils.counts import get_count
+from utils.graphql.pagination import Pagination
+from utils.graphql.pagination import decode_cursor
+from utils.graphql.pagination import encode_cursor
+from utils.graphql.pagination import get_keyset_ordering
+from utils.graphql.pagination import get_order_by
+from utils.graphql.pagination import seek
+
+
+class CountOptions(NamedTuple):
+    strategy: CountStrategy = CountStrategy.EXACT
+    cap: int = None
+    timeout: int = None
 
 
 class CountableConnection(Connection):
     total_count = graphene.NonNull(graphene.Int)
+    is_total_count_exact = graphene.NonNull(
+        graphene.Boolean, description="False when totalCount is an estimate, or capped and displayed as 10,000+."
+    )
 
     class Meta:
         abstract = True
 
+    def get_total_count(self):
+        """
+        Count the items with the strategy of the connection field, only when the total count is requested. The exact
+        count is reused when the page had to be sliced with it.
+        """
+        if getattr(self, "_total_count", None) is None:
+            count_options = getattr(self, "count_options", None) or CountOptions()
+            if self.length is not None:
+                self._total_count = Count(self.length, True)
+            else:
+                self._total_count = get_count(
+                    self.iterable, count_options.strategy, count_options.cap, count_options.timeout
+                )
+        return self._total_count
+
     # Method returns a value of you want to add parameters
     def resolve_total_count(self, info):
-        return self.length
+        return self.get_total_count().value
+
+    def resolve_is_total_count_exact(self, info):
+        return self.get_total_count().exact
+
+
+class _ConnectionQuerySet(NamedTuple):
+    queryset: QuerySet
+    count_options: CountOptions
+    pagination: Pagination
 
 
 class OrderedDjangoFilterConnectionField(DjangoFilterConnectionField):
+    """
+    Filter connection field with ordering and a selectable strategy to count the items, see utils.counts.
+
+    Apart from the exact strategy, the page is fetched without counting the items beforehand: one extra row tells
+    whether there is a next page, and the total count is computed only if requested. Paginating with last still
+    needs the exact count.
+
+    With the keyset pagination, the cursors hold the values of the order fields of a row, and a page is a seek past
+    the cursor, e.g. WHERE (created_at, id) > (...), whose cost doesn't depend on the depth of the page. The orderings
+    which can't be expressed with the values of a row fall back to the offset pagination, see get_keyset_ordering.
+    """
+
+    def __init__(
+        self,
+        *args,
+        count_strategy=CountStrategy.EXACT,
+        count_cap=None,
+        count_cache_timeout=None,
+        pagination=Pagination.OFFSET,
+        **kwargs,
+    ):
+        self.count_options = CountOptions(count_strategy, count_cap, count_cache_timeout)
+        self.pagination = pagination
+        super().__init__(*args, **kwargs)
+
+    def wrap_resolve(self, parent_resolver):
+        # DjangoConnectionField ignores the resolver given to the field and only uses the resolve_<name> method.
+        return super().wrap_resolve(self.resolver or parent_resolver)
+
     @staticmethod
     def parse_order_field(field):
         return to_snake_case(field) if isinstance(field, str) else field.value
@@ -34,3 +116,142 @@ class OrderedDjangoFilterConnectionField(DjangoFilterConnectionField):
             return qs
 
         return qs.order_by(*map(cls.parse_order_field, sequencify(order)))
+
+    def get_queryset_resolver(self):
+        resolve_queryset = super().get_queryset_resolver()
+
+        def resolver(connection, iterable, info, args):
+            return _ConnectionQuerySet(
+                resolve_queryset(connection, iterable, info, args), self.count_options, self.pagination
+            )
+
+        return resolver
+
+    @classmethod
+    def resolve_connection(cls, connection, args, iterable, max_limit=None):
+        count_options, pagination = CountOptions(), Pagination.OFFSET
+        if isinstance(iterable, _ConnectionQuerySet):
+            iterable, count_options, pagination = iterable
+
+        iterable = maybe_queryset(iterable)
+        order_fields = None
+        if pagination == Pagination.KEYSET and isinstance(iterable, QuerySet):
+            order_fields = get_keyset_ordering(iterable)
+
+        if order_fields is not None:
+            connection = cls.resolve_keyset_connection(connection, args, iterable, order_fields, max_limit)
+        elif (
+            count_options.strategy == CountStrategy.EXACT
+            or args.get("last") is not None
+            or not isinstance(iterable, QuerySet)
+        ):
+            connection = super().resolve_connection(connection, args, iterable, max_limit)
+        else:
+            connection = cls.resolve_connection_without_count(connection, args, iterable, max_limit)
+
+        connection.count_options = count_options
+        return connection
+
+    @classmethod
+    def resolve_connection_without_count(cls, connection, args, queryset, max_limit=None):
+        # Same handling of the offset parameter as DjangoConnectionField.resolve_connection.
+        offset = args.pop("offset", None)
+        after = args.get("after")
+        if offset:
+            if after:
+                offset += cursor_to_offset(after) + 1
+            args["after"] = offset_to_cursor(offset - 1)
+
+        start = get_offset_with_default(args.get("after"), -1) + 1
+        first = args.get("first")
+        if first is None:
+            first = max_limit
+
+        stop = None
+        if args.get("before"):
+            stop = max(get_offset_with_default(args.get("before"), start), start)
+        if first is not None:
+            # One extra row tells whether there is a next page.
+            stop = min(stop, start + first + 1) if stop is not None else start + first + 1
+
+        nodes = list(queryset[start:stop])
+        has_next_page = first is not None and len(nodes) > first
+        if first is not None:
+            nodes = nodes[:first]
+
+        edges = [connection.Edge(node=node, cursor=offset_to_cursor(start + i)) for i, node in enumerate(nodes)]
+        connection = connection_adapter(
+            connection,
+            edges=edges,
+            pageInfo=page_info_adapter(
+                startCursor=edges[0].cursor if edges else None,
+                endCursor=edges[-1].cursor if edges else None,
+                hasPreviousPage=False,
+                hasNextPage=has_next_page,
+            ),
+        )
+        connection.iterable = queryset
+        connection.length = None
+        return connection
+
+    @staticmethod
+    def load_order_fields(queryset, order_fields):
+        """
+        Make sure the values of the cursors are fetched with the rows when the queryset is restricted with only().
+        """
+        names, defer = queryset.query.deferred_loading
+        if not names:
+            return queryset
+
+        order_names = {f.field.name for f in order_fields}
+        if defer:
+            return queryset.defer(None).defer(*(names - order_names))
+        return queryset.only(*names, *order_names)
+
+    @classmethod
+    def resolve_keyset_connection(cls, connection, args, queryset, order_fields, max_limit=None):
+        first = args.get("first")
+        last = args.get("last")
+        after = args.get("after")
+        before = args.get("before")
+        offset = args.get("offset") or 0
+        if first is None and last is None:
+            # Unlike the offset pagination, the keyset page is always bounded.
+            first = max_limit if max_limit is not None else graphene_settings.RELAY_CONNECTION_MAX_LIMIT
+
+        page = cls.load_order_fields(queryset, order_fields)
+        if after:
+            page = seek(page, order_fields, decode_cursor(order_fields, after))
+        if before:
+            page = seek(page, order_fields, decode_cursor(order_fields, before), reverse=True)
+
+        if first is None:
+            # The last rows before the cursor are the first ones in the reverse order, one extra row tells whether
+            # there is a previous page.
+            nodes = list(page.order_by(*get_order_by(order_fields, reverse=True))[: last + 1])
+            has_previous_page = len(nodes) > last
+            nodes = nodes[:last][::-1]
+            has_next_page = bool(before)
+        else:
+            nodes = list(page.order_by(*get_order_by(order_fields))[offset : offset + first + 1])
+            has_next_page = len(nodes) > first
+            nodes = nodes[:first]
+            has_previous_page = bool(after) or offset > 0
+            if last is not None and len(nodes) > last:
+                nodes = nodes[-last:]
+                has_previous_page = True
+
+        edges = [connection.Edge(node=node, cursor=encode_cursor(order_fields, node)) for node in nodes]
+        connection = connection_adapter(
+            connection,
+            edges=edges,
+            pageInfo=page_info_adapter(
+                startCursor=edges[0].cursor if edges else None,
+                endCursor=edges[-1].cursor if edges else None,
+                hasPreviousPage=has_previous_page,
+                hasNextPage=has_next_page,
+            ),
+        )
+        connection.iterable = queryset
+        connection.length = None
+        return connection
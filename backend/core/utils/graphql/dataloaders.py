@@ -0,0 +1,414 @@
+# Standard Library Imports
+import asyncio
+import inspect
+from collections import defaultdict
+
+# Third Party Library Imports
+from asgiref.sync import sync_to_async
+from django.db.models import F
+from django.db.models import Window
+from django.db.models.functions import RowNumber
+from graphql import ExecutionContext
+from graphql.pyutils import is_iterable
+
+# App Imports
+from utils import metrics
+from utils.graphql.pagination import get_keyset_ordering
+from utils.graphql.pagination import get_order_by
+from utils.graphql.pagination import seek
+
+
+_MISSING = object()
+
+
+def _in_event_loop():
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+
+def then(value, callback):
+    """
+    Apply the callback to the value the loader returned, which is awaitable when the query is executed
+    asynchronously.
+    """
+    if inspect.isawaitable(value):
+
+        async def await_value():
+            return callback(await value)
+
+        return await_value()
+
+    return callback(value)
+
+
+def get_loader(info, loader_class, *args):
+    """
+    Return the loader of the given class and arguments for the current request, loaders are stored on info.context so
+    that their cache never outlives the request.
+    """
+    loaders = info.context.__dict__.setdefault("_dataloaders", {})
+    key = (loader_class, *args)
+    if key not in loaders:
+        loaders[key] = loader_class(*args)
+    return loaders[key]
+
+
+def clear_loaders(context):
+    """
+    Drop the loaders of the request, e.g. after a mutation of a batched request, so that the following operations
+    don't read the values loaded before it.
+    """
+    context.__dict__.pop("_dataloaders", None)
+    context.__dict__.pop("_dataloader_lists", None)
+
+
+class DataLoaderExecutionContext(ExecutionContext):
+    """
+    Records every list completed in the response on info.context, so that a loader called for one item of a list can
+    load the keys of all its siblings at once during synchronous execution.
+    """
+
+    def complete_list_value(self, return_type, field_nodes, info, path, result):
+        if is_iterable(result):
+            result = list(result)
+            info.context.__dict__.setdefault("_dataloader_lists", {})[tuple(path.as_list())] = result
+        return super().complete_list_value(return_type, field_nodes, info, path, result)
+
+
+def get_siblings(root, info):
+    """
+    Return the objects resolved at the same position as root in the closest enclosing list, e.g. all the nodes of a
+    connection, or an empty list when root is not part of a list.
+    """
+    lists = getattr(info.context, "_dataloader_lists", None)
+    if not lists:
+        return []
+
+    path, keys = info.path.prev, []
+    while path is not None and not isinstance(path.key, int):
+        keys.append(path.key)
+        path = path.prev
+
+    items = lists.get(tuple(path.prev.as_list())) if path is not None and path.prev is not None else None
+    if not items:
+        return []
+
+    siblings = []
+    for item in items:
+        for key in reversed(keys):
+            item = item.get(key) if isinstance(item, dict) else getattr(item, key, None)
+        siblings.append(item)
+
+    # Response keys may be aliases, give up on batching rather than loading the wrong objects.
+    if path.key >= len(siblings) or siblings[path.key] is not root:
+        return []
+
+    return [sibling for sibling in siblings if sibling is not None and sibling is not root]
+
+
+class DataLoader(object):
+    """
+    Batches and caches the loads of a single request, use get_loader to get the instance scoped to the request.
+
+    Subclasses implement batch_load, which is given the list of unique keys and returns their values in the same
+    order (None for the missing ones). Under async execution the keys requested during the same iteration of the
+    event loop are loaded together.
+    """
+
+    def __init__(self):
+        self._values = {}
+        self._futures = {}
+        self._queue = []
+        self._tasks = set()
+
+    @property
+    def name(self):
+        return type(self).__name__
+
+    def batch_load(self, keys):
+        raise NotImplementedError
+
+    def _batch_load(self, keys):
+        metrics.incr(f"dataloader.{self.name}.batches")
+        metrics.incr(f"dataloader.{self.name}.keys", len(keys))
+        with metrics.timer(f"dataloader.{self.name}.latency"):
+            return list(self.batch_load(keys))
+
+    def prime(self, key, value):
+        self._values.setdefault(key, value)
+
+    def clear(self, key=_MISSING):
+        if key is _MISSING:
+            self._values.clear()
+            self._futures.clear()
+        else:
+            self._values.pop(key, None)
+            self._futures.pop(key, None)
+
+    def load_many(self, keys):
+        missing = [key for key in dict.fromkeys(keys) if key not in self._values]
+        if missing:
+            self._values.update(zip(missing, self._batch_load(missing)))
+        return [self._values[key] for key in keys]
+
+    def load(self, key, sibling_keys=()):
+        if key in self._values:
+            return self._values[key]
+        return self.load_many([key, *sibling_keys])[0]
+
+    def load_async(self, key):
+        if key in self._futures:
+            return self._futures[key]
+
+        loop = asyncio.get_running_loop()
+        future = self._futures[key] = loop.create_future()
+        if key in self._values:
+            future.set_result(self._values[key])
+            return future
+
+        if not self._queue:
+            loop.call_soon(self._schedule_dispatch, loop)
+        self._queue.append(key)
+        return future
+
+    def _schedule_dispatch(self, loop):
+        # The event loop only keeps a weak reference to its tasks, the pending dispatches are kept until they're done.
+        task = loop.create_task(self._dispatch())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self):
+        keys, self._queue = self._queue, []
+        try:
+            values = await sync_to_async(self._batch_load)(keys)
+        except Exception as e:
+            for key in keys:
+                self._futures.pop(key).set_exception(e)
+            return
+
+        for key, value in zip(keys, values):
+            self._values[key] = value
+            self._futures[key].set_result(value)
+
+
+class RelationLoader(DataLoader):
+    """
+    Loads a relation of model instances, see resolve.
+    """
+
+    def get_key(self, root):
+        raise NotImplementedError
+
+    def get_cached_value(self, root):
+        return _MISSING
+
+    def resolve(self, root, info):
+        """
+        Return the related value of root, without a query if the relation was already fetched by the optimizer.
+        Returns an awaitable under async execution, see then.
+        """
+        value = self.get_cached_value(root)
+        if value is not _MISSING:
+            return value
+
+        key = self.get_key(root)
+        if key is None:
+            return None
+
+        if _in_event_loop():
+            return self.load_async(key)
+
+        sibling_keys = []
+        for sibling in get_siblings(root, info):
+            if isinstance(sibling, type(root)) and self.get_cached_value(sibling) is _MISSING:
+                sibling_key = self.get_key(sibling)
+                if sibling_key is not None:
+                    sibling_keys.append(sibling_key)
+
+        return self.load(key, sibling_keys)
+
+
+class ForeignKeyLoader(RelationLoader):
+    """
+    Loads the object a foreign key (or one-to-one field) of model points to.
+    """
+
+    def __init__(self, model, field_name):
+        super().__init__()
+        self.field = model._meta.get_field(field_name)
+
+    @property
+    def name(self):
+        return f"{self.field.model._meta.label_lower}.{self.field.name}"
+
+    def get_key(self, root):
+        return getattr(root, self.field.attname)
+
+    def get_cached_value(self, root):
+        return self.field.get_cached_value(root) if self.field.is_cached(root) else _MISSING
+
+    def batch_load(self, keys):
+        attname = self.field.target_field.attname
+        objects = self.field.related_model._default_manager.filter(**{f"{attname}__in": keys})
+        objects = {getattr(obj, attname): obj for obj in objects}
+        return [objects.get(key) for key in keys]
+
+
+class ReverseForeignKeyLoader(RelationLoader):
+    """
+    Loads the lists of objects of model whose field_name points to root. The field can also be a plain field holding
+    the primary key of root, like the id of the historical records.
+    """
+
+    def __init__(self, model, field_name):
+        super().__init__()
+        self.model = model
+        self.field = model._meta.get_field(field_name)
+
+    @property
+    def name(self):
+        return f"{self.model._meta.label_lower}.{self.field.name}"
+
+    def get_key(self, root):
+        return getattr(root, self.field.target_field.attname) if self.field.is_relation else root.pk
+
+    def get_cached_value(self, root):
+        prefetched = getattr(root, "_prefetched_objects_cache", {})
+        if self.field.is_relation and self.field.remote_field.cache_name in prefetched:
+            return list(prefetched[self.field.remote_field.cache_name])
+        return _MISSING
+
+    def batch_load(self, keys):
+        objects = defaultdict(list)
+        for obj in self.model._default_manager.filter(**{f"{self.field.attname}__in": keys}):
+            objects[getattr(obj, self.field.attname)].append(obj)
+        return [objects[key] for key in keys]
+
+
+class ReverseForeignKeyPageLoader(ReverseForeignKeyLoader):
+    """
+    Loads the first objects of model whose field_name points to root, in a single query for all the roots: the
+    objects are numbered per root with a window function and the ones past the page are filtered out.
+
+    The page starts after the values of the keyset ordering in after, see utils.graphql.pagination. Only the fields
+    of the ordering and the given fields are fetched. The values are (objects, has_previous_page, has_next_page)
+    tuples.
+    """
+
+    def __init__(self, model, field_name, ordering, first, after=None, only=()):
+        super().__init__(model, field_name)
+        self.order_fields = get_keyset_ordering(model._default_manager.order_by(*ordering))
+        if self.order_fields is None:
+            raise ValueError(f"The ordering {ordering} can't be paginated with keyset cursors.")
+
+        self.first = first
+        self.after = after
+        self.only = only
+
+    @property
+    def name(self):
+        return f"{super().name}.page"
+
+    def get_cached_value(self, root):
+        return _MISSING
+
+    def batch_load(self, keys):
+        attname = self.field.attname
+        order_by = get_order_by(self.order_fields)
+        queryset = self.model._default_manager.filter(**{f"{attname}__in": keys})
+        if self.after is not None:
+            queryset = seek(queryset, self.order_fields, self.after)
+
+        if self.only:
+            queryset = queryset.only(self.field.name, *(f.field.name for f in self.order_fields), *self.only)
+
+        # One extra object per root tells whether there is a next page.
+        queryset = (
+            queryset.annotate(_page_row=Window(RowNumber(), partition_by=F(attname), order_by=order_by))
+            .filter(_page_row__lte=self.first + 1)
+            .order_by(*order_by)
+        )
+
+        objects = defaultdict(list)
+        for obj in queryset:
+            objects[getattr(obj, attname)].append(obj)
+
+        keys_with_previous_page = self.get_keys_with_previous_page(keys)
+        return [
+            (objects[key][: self.first], key in keys_with_previous_page, len(objects[key]) > self.first)
+            for key in keys
+        ]
+
+    def get_keys_with_previous_page(self, keys):
+        """
+        Keys of the roots having objects up to the after cursor, i.e. before the page, in a single query.
+        """
+        if self.after is None:
+            return set()
+
+        attname = self.field.attname
+        queryset = self.model._default_manager.filter(**{f"{attname}__in": keys})
+        # The pk is the last field of the ordering, it identifies the object of the cursor.
+        previous = seek(queryset, self.order_fields, self.after, reverse=True) | queryset.filter(pk=self.after[-1])
+        return set(previous.order_by().values_list(attname, flat=True).distinct())
+
+
+class ManyToManyLoader(RelationLoader):
+    """
+    Loads the lists of objects related to root through a many-to-many field of model, or its reverse relation, with
+    a single query on the through table.
+    """
+
+    def __init__(self, model, field_name):
+        super().__init__()
+        field = model._meta.get_field(field_name)
+        self.model = model
+        self.field_name = field_name
+        if field.concrete:
+            self.m2m_field = field
+            self.source, self.target = field.m2m_field_name(), field.m2m_reverse_field_name()
+            self.cache_name = field.name
+        else:
+            self.m2m_field = field.field
+            self.source, self.target = field.field.m2m_reverse_field_name(), field.field.m2m_field_name()
+            self.cache_name = field.field.related_query_name()
+
+    @property
+    def name(self):
+        return f"{self.model._meta.label_lower}.{self.field_name}"
+
+    def get_key(self, root):
+        return root.pk
+
+    def get_cached_value(self, root):
+        prefetched = getattr(root, "_prefetched_objects_cache", {})
+        return list(prefetched[self.cache_name]) if self.cache_name in prefetched else _MISSING
+
+    def batch_load(self, keys):
+        through = self.m2m_field.remote_field.through
+        source_attname = through._meta.get_field(self.source).attname
+        objects = defaultdict(list)
+        for row in through._default_manager.filter(**{f"{self.source}__in": keys}).select_related(self.target):
+            objects[getattr(row, source_attname)].append(getattr(row, self.target))
+        return [objects[key] for key in keys]
+
+
+def load_related(root, info, field_name):
+    """
+    Load the relation field_name of the model instance root through the loader of the request matching the type of
+    the relation. Returns an awaitable under async execution, see then.
+    """
+    field = type(root)._meta.get_field(field_name)
+    if field.many_to_many:
+        loader = get_loader(info, ManyToManyLoader, type(root), field_name)
+    elif field.one_to_many:
+        loader = get_loader(info, ReverseForeignKeyLoader, field.related_model, field.field.name)
+    elif field.concrete:
+        loader = get_loader(info, ForeignKeyLoader, type(root), field_name)
+    else:
+        raise ValueError(f"Loading the reverse one-to-one relation {field_name} is not supported.")
+
+    return loader.resolve(root, info)
@@ -0,0 +1,56 @@
+# Standard Library Imports
+import hashlib
+from functools import lru_cache
+
+# Third Party Library Imports
+from django.conf import settings
+from graphene_django.settings import graphene_settings
+from graphql import parse
+from graphql import print_schema
+from graphql.validation import validate
+
+# App Imports
+from utils import metrics
+from utils.lru import LRUCache
+
+
+_documents = LRUCache(maxsize=settings.GRAPHQL_DOCUMENT_CACHE_SIZE)
+
+
+def get_query_hash(query):
+    return hashlib.sha256(query.encode("utf-8")).hexdigest()
+
+
+@lru_cache(maxsize=None)
+def get_schema_version(schema):
+    """
+    Hash of the schema SDL, so documents validated against an older schema are never reused.
+    """
+    return hashlib.sha256(print_schema(schema).encode("utf-8")).hexdigest()[:16]
+
+
+def get_validated_document(schema, query, validation_rules=None):
+    """
+    Parse and validate the query, reusing the result for the queries already seen with the same schema.
+
+    The document is keyed by the full query text (including its fragments), and validation doesn't depend on the
+    variable values, so the cached result is safe to share across requests.
+
+    :raise GraphQLSyntaxError: If the query can't be parsed, these aren't cached.
+    :return: Tuple of (DocumentNode, list of validation errors).
+    """
+    key = (get_schema_version(schema), get_query_hash(query), tuple(validation_rules or ()))
+    cached = _documents.get(key)
+    if cached is not None:
+        metrics.incr("graphql.document_cache.hits")
+        return cached
+
+    metrics.incr("graphql.document_cache.misses")
+    document = parse(query)
+    validation_errors = validate(schema, document, validation_rules, graphene_settings.MAX_VALIDATION_ERRORS)
+    _documents.set(key, (document, validation_errors))
+    return document, validation_errors
+
+
+def get_document_cache_hit_rate():
+    return metrics.ratio("graphql.document_cache.hits", "graphql.document_cache.misses")
@@ -1,22 +1,40 @@
+# Standard Library Imports
+from functools import lru_cache
+
 # Third Party Library Imports
-from graphql.utilities import ast_to_dict
+from graphql import FieldNode
+from graphql import FragmentSpreadNode
 from inflection import underscore
 
+# App Imports
+from utils.lru import LRUCache
+
+
+_selections = LRUCache(maxsize=1024)
+
+
+@lru_cache(maxsize=4096)
+def underscore_name(name):
+    """
+    Cached inflection.underscore, the field names of a schema are a small, fixed set.
+    """
+    return underscore(name)
+
 
 def _collect_fields(node, fragments, ignore_typename):
     fields = {}
 
-    if node.get("selection_set"):
-        for leaf in node["selection_set"]["selections"]:
-            if leaf["kind"] == "field":
-                field = underscore(leaf["name"]["value"])
+    if node.selection_set:
+        for leaf in node.selection_set.selections:
+            if isinstance(leaf, FieldNode):
+                field = underscore_name(leaf.name.value)
                 if ignore_typename and field == "__typename":
                     continue
 
                 fields.update({field: _collect_fields(leaf, fragments, ignore_typename)})
 
-            elif leaf["kind"] == "fragment_spread":
-                fields.update(_collect_fields(fragments[leaf["name"]["value"]], fragments, ignore_typename))
+            elif isinstance(leaf, FragmentSpreadNode):
+                fields.update(_collect_fields(fragments[leaf.name.value], fragments, ignore_typename))
 
     return fields
 
@@ -25,6 +43,9 @@ def get_gql_fields(info, ignore_typename=True):
     """
     Recursively collects fields from the AST
 
+    The selection is computed once per field node, i.e. per field of a document, and shared by the resolvers of every
+    item of a list and by the requests reusing the cached document, so the returned dict must not be modified.
+
     Args:
         node (dict): A node in the AST
         fragments (dict): Fragment definitions
@@ -37,11 +58,14 @@ def get_gql_fields(info, ignore_typename=True):
                                    'totalSentiments': {}},
          'slug': {}}
     """
-    fragments = {}
+    node = info.field_nodes[0]
 
-    node = ast_to_dict(info.field_nodes[0])
+    # The node is kept in the entry, so its id can't be reused by another node while the entry is cached.
+    key = (id(node), ignore_typename)
+    entry = _selections.get(key)
+    if entry is not None and entry[0] is node:
+        return entry[1]
 
-    for name, value in info.fragments.items():
-        fragments[name] = ast_to_dict(value)
-
-    return _collect_fields(node, fragments, ignore_typename)
+    fields = _collect_fields(node, info.fragments, ignore_typename)
+    _selections.set(key, (node, fields))
+    return fields
@@ -3,10 +3,25 @@ import logging
 
 # Third Party Library Imports
 import graphene
+from django.core.exceptions import FieldDoesNotExist
+from graphene_django.settings import graphene_settings
+
+# App Imports
+from utils.graphql.dataloaders import ReverseForeignKeyPageLoader
+from utils.graphql.dataloaders import get_loader
+from utils.graphql.dataloaders import then
+from utils.graphql.exceptions import CustomGraphQLError
+from utils.graphql.fields import get_gql_fields
+from utils.graphql.pagination import decode_cursor
+from utils.graphql.pagination import encode_cursor
+from utils.graphql.pagination import get_keyset_ordering
 
 
 logger = logging.getLogger(__name__)
 
+# Latest changes first, the history_id breaks the ties of the changes saved at the same time.
+HISTORY_ORDERING = ("-history_date", "-history_id")
+
 
 class IntIdMixin(graphene.ObjectType):
     id = graphene.NonNull(graphene.Int)
@@ -19,8 +34,66 @@ class History(graphene.ObjectType):
     history_user_id = graphene.Int()
 
 
+class HistoryConnection(graphene.relay.Connection):
+    class Meta:
+        node = History
+
+
+def get_selected_history_fields(info, model):
+    """
+    Names of the model fields selected on the nodes of the history connection, to only fetch those.
+    """
+    node_fields = get_gql_fields(info).get("edges", {}).get("node", {})
+    names = []
+    for name in node_fields:
+        try:
+            names.append(model._meta.get_field(name).name)
+        except FieldDoesNotExist:
+            continue
+    return tuple(names)
+
+
 class HistoryMixin(graphene.ObjectType):
-    history = graphene.List(graphene.NonNull(History))
+    history = graphene.relay.ConnectionField(HistoryConnection)
+
+    def resolve_history(self, info, first=None, after=None, last=None, before=None):
+        """
+        A page of the historical records, latest first, with keyset cursors. The pages of all the objects of a list
+        are loaded together, see ReverseForeignKeyPageLoader.
+        """
+        if last is not None or before is not None:
+            raise CustomGraphQLError("The history can only be paginated forward, with first and after.")
+
+        model = self.history.model
+        max_limit = graphene_settings.RELAY_CONNECTION_MAX_LIMIT
+        first = min(first, max_limit) if first is not None else max_limit
+        order_fields = get_keyset_ordering(model._default_manager.order_by(*HISTORY_ORDERING))
+        after_values = tuple(decode_cursor(order_fields, after)) if after else None
+
+        loader = get_loader(
+            info,
+            ReverseForeignKeyPageLoader,
+            model,
+            "id",
+            HISTORY_ORDERING,
+            first,
+            after_values,
+            get_selected_history_fields(info, model),
+        )
+
+        def to_connection(page):
+            records, has_previous_page, has_next_page = page
+            edges = [
+                HistoryConnection.Edge(node=record, cursor=encode_cursor(order_fields, record)) for record in records
+            ]
+            return HistoryConnection(
+                edges=edges,
+                page_info=graphene.relay.PageInfo(
+                    start_cursor=edges[0].cursor if edges else None,
+                    end_cursor=edges[-1].cursor if edges else None,
+                    has_previous_page=has_previous_page,
+                    has_next_page=has_next_page,
+                ),
+            )
 
-    def resolve_history(self, info):
-        return self.history.all()
+        return then(loader.resolve(self, info), to_connection)
@@ -0,0 +1,168 @@
+# Standard Library Imports
+import datetime
+import json
+from enum import Enum
+from typing import NamedTuple
+
+# Third Party Library Imports
+from django.core.exceptions import FieldDoesNotExist
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+from django.db.models import Field
+from django.db.models import Func
+from django.db.models import Q
+from django.db.models import Value
+from django.db.models.lookups import GreaterThan
+from django.db.models.lookups import LessThan
+from graphql_relay.utils import base64
+from graphql_relay.utils import unbase64
+
+# App Imports
+from utils.graphql.exceptions import CustomGraphQLError
+
+
+KEYSET_CURSOR_PREFIX = "keyset:"
+
+
+class Pagination(Enum):
+    # Relay array connection, the cursors are offsets: OFFSET n scans the n skipped rows.
+    OFFSET = "offset"
+    # The cursors hold the values of the order fields of a row, the next page is a WHERE (a, b, pk) > (...) seek.
+    KEYSET = "keyset"
+
+
+class InvalidCursor(CustomGraphQLError):
+    message = "Invalid cursor"
+
+
+class OrderField(NamedTuple):
+    field: Field
+    descending: bool
+
+    @property
+    def name(self):
+        return self.field.attname
+
+
+class Row(Func):
+    """
+    Row value, e.g. (created_at, id), compared column by column like a tuple.
+    """
+
+    template = "(%(expressions)s)"
+    output_field = Field()
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """
+    Keeps the microseconds that DjangoJSONEncoder truncates, a cursor must hold the exact values of its row.
+    """
+
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+def get_keyset_ordering(queryset):
+    """
+    Order fields of the queryset with the pk as a tie breaker, so that a cursor points to a single row.
+
+    Returns None if the ordering can't be expressed with the values of a row: expressions, random ordering, or
+    fields of related models.
+    """
+    opts = queryset.model._meta
+    if queryset.query.order_by:
+        ordering = queryset.query.order_by
+    elif queryset.query.default_ordering and opts.ordering:
+        ordering = opts.ordering
+    else:
+        ordering = ()
+
+    order_fields = []
+    for name in ordering:
+        if not isinstance(name, str) or name == "?":
+            return None
+
+        descending = name.startswith("-")
+        name = name.lstrip("-")
+        if name == "pk":
+            field = opts.pk
+        else:
+            try:
+                field = opts.get_field(name)
+            except FieldDoesNotExist:
+                return None
+
+            # Ordering by a relation uses the ordering of the related model, its column only through the attname.
+            if not field.concrete or (field.is_relation and name != field.attname):
+                return None
+
+        order_fields.append(OrderField(field, descending))
+        if field.primary_key:
+            return order_fields
+
+    order_fields.append(OrderField(opts.pk, order_fields[-1].descending if order_fields else False))
+    return order_fields
+
+
+def get_order_by(order_fields, reverse=False):
+    return ["-" + f.name if f.descending != reverse else f.name for f in order_fields]
+
+
+def encode_cursor(order_fields, node):
+    values = [getattr(node, f.name) for f in order_fields]
+    data = {"order": get_order_by(order_fields), "values": values}
+    return base64(KEYSET_CURSOR_PREFIX + json.dumps(data, cls=CursorEncoder, separators=(",", ":")))
+
+
+def decode_cursor(order_fields, cursor):
+    try:
+        data = json.loads(unbase64(cursor).removeprefix(KEYSET_CURSOR_PREFIX))
+        if data["order"] != get_order_by(order_fields):
+            raise InvalidCursor("The cursor doesn't match the order of the connection")
+
+        return [f.field.to_python(value) for f, value in zip(order_fields, data["values"], strict=True)]
+    except (ValueError, TypeError, KeyError, ValidationError):
+        raise InvalidCursor()
+
+
+def _seek_field(order_field, value, descending):
+    """
+    Rows strictly after the value in the order of the field. PostgreSQL sorts the nulls last in ascending order,
+    first in descending order.
+    """
+    name = order_field.name
+    if descending:
+        return Q(**{f"{name}__isnull": False}) if value is None else Q(**{f"{name}__lt": value})
+
+    if value is None:
+        return Q(pk__in=[])
+    if order_field.field.null:
+        return Q(**{f"{name}__gt": value}) | Q(**{f"{name}__isnull": True})
+    return Q(**{f"{name}__gt": value})
+
+
+def seek(queryset, order_fields, values, reverse=False):
+    """
+    Filter the rows after the values in the order of the fields, or before them when reverse is set.
+
+    When all the fields are in the same direction and not null, the filter is a row comparison, e.g.
+    (created_at, id) > (%s, %s), that PostgreSQL answers with a range scan of a composite index. Otherwise it is
+    expanded to (a > x) OR (a = x AND b > y) OR ...
+    """
+    directions = {f.descending for f in order_fields}
+    if len(directions) == 1 and None not in values and not any(f.field.null for f in order_fields):
+        lookup = LessThan if directions.pop() != reverse else GreaterThan
+        lhs = Row(*[F(f.name) for f in order_fields])
+        rhs = Row(*[Value(value, output_field=f.field) for f, value in zip(order_fields, values)])
+        return queryset.filter(lookup(lhs, rhs))
+
+    condition = Q(pk__in=[])
+    equal = Q()
+    for order_field, value in zip(order_fields, values):
+        condition |= equal & _seek_field(order_field, value, order_field.descending != reverse)
+        equal &= Q(**{f"{order_field.name}__isnull": True} if value is None else {order_field.name: value})
+
+    return queryset.filter(condition)
@@ -0,0 +1,145 @@
+# Standard Library Imports
+import json
+import re
+from collections import Counter
+from contextlib import contextmanager
+from typing import NamedTuple
+
+# Third Party Library Imports
+from django.db import DEFAULT_DB_ALIAS
+from django.db import connections
+
+
+# IN (%s, %s, ...) and VALUES (%s, %s), (%s, %s), ... vary with the number of items, not with the shape of the query.
+_IN_LIST = re.compile(r"\bIN \((?:%s(?:, )?)+\)")
+_VALUES_LIST = re.compile(r"\bVALUES (?:\((?:%s(?:, )?)+\)(?:, )?)+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def get_query_shape(sql):
+    """
+    The SQL of a query with the lists of parameters collapsed, the queries of the same shape only differ by their
+    parameters, e.g. the same foreign key loaded for every item of a list.
+    """
+    sql = _WHITESPACE.sub(" ", sql).strip()
+    sql = _IN_LIST.sub("IN (...)", sql)
+    return _VALUES_LIST.sub("VALUES (...)", sql)
+
+
+class QueryLog(object):
+    """
+    Execute wrapper recording the shape of every query, see log_queries.
+    """
+
+    def __init__(self):
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        self.shapes[get_query_shape(sql)] += 1
+        return execute(sql, params, many, context)
+
+    @property
+    def total(self):
+        return sum(self.shapes.values())
+
+    @property
+    def duplicates(self):
+        """
+        Number of times each shape was executed, for the shapes executed more than once.
+        """
+        return {shape: count for shape, count in self.shapes.most_common() if count > 1}
+
+
+@contextmanager
+def log_queries(using=DEFAULT_DB_ALIAS):
+    log = QueryLog()
+    with connections[using].execute_wrapper(log):
+        yield log
+
+
+class OperationBudget(NamedTuple):
+    """
+    A recorded operation with the number of queries it may execute, and the number of queries repeating the shape of
+    another one (an N+1 if they grow with the seeded data).
+    """
+
+    name: str
+    query: str
+    variables: dict = None
+    max_queries: int = None
+    max_duplicates: int = 0
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "query": self.query,
+            "variables": self.variables or {},
+            "max_queries": self.max_queries,
+            "max_duplicates": self.max_duplicates,
+        }
+
+
+class OperationResult(NamedTuple):
+    budget: OperationBudget
+    queries: int
+    duplicates: dict
+    errors: list
+
+    @property
+    def duplicate_queries(self):
+        # The first query of each shape isn't a duplicate.
+        return sum(count - 1 for count in self.duplicates.values())
+
+    @property
+    def violations(self):
+        violations = [f"error: {error}" for error in self.errors]
+        if self.budget.max_queries is not None and self.queries > self.budget.max_queries:
+            violations.append(f"{self.queries} queries, the budget is {self.budget.max_queries}")
+
+        if self.duplicate_queries > self.budget.max_duplicates:
+            violations.append(
+                f"{self.duplicate_queries} duplicate queries, the budget is {self.budget.max_duplicates}"
+            )
+        return violations
+
+    def to_budget(self):
+        return self.budget._replace(max_queries=self.queries, max_duplicates=self.duplicate_queries)
+
+
+def load_budgets(path):
+    with open(path) as budgets_file:
+        return [OperationBudget(**operation) for operation in json.load(budgets_file)["operations"]]
+
+
+def dump_budgets(path, budgets):
+    with open(path, "w") as budgets_file:
+        json.dump({"operations": [budget.to_dict() for budget in budgets]}, budgets_file, indent=2)
+        budgets_file.write("\n")
+
+
+def run_operations(budgets, execute, using=DEFAULT_DB_ALIAS):
+    """
+    Execute every operation and count its queries.
+
+    :param execute: Callable executing a query with its variables, returning the list of errors of the response.
+    """
+    results = []
+    for budget in budgets:
+        with log_queries(using) as log:
+            errors = execute(budget.query, budget.variables or {})
+        results.append(OperationResult(budget, log.total, log.duplicates, errors or []))
+    return results
+
+
+def format_report(results):
+    lines = []
+    for result in results:
+        status = "FAIL" if result.violations else "ok"
+        budget = "-" if result.budget.max_queries is None else result.budget.max_queries
+        lines.append(
+            f"{status:4} {result.budget.name}: {result.queries}/{budget} queries, "
+            f"{result.duplicate_queries}/{result.budget.max_duplicates} duplicates"
+        )
+        lines.extend(f"     {violation}" for violation in result.violations)
+        lines.extend(f"     {count}x {shape}" for shape, count in result.duplicates.items())
+    return "\n".join(lines)
@@ -1,19 +1,119 @@
+# Standard Library Imports
+import copy
+from typing import NamedTuple
+
 # Third Party Library Imports
 import graphene_django_optimizer
+from django.conf import settings
+from django.db.models import Prefetch
+from graphene_django_optimizer.hints import _normalize_hint_value
 from graphene_django_optimizer.query import QueryOptimizer
+from graphene_django_optimizer.utils import noop
+from graphql import get_named_type
 from graphql.execution.execute import get_field_def
 
+# App Imports
+from utils import metrics
+from utils.lru import LRUCache
+
+
+_plans = LRUCache(maxsize=settings.GRAPHQL_QUERY_PLAN_CACHE_SIZE)
+
+
+def is_static_hint(hint):
+    """
+    Whether the hint was declared as a value, resolver_hints wraps the values in lambdas ignoring the info and the
+    arguments of the field.
+    """
+    return hint is noop or getattr(hint, "__code__", None) in _normalize_hint_value.__code__.co_consts
+
+
+def _copy_prefetch(lookup):
+    # The prefetch querysets get hints added while prefetching, every queryset gets its own copy of them.
+    if isinstance(lookup, Prefetch) and lookup.queryset is not None:
+        lookup = copy.copy(lookup)
+        lookup.queryset = lookup.queryset.all()
+    return lookup
+
+
+class QueryPlan(NamedTuple):
+    """
+    The select_related, prefetch_related and only lookups the optimizer computed for a field, only is None when the
+    optimization was aborted.
+    """
+
+    select_related: tuple
+    prefetch_related: tuple
+    only: tuple
+
+    @classmethod
+    def from_store(cls, store):
+        only = tuple(store.only_list) if store.only_list is not None else None
+        return cls(tuple(store.select_list), tuple(store.prefetch_list), only)
+
+    def apply(self, queryset):
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*map(_copy_prefetch, self.prefetch_related))
+
+        if self.only:
+            queryset = queryset.only(*self.only)
+
+        return queryset
+
 
 class CustomQueryOptimizer(QueryOptimizer):
-    def optimize(self, queryset):
+    """
+    Caches the plan of a field, keyed by its node in the document, its parent and return types. The documents are
+    cached across requests (see utils.graphql.documents), so every request of the same query reuses the plan.
+
+    The plans of the fields with callable optimization hints aren't cached, the hints get the info and the arguments
+    of the request.
+    """
+
+    def __init__(self, info, **options):
+        super().__init__(info, **options)
+        self.uses_dynamic_hints = False
+
+    def _optimize_field_by_hints(self, store, selection, field_def, parent_type):
+        hints = self._get_optimization_hints(field_def.resolve)
+        if hints and not all(map(is_static_hint, (hints.select_related, hints.prefetch_related, hints.only))):
+            self.uses_dynamic_hints = True
+        return super()._optimize_field_by_hints(store, selection, field_def, parent_type)
+
+    def get_plan(self):
         info = self.root_info
-        field_def = get_field_def(info.schema, info.parent_type, info.field_nodes[0])
+        node = info.field_nodes[0]
+
+        # The node is kept in the entry, so its id can't be reused by another node while the entry is cached.
+        key = (id(node), info.parent_type.name, get_named_type(info.return_type).name, self.disable_abort_only)
+        entry = _plans.get(key)
+        if entry is not None and entry[0] is node:
+            metrics.incr("query_optimizer.plans.hits")
+            return entry[1]
+
+        field_def = get_field_def(info.schema, info.parent_type, node)
         store = self._optimize_gql_selections(
             self._get_type(field_def),
-            info.field_nodes[0],
+            node,
             # info.parent_type,
         )
-        return store.optimize_queryset(queryset)
+        plan = QueryPlan.from_store(store)
+        if self.uses_dynamic_hints:
+            metrics.incr("query_optimizer.plans.uncacheable")
+        else:
+            metrics.incr("query_optimizer.plans.misses")
+            _plans.set(key, (node, plan))
+        return plan
+
+    def optimize(self, queryset):
+        return self.get_plan().apply(queryset)
+
+
+def get_plan_cache_hit_rate():
+    return metrics.ratio("query_optimizer.plans.hits", "query_optimizer.plans.misses")
 
 
 def optimize_query(queryset, info, **options):
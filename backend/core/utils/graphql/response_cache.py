@@ -0,0 +1,324 @@
+# Standard Library Imports
+import hashlib
+import json
+import time
+from enum import Enum
+from typing import NamedTuple
+
+# Third Party Library Imports
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import m2m_changed
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from graphql import ExecutionResult
+from graphql import FieldNode
+from graphql import FragmentDefinitionNode
+from graphql import FragmentSpreadNode
+from graphql import InlineFragmentNode
+from graphql import OperationType
+from graphql import get_named_type
+from graphql import is_abstract_type
+from graphql import is_composite_type
+
+# App Imports
+from utils import metrics
+from utils.graphql.documents import get_query_hash
+from utils.graphql.documents import get_schema_version
+from utils.lru import LRUCache
+from utils.singleflight import Group
+
+
+RESPONSE_CACHE_KEY = "graphql:response:{}"
+MODEL_VERSION_CACHE_KEY = "graphql:response:version:{}"
+
+_responses = LRUCache(maxsize=settings.GRAPHQL_RESPONSE_CACHE_SIZE)
+_policies = LRUCache(maxsize=settings.GRAPHQL_DOCUMENT_CACHE_SIZE)
+_tracked_models = set()
+_ignored_fields = {}
+_executions = Group("graphql.response")
+
+
+class CacheScope(Enum):
+    """
+    Who a cached response can be shared with, from the least to the most restrictive.
+    """
+
+    # Same response for everyone.
+    PUBLIC = "public"
+    # Shared by the users having the same set of permissions.
+    PERMISSIONS = "permissions"
+    # Specific to the user.
+    USER = "user"
+
+
+_SCOPE_ORDER = list(CacheScope)
+
+
+class CachePolicy(NamedTuple):
+    max_age: int
+    scope: CacheScope
+    models: frozenset = frozenset()
+
+    def restrict(self, other):
+        return CachePolicy(
+            max_age=min(self.max_age, other.max_age),
+            scope=max(self.scope, other.scope, key=_SCOPE_ORDER.index),
+            models=self.models | other.models,
+        )
+
+
+def cache_control(max_age, scope=CacheScope.PUBLIC, models=(), ignore_fields=()):
+    """
+    Class decorator for the graphene types whose data can be served from the response cache.
+
+    Queries are cached only when every object type they select has a hint, for the smallest max_age (in seconds) and
+    the most restrictive scope of them. Saving or deleting an instance of the model of a DjangoObjectType, or of the
+    extra models it depends on, invalidates the cached responses which selected the type.
+
+    The saves updating only ignore_fields of the model of the type don't invalidate, for the fields written too often
+    to be worth it (e.g. last_login, saved on every sign-in): the responses show them up to max_age late.
+    """
+
+    def decorator(cls):
+        model = getattr(getattr(cls, "_meta", None), "model", None)
+        labels = frozenset(m._meta.label_lower for m in (*models, *([model] if model else [])))
+        cls._cache_control = CachePolicy(max_age=max_age, scope=scope, models=labels)
+        _tracked_models.update(labels)
+        for dependency in (*models, *([model] if model else [])):
+            # A field is ignored only if every type depending on the model ignores it.
+            fields = frozenset(ignore_fields) if dependency is model else frozenset()
+            label = dependency._meta.label_lower
+            _ignored_fields[label] = _ignored_fields.get(label, fields) & fields
+        return cls
+
+    return decorator
+
+
+def _get_type_policy(schema, graphql_type):
+    types = schema.get_possible_types(graphql_type) if is_abstract_type(graphql_type) else [graphql_type]
+    policy = None
+    for object_type in types:
+        hint = getattr(getattr(object_type, "graphene_type", None), "__dict__", {}).get("_cache_control")
+        if hint is None:
+            return None
+        policy = hint if policy is None else policy.restrict(hint)
+    return policy
+
+
+def _collect_policy(schema, parent_type, selection_set, fragments, policy):
+    for selection in selection_set.selections:
+        if isinstance(selection, FieldNode):
+            if selection.name.value == "__typename":
+                continue
+
+            field = parent_type.fields.get(selection.name.value)
+            if field is None:
+                return None
+
+            field_type = get_named_type(field.type)
+            if not is_composite_type(field_type):
+                continue
+
+            type_policy = _get_type_policy(schema, field_type)
+            if type_policy is None:
+                return None
+
+            policy = type_policy if policy is None else policy.restrict(type_policy)
+            policy = _collect_policy(schema, field_type, selection.selection_set, fragments, policy)
+
+        elif isinstance(selection, InlineFragmentNode):
+            fragment_type = schema.get_type(selection.type_condition.name.value) if selection.type_condition else None
+            policy = _collect_policy(schema, fragment_type or parent_type, selection.selection_set, fragments, policy)
+
+        elif isinstance(selection, FragmentSpreadNode):
+            fragment = fragments[selection.name.value]
+            fragment_type = schema.get_type(fragment.type_condition.name.value)
+            policy = _collect_policy(schema, fragment_type, fragment.selection_set, fragments, policy)
+
+        if policy is None:
+            return None
+
+    return policy
+
+
+def get_cache_policy(schema, query, document, operation_ast):
+    """
+    Cache policy of the query operation, None when it can't be cached (mutations, introspection, or a selected type
+    without cache_control hint). The policies are cached along with the documents.
+    """
+    if operation_ast is None or operation_ast.operation != OperationType.QUERY:
+        return None
+
+    operation_name = operation_ast.name.value if operation_ast.name else None
+    key = (get_schema_version(schema), get_query_hash(query), operation_name)
+    policy = _policies.get(key, default=False)
+    if policy is False:
+        fragments = {
+            definition.name.value: definition
+            for definition in document.definitions
+            if isinstance(definition, FragmentDefinitionNode)
+        }
+        policy = _collect_policy(schema, schema.query_type, operation_ast.selection_set, fragments, None)
+        _policies.set(key, policy)
+
+    return policy if policy and policy.max_age > 0 else None
+
+
+def _get_scope_key(request, scope):
+    if scope == CacheScope.PUBLIC:
+        return "public"
+
+    user = getattr(request, "user", None)
+    if user is None or not user.is_authenticated:
+        return "anonymous"
+
+    if scope == CacheScope.USER:
+        return f"user:{user.pk}"
+
+    permissions = ",".join(sorted(user.get_all_permissions()))
+    return "permissions:" + hashlib.sha256(permissions.encode("utf-8")).hexdigest()
+
+
+def _get_model_versions(models):
+    keys = {label: MODEL_VERSION_CACHE_KEY.format(label) for label in sorted(models)}
+    versions = cache.get_many(keys.values())
+    for key in keys.values():
+        if key not in versions:
+            # Start from the current time rather than 0, so the responses cached before the counter was lost can't be
+            # served again.
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys.values()]
+
+
+def get_response_cache_key(request, schema, query, document, operation_ast, variables):
+    """
+    Return the cache key and policy of the response, or (None, None) when it can't be cached.
+
+    The key covers the operation, the variables, the scope and the version of every model the response was built from,
+    so a write to one of them makes the previous responses unreachable.
+    """
+    if not settings.GRAPHQL_RESPONSE_CACHE_ENABLED:
+        return None, None
+
+    policy = get_cache_policy(schema, query, document, operation_ast)
+    if policy is None:
+        return None, None
+
+    parts = [
+        get_schema_version(schema),
+        get_query_hash(query),
+        operation_ast.name.value if operation_ast.name else "",
+        json.dumps(variables or {}, sort_keys=True, default=str),
+        _get_scope_key(request, policy.scope),
+        *map(str, _get_model_versions(policy.models)),
+    ]
+    key = RESPONSE_CACHE_KEY.format(hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest())
+    return key, policy
+
+
+def get_cached_response(key):
+    """
+    Return the cached data of the response, looking up the process cache then the shared cache, or None.
+    """
+    entry = _responses.get(key)
+    if entry is not None and entry[0] > time.monotonic():
+        metrics.incr("graphql.response_cache.local_hits")
+        return entry[1]
+
+    entry = cache.get(key)
+    if entry is not None:
+        metrics.incr("graphql.response_cache.shared_hits")
+        expires_at, data = entry
+        _responses.set(key, (time.monotonic() + max(expires_at - time.time(), 0), data))
+        return data
+
+    metrics.incr("graphql.response_cache.misses")
+    return None
+
+
+def cache_response(key, policy, data):
+    _responses.set(key, (time.monotonic() + policy.max_age, data))
+    cache.set(key, (time.time() + policy.max_age, data), timeout=policy.max_age)
+    metrics.incr("graphql.response_cache.stores")
+
+
+def lookup_response(request, schema, query, document, operation_ast, variables):
+    """
+    Shortcut for the views: return (cache key, policy, cached data or None).
+    """
+    key, policy = get_response_cache_key(request, schema, query, document, operation_ast, variables)
+    return key, policy, get_cached_response(key) if key else None
+
+
+def _copy_result(result):
+    # Every caller adds its own extensions to its result.
+    return ExecutionResult(data=result.data, errors=result.errors, extensions=result.extensions)
+
+
+def _execute_and_cache(key, policy, execute):
+    result = execute()
+    if not result.errors:
+        cache_response(key, policy, result.data)
+    return result
+
+
+async def _aexecute_and_cache(key, policy, execute):
+    result = await execute()
+    if not result.errors:
+        await sync_to_async(cache_response)(key, policy, result.data)
+    return result
+
+
+def execute_once(key, policy, execute):
+    """
+    Return the result of execute() and cache its data. The operations of the same cache key executing concurrently in
+    the process share that execution, e.g. the dashboards loaded at once before their response is cached. See
+    utils.singleflight.
+    """
+    return _copy_result(_executions.do(key, _execute_and_cache, key, policy, execute))
+
+
+async def aexecute_once(key, policy, execute):
+    """
+    Async variant of `execute_once`, execute() returns an awaitable.
+    """
+    return _copy_result(await _executions.ado(key, _aexecute_and_cache, key, policy, execute))
+
+
+def bump_model_version(label):
+    key = MODEL_VERSION_CACHE_KEY.format(label)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+
+
+def _invalidate(model, update_fields=None):
+    label = model._meta.label_lower
+    if label not in _tracked_models:
+        return
+    if update_fields and set(update_fields) <= _ignored_fields.get(label, frozenset()):
+        metrics.incr("graphql.response_cache.ignored_writes")
+        return
+
+    # Until the transaction commits, the other requests still read (and may cache) the previous data.
+    transaction.on_commit(lambda: bump_model_version(label))
+
+
+@receiver(post_save, dispatch_uid="graphql_response_cache_post_save")
+@receiver(post_delete, dispatch_uid="graphql_response_cache_post_delete")
+def invalidate_on_write(sender, update_fields=None, **kwargs):
+    _invalidate(sender, update_fields)
+
+
+@receiver(m2m_changed, dispatch_uid="graphql_response_cache_m2m_changed")
+def invalidate_on_m2m_change(sender, instance, action, model, **kwargs):
+    if action.startswith("post_"):
+        _invalidate(type(instance))
+        _invalidate(model)
+        _invalidate(sender)
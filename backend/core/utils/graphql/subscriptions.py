@@ -0,0 +1,132 @@
+# Standard Library Imports
+import asyncio
+import hashlib
+import json
+import logging
+
+# App Imports
+from utils import metrics
+
+
+logger = logging.getLogger(__name__)
+
+# Comment line of the event stream, keeps the idle streams from being closed by the proxies.
+KEEPALIVE_MESSAGE = ": keepalive\n\n"
+
+_END = object()
+
+
+def get_subscription_key(query, operation_name, variables, user_id):
+    """
+    Subscriptions with the same key get the same messages: the same operation with the same variables, for the same
+    user since the resolvers check the permissions of the user.
+    """
+    variables = json.dumps(variables or {}, sort_keys=True, default=str)
+    digest = hashlib.sha256(f"{query}\0{operation_name}\0{variables}".encode()).hexdigest()
+    return (digest, user_id)
+
+
+class SharedSubscription(object):
+    """
+    A single execution of a subscription, whose messages are fanned out to all the identical subscriptions: every
+    event is executed and serialized once, however many clients listen to it.
+
+    The messages are produced from the first listener on, and the execution is stopped when the last one leaves.
+    Every event is executed with the request and the context of the first listener for the whole stream: the
+    listeners share the user (see get_subscription_key), so the permission checks of the resolvers hold for all of
+    them, but nothing else of the following requests is seen by the resolvers.
+    """
+
+    def __init__(self, hub, key, messages):
+        self.hub = hub
+        self.key = key
+        self.messages = messages
+        self.listeners = set()
+        self.task = None
+
+    async def produce(self):
+        try:
+            async for message in self.messages:
+                for queue in list(self.listeners):
+                    queue.put_nowait(message)
+                metrics.incr("graphql.subscriptions.messages")
+                metrics.incr("graphql.subscriptions.deliveries", len(self.listeners))
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("The subscription %s failed", self.key)
+        finally:
+            for queue in list(self.listeners):
+                queue.put_nowait(_END)
+
+    async def listen(self, keepalive=None):
+        """
+        Async iterator of the messages of the subscription, and of keepalive comments after every keepalive seconds
+        without a message.
+        """
+        queue = asyncio.Queue()
+        self.listeners.add(queue)
+        if self.task is None:
+            self.task = asyncio.ensure_future(self.produce())
+
+        try:
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=keepalive)
+                except asyncio.TimeoutError:
+                    yield KEEPALIVE_MESSAGE
+                    continue
+
+                if message is _END:
+                    return
+                yield message
+        finally:
+            self.listeners.discard(queue)
+            if not self.listeners:
+                await self.close()
+
+    async def close(self):
+        self.hub.remove(self)
+        if self.task is not None:
+            # The messages can only be closed once the task iterating them is done.
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+        await self.messages.aclose()
+
+
+class SubscriptionHub(object):
+    """
+    The shared subscriptions of the process, by key, see get_subscription_key.
+    """
+
+    def __init__(self):
+        self._subscriptions = {}
+
+    def get(self, key):
+        return self._subscriptions.get(key)
+
+    async def start(self, key, messages):
+        """
+        Share the messages under the key. If the key was started meanwhile, e.g. by a concurrent request, the
+        messages are dropped and the running subscription is returned.
+        """
+        subscription = self._subscriptions.get(key)
+        if subscription is not None:
+            await messages.aclose()
+            metrics.incr("graphql.subscriptions.shared")
+            return subscription
+
+        subscription = SharedSubscription(self, key, messages)
+        self._subscriptions[key] = subscription
+        metrics.incr("graphql.subscriptions.started")
+        return subscription
+
+    def remove(self, subscription):
+        if self._subscriptions.get(subscription.key) is subscription:
+            del self._subscriptions[subscription.key]
+
+    def __len__(self):
+        return len(self._subscriptions)
+
+
+hub = SubscriptionHub()
@@ -0,0 +1,144 @@
+# Standard Library Imports
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+
+# Third Party Library Imports
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from simple_history.models import HistoricalRecords
+from simple_history.signals import post_create_historical_record
+from simple_history.signals import pre_create_historical_record
+
+# App Imports
+from utils import metrics
+from utils.enums import Enum
+from utils.enums import EnumValue
+
+
+class HistoryWriteMode(Enum):
+    SYNC = EnumValue("sync", "Insert the historical record along with every save")
+    BUFFERED = EnumValue("buffered", "Bulk insert the historical records at the end of the request")
+
+
+class HistoryBuffer(object):
+    def __init__(self):
+        self.records = []
+        self.closed = False
+
+
+_buffer = ContextVar("history_buffer", default=None)
+
+
+@contextmanager
+def buffer_history():
+    """
+    Collect the historical records created within the block and bulk insert them on exit.
+
+    Only applies to the models using BufferedHistoricalRecords when HISTORY_WRITE_MODE is buffered. Nested blocks
+    share the outermost buffer.
+    """
+    if _buffer.get() is not None:
+        yield
+        return
+
+    history_buffer = HistoryBuffer()
+    token = _buffer.set(history_buffer)
+    try:
+        yield
+    finally:
+        _buffer.reset(token)
+        history_buffer.closed = True
+        flush_history(history_buffer.records)
+
+
+@asynccontextmanager
+async def abuffer_history():
+    """
+    Async variant of `buffer_history`, the records are inserted from the thread of the request.
+    """
+    if _buffer.get() is not None:
+        yield
+        return
+
+    history_buffer = HistoryBuffer()
+    token = _buffer.set(history_buffer)
+    try:
+        yield
+    finally:
+        _buffer.reset(token)
+        history_buffer.closed = True
+        if history_buffer.records:
+            await sync_to_async(flush_history)(history_buffer.records)
+
+
+def flush_history(records):
+    """
+    Bulk insert the buffered historical records, one INSERT per historical model and database.
+    """
+    records_by_model = defaultdict(list)
+    for record in records:
+        records_by_model[(type(record["history_instance"]), record["using"])].append(record)
+
+    for (history_model, using), model_records in records_by_model.items():
+        history_model.objects.using(using).bulk_create([record["history_instance"] for record in model_records])
+        metrics.incr("history.buffered.flushed", len(model_records))
+
+        for record in model_records:
+            post_create_historical_record.send(sender=history_model, **record)
+
+
+def _enqueue(history_buffer, record):
+    if history_buffer.closed:
+        # The transaction outlived the buffer, nothing is going to flush it anymore.
+        flush_history([record])
+    else:
+        history_buffer.records.append(record)
+
+
+class BufferedHistoricalRecords(HistoricalRecords):
+    """
+    HistoricalRecords which defers the historical record inserts to the end of the request when HISTORY_WRITE_MODE
+    is buffered, see buffer_history.
+
+    Records are queued only once the transaction of the save commits, so rolled back saves never get one.
+    """
+
+    def create_historical_record(self, instance, history_type, using=None):
+        history_buffer = _buffer.get()
+        if settings.HISTORY_WRITE_MODE != HistoryWriteMode.BUFFERED or history_buffer is None or self.m2m_fields:
+            return super().create_historical_record(instance, history_type, using=using)
+
+        using = using if self.use_base_model_db else None
+        history_date = getattr(instance, "_history_date", timezone.now())
+        history_user = self.get_history_user(instance)
+        history_change_reason = self.get_change_reason_for_object(instance, history_type, using)
+        manager = getattr(instance, self.manager_name)
+
+        attrs = {field.attname: getattr(instance, field.attname) for field in self.fields_included(instance)}
+        if getattr(manager.model, "history_relation", None) is not None:
+            attrs["history_relation"] = instance
+
+        history_instance = manager.model(
+            history_date=history_date,
+            history_type=history_type,
+            history_user=history_user,
+            history_change_reason=history_change_reason,
+            **attrs,
+        )
+        record = {
+            "instance": instance,
+            "history_instance": history_instance,
+            "history_date": history_date,
+            "history_user": history_user,
+            "history_change_reason": history_change_reason,
+            "using": using,
+        }
+        pre_create_historical_record.send(sender=manager.model, **record)
+
+        transaction.on_commit(partial(_enqueue, history_buffer, record), using=instance._state.db)
+        metrics.incr("history.buffered.queued")
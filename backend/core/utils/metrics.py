@@ -0,0 +1,71 @@
+# Standard Library Imports
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+
+_lock = threading.Lock()
+_counters = defaultdict(int)
+_timings = defaultdict(lambda: {"count": 0, "total": 0.0, "max": 0.0})
+
+
+def incr(name, value=1):
+    """
+    Increment the in-process counter with the given name.
+    """
+    with _lock:
+        _counters[name] += value
+
+
+def observe(name, seconds):
+    """
+    Record the duration (in seconds) against the in-process timer with the given name.
+    """
+    with _lock:
+        timing = _timings[name]
+        timing["count"] += 1
+        timing["total"] += seconds
+        timing["max"] = max(timing["max"], seconds)
+
+
+@contextmanager
+def timer(name):
+    """
+    Time the wrapped block and record the duration against the timer with the given name.
+    """
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start_time)
+
+
+def ratio(hits_name, misses_name):
+    """
+    Ratio of the hits counter over the sum of the hits and misses counters, None if nothing was recorded.
+    """
+    with _lock:
+        hits, misses = _counters.get(hits_name, 0), _counters.get(misses_name, 0)
+    return hits / (hits + misses) if hits + misses else None
+
+
+def snapshot(prefix=""):
+    """
+    Return a copy of the counters and timers of this process, optionally filtered by the name prefix.
+    """
+    with _lock:
+        counters = {name: value for name, value in _counters.items() if name.startswith(prefix)}
+        timings = {
+            name: dict(timing, avg=timing["total"] / timing["count"])
+            for name, timing in _timings.items()
+            if name.startswith(prefix) and timing["count"]
+        }
+    return {"counters": counters, "timings": timings}
+
+
+def reset(prefix=""):
+    with _lock:
+        for store in (_counters, _timings):
+            for name in [name for name in store if name.startswith(prefix)]:
+                del store[name]
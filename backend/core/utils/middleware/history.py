@@ -0,0 +1,33 @@
+# Third Party Library Imports
+from asgiref.sync import iscoroutinefunction
+from asgiref.sync import markcoroutinefunction
+
+# App Imports
+from utils.history import abuffer_history
+from utils.history import buffer_history
+
+
+class HistoryBufferMiddleware(object):
+    """
+    Bulk insert the historical records created while handling the request at the end of it.
+    Only has an effect when HISTORY_WRITE_MODE is buffered, see utils.history.BufferedHistoricalRecords.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        with buffer_history():
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        async with abuffer_history():
+            return await self.get_response(request)
@@ -0,0 +1,51 @@
+# Third Party Library Imports
+from asgiref.sync import iscoroutinefunction
+from asgiref.sync import markcoroutinefunction
+from asgiref.sync import sync_to_async
+
+# App Imports
+from utils.replicas import pin_to_primary
+from utils.replicas import route_request
+
+
+REPLICA_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class ReplicaRoutingMiddleware(object):
+    """
+    Route the reads of the GET requests to the replica, see utils.replicas.ReplicaRouter. The GraphQL views route
+    the queries of POST requests on their own.
+
+    A request which wrote keeps its client and its user on the primary for REPLICA_PIN_SECONDS, so that they read
+    their writes.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        with route_request(request, replica=request.method in REPLICA_METHODS) as state:
+            response = self.get_response(request)
+            wrote = state.wrote
+
+        if wrote:
+            pin_to_primary(request, response)
+        return response
+
+    async def __acall__(self, request):
+        with route_request(request, replica=request.method in REPLICA_METHODS) as state:
+            response = await self.get_response(request)
+            wrote = state.wrote
+
+        if wrote:
+            # Loads the user and writes the pin to the cache.
+            await sync_to_async(pin_to_primary)(request, response)
+        return response
@@ -0,0 +1,223 @@
+# Standard Library Imports
+import inspect
+import logging
+import re
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from weakref import WeakKeyDictionary
+
+# Third Party Library Imports
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.db import DatabaseError
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+# App Imports
+from utils import metrics
+
+
+logger = logging.getLogger(__name__)
+
+# The placeholders of Django's SQL, and its escaped percent signs.
+_PLACEHOLDER = re.compile(r"%s|%%")
+
+_hot = ContextVar("prepared_hot_query", default=None)
+
+
+class PreparedStatement(object):
+    """
+    A hot query shape: the SQL of the query is prepared once per connection (PREPARE name AS ... with $n parameters),
+    then run with EXECUTE name(...), so Postgres reuses the plan instead of planning the query on every execution.
+    """
+
+    def __init__(self, name, label, sql):
+        self.name = name
+        self.label = label
+        self.sql = sql
+        self.param_count = 0
+
+        def number(match):
+            if match.group() == "%%":
+                return "%"
+            self.param_count += 1
+            return f"${self.param_count}"
+
+        self.prepare_sql = f"PREPARE {name} AS {_PLACEHOLDER.sub(number, sql)}"
+        placeholders = ", ".join(["%s"] * self.param_count)
+        self.execute_sql = f"EXECUTE {name}({placeholders})" if self.param_count else f"EXECUTE {name}"
+
+
+class StatementRegistry(object):
+    """
+    The hot query shapes of the process, by SQL. Past PREPARED_STATEMENTS_MAX shapes, the new ones run unprepared:
+    every statement is kept on every pooled connection.
+    """
+
+    def __init__(self, maxsize=None):
+        self.maxsize = maxsize
+        self._statements = {}
+        self._lock = threading.Lock()
+
+    def get(self, sql, label):
+        statement = self._statements.get(sql)
+        if statement is not None:
+            return statement
+
+        maxsize = self.maxsize if self.maxsize is not None else settings.PREPARED_STATEMENTS_MAX
+        with self._lock:
+            statement = self._statements.get(sql)
+            if statement is None:
+                if len(self._statements) >= maxsize:
+                    metrics.incr("prepared.registry_full")
+                    return None
+
+                statement = PreparedStatement(f"hot_{len(self._statements) + 1}", label, sql)
+                self._statements[sql] = statement
+        return statement
+
+    def __iter__(self):
+        return iter(list(self._statements.values()))
+
+    def __len__(self):
+        return len(self._statements)
+
+
+registry = StatementRegistry()
+
+
+class _ConnectionStatements(object):
+    def __init__(self):
+        self.names = set()
+        self.stale = False
+
+
+# Statements prepared on each connection, the pooled connections keep them across requests.
+_connections = WeakKeyDictionary()
+_connections_lock = threading.Lock()
+
+
+@contextmanager
+def hot_queries(label):
+    """
+    Prepare the queries executed within the block, e.g. the lookup of the user of every request. Only for the
+    queries whose shape doesn't vary with their values (IN lists of varying lengths would register a statement per
+    length).
+    """
+    token = _hot.set(label)
+    try:
+        yield
+    finally:
+        _hot.reset(token)
+
+
+def hot(label):
+    """
+    Decorator of the functions (sync or async) whose queries are hot, see hot_queries.
+    """
+
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with hot_queries(label):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with hot_queries(label):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _get_connection_statements(raw_connection):
+    with _connections_lock:
+        statements = _connections.get(raw_connection)
+        if statements is None:
+            statements = _connections[raw_connection] = _ConnectionStatements()
+        return statements
+
+
+def prepare_hot_queries(execute, sql, params, many, context):
+    label = _hot.get()
+    if label is None or many or not settings.PREPARED_STATEMENTS_ENABLED:
+        return execute(sql, params, many, context)
+
+    statement = registry.get(sql, label)
+    if statement is None or len(params or ()) != statement.param_count:
+        return execute(sql, params, many, context)
+
+    statements = _get_connection_statements(context["connection"].connection)
+    if statements.stale:
+        execute("DEALLOCATE ALL", None, False, context)
+        statements.names.clear()
+        statements.stale = False
+
+    if statement.name not in statements.names:
+        # Prepared statements aren't transactional, they stay on the connection even if the transaction rolls back.
+        execute(statement.prepare_sql, None, False, context)
+        statements.names.add(statement.name)
+        metrics.incr(f"prepared.{label}.prepares")
+
+    try:
+        result = execute(statement.execute_sql, params or None, many, context)
+    except DatabaseError:
+        # E.g. the statements were deallocated by a DISCARD ALL, or a migration changed the columns of a cached plan:
+        # the statements of the connection are prepared again from its next hot query on.
+        statements.stale = True
+        metrics.incr(f"prepared.{label}.errors")
+        raise
+
+    metrics.incr(f"prepared.{label}.executions")
+    return result
+
+
+@receiver(connection_created)
+def install_prepared_statements(sender, connection, **kwargs):
+    if connection.vendor == "postgresql" and prepare_hot_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(prepare_hot_queries)
+
+
+def get_prepared_statement_stats(using=DEFAULT_DB_ALIAS):
+    """
+    The hot query shapes with their executions and prepares in this process, and how Postgres planned them on the
+    current connection: custom_plans are planned for their values, generic_plans reuse the cached plan.
+    """
+    plans = {}
+    connection = connections[using]
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name, generic_plans, custom_plans FROM pg_prepared_statements")
+            plans = {name: (generic, custom) for name, generic, custom in cursor.fetchall()}
+
+    counters = metrics.snapshot("prepared.")["counters"]
+    stats = []
+    for statement in registry:
+        generic_plans, custom_plans = plans.get(statement.name, (None, None))
+        stats.append(
+            {
+                "name": statement.name,
+                "label": statement.label,
+                "sql": statement.sql,
+                "prepared_on_connection": statement.name in plans,
+                "generic_plans": generic_plans,
+                "custom_plans": custom_plans,
+            }
+        )
+
+    return {
+        "statements": stats,
+        "executions": {
+            name.split(".")[1]: value for name, value in counters.items() if name.endswith(".executions")
+        },
+        "prepares": {name.split(".")[1]: value for name, value in counters.items() if name.endswith(".prepares")},
+    }
@@ -0,0 +1,87 @@
+# Standard Library Imports
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+
+# Third Party Library Imports
+from django.conf import settings
+from django.db import transaction
+
+# App Imports
+from utils import metrics
+
+
+logger = logging.getLogger(__name__)
+
+
+class _Subscriber(object):
+    def __init__(self, loop, maxsize):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def put(self, payload):
+        # A subscriber too slow to keep up loses its oldest events rather than holding the publishers back.
+        if self.queue.full():
+            self.queue.get_nowait()
+            metrics.incr("pubsub.dropped")
+        self.queue.put_nowait(payload)
+
+
+class PubSub(object):
+    """
+    In-process publish/subscribe: the events only reach the subscribers of the same process, e.g. the server-sent
+    event streams of the GraphQL subscriptions served by this instance.
+
+    publish can be called from any thread, the events are handed over to the event loop of each subscriber.
+    """
+
+    def __init__(self, queue_size=None):
+        self.queue_size = queue_size
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publish(self, channel, payload):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber.put, payload)
+            except RuntimeError:
+                # The loop of the subscriber was closed, it is unsubscribed when its generator is finalized.
+                continue
+
+        metrics.incr("pubsub.published")
+        return len(subscribers)
+
+    def publish_on_commit(self, channel, payload, using=None):
+        """
+        Publish once the current transaction commits, the subscribers would read the previous data otherwise.
+        """
+        transaction.on_commit(lambda: self.publish(channel, payload), using=using)
+
+    async def subscribe(self, channel):
+        """
+        Async iterator of the events published to the channel from now on.
+        """
+        queue_size = self.queue_size if self.queue_size is not None else settings.PUBSUB_QUEUE_SIZE
+        subscriber = _Subscriber(asyncio.get_running_loop(), queue_size)
+        with self._lock:
+            self._subscribers[channel].add(subscriber)
+
+        try:
+            while True:
+                yield await subscriber.queue.get()
+        finally:
+            with self._lock:
+                self._subscribers[channel].discard(subscriber)
+                if not self._subscribers[channel]:
+                    del self._subscribers[channel]
+
+    def subscriber_count(self, channel):
+        with self._lock:
+            return len(self._subscribers.get(channel, ()))
+
+
+pubsub = PubSub()
@@ -0,0 +1,198 @@
+# Standard Library Imports
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Third Party Library Imports
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db import connections
+
+# App Imports
+from utils import metrics
+
+
+logger = logging.getLogger(__name__)
+
+REPLICA_DB_ALIAS = "replica"
+REPLICA_PIN_COOKIE = "replica_pin"
+REPLICA_PIN_CACHE_KEY = "replicas:pin:{}"
+
+# Replication lag in seconds, 0 while the replica has replayed everything it received (pg_last_xact_replay_timestamp
+# doesn't move while the primary is idle).
+REPLICA_LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+"""
+
+
+class RoutingState(object):
+    """
+    Routing of a request: whether its reads may go to the replica, and whether it wrote to the primary. A request
+    which wrote reads from the primary until its end, and its user for REPLICA_PIN_SECONDS after it.
+    """
+
+    def __init__(self, request=None, replica=False):
+        self.request = request
+        self.replica = replica
+        self.wrote = False
+        self._pinned = None
+
+    @property
+    def pinned(self):
+        if self._pinned is None:
+            # Looking up the pin loads the user, that read goes to the primary.
+            self._pinned = True
+            self._pinned = is_pinned(self.request)
+        return self._pinned
+
+
+_state = ContextVar("replica_routing_state", default=None)
+# Overrides the routing of the request within read_from_replica blocks.
+_replica = ContextVar("replica_routing_replica", default=None)
+
+
+def _get_user_id(request):
+    user = getattr(request, "user", None)
+    return user.pk if user is not None and user.is_authenticated else None
+
+
+def is_pinned(request):
+    if request is None:
+        return False
+
+    if REPLICA_PIN_COOKIE in request.COOKIES:
+        return True
+
+    user_id = _get_user_id(request)
+    return user_id is not None and cache.get(REPLICA_PIN_CACHE_KEY.format(user_id)) is not None
+
+
+def pin_to_primary(request, response):
+    """
+    Keep the reads of the client and of the user on the primary while the replica catches up with their writes.
+    """
+    response.set_cookie(REPLICA_PIN_COOKIE, "1", max_age=settings.REPLICA_PIN_SECONDS, httponly=True, samesite="Lax")
+    user_id = _get_user_id(request)
+    if user_id is not None:
+        cache.set(REPLICA_PIN_CACHE_KEY.format(user_id), True, timeout=settings.REPLICA_PIN_SECONDS)
+
+
+@contextmanager
+def route_request(request, replica):
+    state = RoutingState(request, replica)
+    token = _state.set(state)
+    try:
+        yield state
+    finally:
+        _state.reset(token)
+
+
+@contextmanager
+def read_from_replica(enabled=True):
+    """
+    Send the reads of the block to the replica, or to the primary when enabled is False. The reads still go to the
+    primary after a write of the request, or when the replica is unhealthy.
+    """
+    token = _replica.set(enabled)
+    try:
+        yield
+    finally:
+        _replica.reset(token)
+
+
+class _ReplicaHealth(object):
+    """
+    Whether the replica is reachable and its lag below REPLICA_MAX_LAG_SECONDS, checked at most once every
+    REPLICA_HEALTH_CHECK_INTERVAL seconds per process.
+    """
+
+    def __init__(self):
+        self.healthy = False
+        self.checked_at = None
+        self._lock = threading.Lock()
+
+    def is_healthy(self):
+        now = time.monotonic()
+        if self.checked_at is not None and now - self.checked_at < settings.REPLICA_HEALTH_CHECK_INTERVAL:
+            return self.healthy
+
+        with self._lock:
+            if self.checked_at is None or now - self.checked_at >= settings.REPLICA_HEALTH_CHECK_INTERVAL:
+                self.healthy = self.check()
+                self.checked_at = time.monotonic()
+        return self.healthy
+
+    def check(self):
+        connection = connections[REPLICA_DB_ALIAS]
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(REPLICA_LAG_SQL)
+                lag = float(cursor.fetchone()[0] or 0)
+        except Exception:
+            logger.warning("The replica is unreachable, reading from the primary.", exc_info=True)
+            connection.close()
+            metrics.incr("replicas.unhealthy")
+            return False
+
+        if lag > settings.REPLICA_MAX_LAG_SECONDS:
+            logger.warning("The replica lags %.1fs behind, reading from the primary.", lag)
+            metrics.incr("replicas.lagging")
+            return False
+        return True
+
+    def reset(self):
+        self.checked_at = None
+
+
+replica_health = _ReplicaHealth()
+
+
+def has_replica():
+    return REPLICA_DB_ALIAS in settings.DATABASES
+
+
+class ReplicaRouter(object):
+    """
+    Sends the reads of the requests routed to the replica (see utils.middleware.replicas and read_from_replica) to
+    the replica database, everything else to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not has_replica():
+            return DEFAULT_DB_ALIAS
+
+        state = _state.get()
+        replica = _replica.get()
+        if replica is None:
+            replica = state is not None and state.replica
+
+        if (
+            not replica
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+            or (state is not None and (state.wrote or state.pinned))
+            or not replica_health.is_healthy()
+        ):
+            metrics.incr("replicas.reads.primary")
+            return DEFAULT_DB_ALIAS
+
+        metrics.incr("replicas.reads.replica")
+        return REPLICA_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both databases hold the same data.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA_DB_ALIAS
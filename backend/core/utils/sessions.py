@@ -0,0 +1,19 @@
+# Third Party Library Imports
+from django.contrib.sessions.backends.db import SessionStore as DBSessionStore
+
+# App Imports
+from utils.prepared import hot
+
+
+class SessionStore(DBSessionStore):
+    """
+    Database sessions whose lookup, run by every request with a session cookie, is a prepared statement.
+    """
+
+    @hot("session")
+    def _get_session_from_db(self):
+        return super()._get_session_from_db()
+
+    @hot("session")
+    async def _aget_session_from_db(self):
+        return await super()._aget_session_from_db()
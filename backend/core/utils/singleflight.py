@@ -0,0 +1,130 @@
+# Standard Library Imports
+import asyncio
+import inspect
+import threading
+import weakref
+from functools import wraps
+
+# App Imports
+from utils import metrics
+
+
+class _Call(object):
+    def __init__(self):
+        self.thread = threading.get_ident()
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class Group(object):
+    """
+    Collapses the concurrent calls with the same key into a single execution, whose result or exception is shared by
+    all the callers, e.g. the identical queries of many clients loading the same dashboard at once. Nothing is kept
+    once the execution returns: the calls made after it execute again, cache the result for that.
+
+    The sync calls are coalesced across the threads of the process, the async calls within their event loop. The
+    executions and the coalesced calls are counted as singleflight.<name>.executions and .coalesced.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._async_calls = weakref.WeakKeyDictionary()
+
+    def is_running(self, key):
+        return key in self._calls
+
+    def do(self, key, func, *args, **kwargs):
+        """
+        Return func(*args, **kwargs), or the result of the execution already running for the key.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = self._calls[key] = _Call()
+
+        if not is_leader:
+            if call.thread == threading.get_ident():
+                # Called again from within the execution, waiting for it would deadlock.
+                return func(*args, **kwargs)
+
+            metrics.incr(f"singleflight.{self.name}.coalesced")
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        metrics.incr(f"singleflight.{self.name}.executions")
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    async def ado(self, key, func, *args, **kwargs):
+        """
+        Async variant of `do`, for a coroutine function.
+        """
+        calls = self._async_calls.setdefault(asyncio.get_running_loop(), {})
+        task = calls.get(key)
+        if task is not None:
+            if task is asyncio.current_task():
+                # Called again from within the execution, waiting for it would deadlock.
+                return await func(*args, **kwargs)
+
+            metrics.incr(f"singleflight.{self.name}.coalesced")
+            return await asyncio.shield(task)
+
+        metrics.incr(f"singleflight.{self.name}.executions")
+        task = calls[key] = asyncio.ensure_future(func(*args, **kwargs))
+
+        def forget(task):
+            if calls.get(key) is task:
+                del calls[key]
+
+        task.add_done_callback(forget)
+        # The execution outlives a cancelled caller, the other callers still get its result.
+        return await asyncio.shield(task)
+
+
+def singleflight(group, key=None):
+    """
+    Decorator coalescing the concurrent calls of the function (sync or async) with the same arguments, or with the
+    same key(*args, **kwargs) when given. The arguments must be hashable without a key function.
+
+    Args:
+        group: Group of the calls, or the name of a new one.
+        key: Function returning the key of the call from its arguments.
+    """
+    if isinstance(group, str):
+        group = Group(group)
+
+    def get_key(args, kwargs):
+        return key(*args, **kwargs) if key is not None else (args, tuple(sorted(kwargs.items())))
+
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                return await group.ado(get_key(args, kwargs), func, *args, **kwargs)
+
+            async_wrapper.group = group
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            return group.do(get_key(args, kwargs), func, *args, **kwargs)
+
+        wrapper.group = group
+        return wrapper
+
+    return decorator